@@ -3,6 +3,7 @@ import os
 from flask import Flask
 from flask_cors import CORS
 
+from commands import register_commands
 from config import config
 from routes.api import api
 from routes.web import web
@@ -24,6 +25,8 @@ def create_app(config_name=None):
     app.register_blueprint(api, url_prefix="/api")
     app.register_blueprint(web)
 
+    register_commands(app)
+
     return app
 
 
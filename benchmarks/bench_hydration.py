@@ -0,0 +1,84 @@
+"""Hydration time and resident memory of a large library
+
+Run from the project root:
+
+    python -m benchmarks.bench_hydration [recordings]
+"""
+
+import sys
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from models.child import Child
+
+CHILDREN = 4
+WORDS_PER_CHILD = 500
+
+
+def build_library(total_recordings: int) -> dict:
+    """Build a data.json document with the given number of recordings"""
+    per_word = max(1, total_recordings // (CHILDREN * WORDS_PER_CHILD))
+    start = date(2020, 1, 1)
+    dates = [start + timedelta(days=i) for i in range(per_word)]
+    return {
+        "children": [
+            {
+                "name": f"child{c}",
+                "words": [
+                    {
+                        "text": f"word{w}",
+                        "image_filename": None,
+                        "recordings": [
+                            {
+                                "year": d.year,
+                                "month": d.month,
+                                "day": d.day,
+                                "filename": f"{d}.webm",
+                            }
+                            for d in dates
+                        ],
+                    }
+                    for w in range(WORDS_PER_CHILD)
+                ],
+            }
+            for c in range(CHILDREN)
+        ]
+    }
+
+
+def hydrate(data: dict, trusted: bool) -> list:
+    """Hydrate every child in the document, down to each recording"""
+    children = [Child.from_dict(child_data, trusted=trusted) for child_data in data["children"]]
+    # Trusted children hydrate lazily, so touch everything for a like-for-like comparison
+    for child in children:
+        for word in child.words:
+            word.recordings
+    return children
+
+
+def measure(data: dict, trusted: bool) -> None:
+    """Report hydration time and the memory held by the hydrated graph"""
+    timings = []
+    for _ in range(3):
+        started = time.perf_counter()
+        hydrate(data, trusted)
+        timings.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    children = hydrate(data, trusted)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del children
+
+    label = "trusted" if trusted else "validated"
+    print(f"  {label:>9}: {min(timings) * 1e3:8.1f} ms, {current / 1024 / 1024:7.1f} MiB")
+
+
+if __name__ == "__main__":
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    library = build_library(total)
+    count = sum(len(w["recordings"]) for c in library["children"] for w in c["words"])
+    print(f"Hydrating {count} recordings")
+    measure(library, trusted=False)
+    measure(library, trusted=True)
@@ -0,0 +1,88 @@
+"""Micro-benchmarks for the data models
+
+Run from the project root:
+
+    python -m benchmarks.bench_models
+"""
+
+import random
+import timeit
+from datetime import date, timedelta
+
+from models.child import Child
+from models.word import Word
+
+SIZES = [100, 1_000, 10_000]
+
+
+def bench_word_lookup() -> None:
+    """Word lookup and insertion cost as vocabularies grow"""
+    print("Child word lookup (per call)")
+    for size in SIZES:
+        child = Child("Bench", [Word(f"word{i}") for i in range(size)])
+        last = f"word{size - 1}"
+        runs = 10_000
+        lookup = timeit.timeit(lambda: child.get_word(last), number=runs) / runs
+        duplicate = timeit.timeit(lambda: child.add_word(Word(last)), number=runs) / runs
+        print(
+            f"  {size:>6} words: get_word {lookup * 1e9:8.0f} ns, add_word {duplicate * 1e9:8.0f} ns"
+        )
+
+
+def bench_bulk_import() -> None:
+    """Building a vocabulary one word at a time"""
+    print("Child bulk import (total)")
+    for size in SIZES:
+
+        def build() -> None:
+            child = Child("Bench")
+            for i in range(size):
+                child.add_word(Word(f"word{i}"))
+
+        elapsed = min(timeit.repeat(build, number=1, repeat=3))
+        print(f"  {size:>6} words: {elapsed * 1e3:8.2f} ms")
+
+
+def bench_recordings() -> None:
+    """Recording insertion and lookup on words with long daily histories"""
+    print("Word recordings (per call)")
+    start = date(2020, 1, 1)
+    for size in SIZES:
+        days = [start + timedelta(days=i) for i in range(size)]
+        random.Random(size).shuffle(days)
+        word = Word("bench")
+        for d in days:
+            word.add_recording(d.year, d.month, d.day, f"{d}.mp3")
+
+        middle = start + timedelta(days=size // 2)
+        runs = 10_000
+        insert = (
+            timeit.timeit(
+                lambda: word.add_recording(middle.year, middle.month, middle.day, "x.mp3"),
+                number=runs,
+            )
+            / runs
+        )
+        lookup = (
+            timeit.timeit(
+                lambda: word.get_recording(middle.year, middle.month, middle.day), number=runs
+            )
+            / runs
+        )
+        window = (
+            timeit.timeit(
+                lambda: word.get_recordings_between(middle, middle + timedelta(days=30)),
+                number=runs,
+            )
+            / runs
+        )
+        print(
+            f"  {size:>6} recordings: add_recording {insert * 1e6:6.2f} us, "
+            f"get_recording {lookup * 1e6:6.2f} us, 30-day range {window * 1e6:6.2f} us"
+        )
+
+
+if __name__ == "__main__":
+    bench_word_lookup()
+    bench_bulk_import()
+    bench_recordings()
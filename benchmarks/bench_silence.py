@@ -0,0 +1,71 @@
+"""Time to find leading and trailing silence with pydub versus NumPy windowed RMS
+
+Toddler recordings are mostly silence around a short word, so the synthetic recordings
+are a one-second word in the middle of quiet noise. Run from the project root:
+
+    python -m benchmarks.bench_silence [seconds ...]
+"""
+
+import sys
+import time
+from typing import Callable, Tuple
+
+import numpy as np
+from pydub import AudioSegment
+from pydub.silence import detect_leading_silence
+
+from config import Config
+from services.silence import find_sound
+from services.waveform import segment_pcm, to_mono
+
+RATE = 48000
+ROUNDS = 5
+
+
+def make_recording(seconds: int) -> AudioSegment:
+    """Make a mono 16-bit recording: a one-second tone in the middle of quiet noise"""
+    rng = np.random.default_rng(0)
+    samples = rng.normal(0, 30, seconds * RATE)
+    middle = seconds * RATE // 2
+    word = np.arange(RATE)
+    samples[middle : middle + RATE] += 12000 * np.sin(word * 2 * np.pi * 220 / RATE)
+    return AudioSegment(
+        data=samples.astype("<i2").tobytes(), sample_width=2, frame_rate=RATE, channels=1
+    )
+
+
+def with_pydub(audio: AudioSegment) -> Tuple[float, float]:
+    """Find the sound the way pydub does, walking 10ms chunks from both ends"""
+    threshold = audio.max_dBFS - Config.AUTO_TRIM_THRESHOLD
+    start = detect_leading_silence(audio, silence_threshold=threshold)
+    end = len(audio) - detect_leading_silence(audio.reverse(), silence_threshold=threshold)
+    return start / 1000, end / 1000
+
+
+def with_numpy(audio: AudioSegment) -> Tuple[float, float]:
+    """Find the sound with one vectorized pass over the decoded samples"""
+    frames, rate = segment_pcm(audio)
+    span = find_sound(to_mono(frames), rate, Config.AUTO_TRIM_THRESHOLD, Config.AUTO_TRIM_WINDOW, 0)
+    # Nothing is kept of a silent recording
+    return span or (0.0, 0.0)
+
+
+def measure(
+    label: str, detect: Callable[[AudioSegment], Tuple[float, float]], audio: AudioSegment
+) -> None:
+    """Report the best time of a silence detector and the span it found"""
+    timings = []
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        start, end = detect(audio)
+        timings.append(time.perf_counter() - started)
+    kept = (end - start) / audio.duration_seconds
+    print(f"  {label:>6}: {min(timings) * 1e3:8.1f} ms, keeps {start:.2f}-{end:.2f}s ({kept:.1%})")
+
+
+if __name__ == "__main__":
+    for seconds in [int(arg) for arg in sys.argv[1:]] or [10, 60, 300]:
+        audio = make_recording(seconds)
+        print(f"{seconds}s recording:")
+        measure("pydub", with_pydub, audio)
+        measure("numpy", with_numpy, audio)
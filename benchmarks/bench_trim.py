@@ -0,0 +1,94 @@
+"""Latency and CPU time of trimming with pydub versus copying packets
+
+Needs ffmpeg and ffprobe on the PATH. Run from the project root:
+
+    python -m benchmarks.bench_trim [seconds]
+"""
+
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable
+
+from pydub import AudioSegment
+
+from services.audio_trim import trim_copy
+
+# Extension, ffmpeg encoder arguments, and the format pydub exports it with
+FORMATS = [
+    ("webm", ["-c:a", "libopus", "-b:a", "64k"], "ogg"),
+    ("mp3", ["-c:a", "libmp3lame", "-b:a", "128k"], "mp3"),
+    ("m4a", ["-c:a", "aac", "-b:a", "128k"], "mp4"),
+]
+ROUNDS = 5
+
+
+def make_recording(path: str, seconds: int, codec_args: list) -> None:
+    """Encode a test recording: a tone over pink noise"""
+    subprocess.run(
+        [
+            "ffmpeg",
+            "-v",
+            "error",
+            "-y",
+            "-f",
+            "lavfi",
+            "-i",
+            f"sine=frequency=440:duration={seconds}",
+            "-f",
+            "lavfi",
+            "-i",
+            f"anoisesrc=color=pink:amplitude=0.1:duration={seconds}",
+            "-filter_complex",
+            "amix=inputs=2",
+            *codec_args,
+            path,
+        ],
+        check=True,
+    )
+
+
+def cpu_seconds() -> float:
+    """CPU time used so far by this process and its finished children"""
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+
+def measure(label: str, trim: Callable[[], None]) -> None:
+    """Report the best wall time and mean CPU time of a trim function"""
+    timings, cpu = [], []
+    for _ in range(ROUNDS):
+        started, started_cpu = time.perf_counter(), cpu_seconds()
+        trim()
+        timings.append(time.perf_counter() - started)
+        cpu.append(cpu_seconds() - started_cpu)
+    print(f"  {label:>6}: {min(timings) * 1e3:8.1f} ms wall, {sum(cpu) / ROUNDS * 1e3:8.1f} ms CPU")
+
+
+if __name__ == "__main__":
+    if not shutil.which("ffmpeg") or not shutil.which("ffprobe"):
+        sys.exit("ffmpeg and ffprobe are required")
+
+    seconds = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    start, end = seconds * 0.25, seconds * 0.75
+    with tempfile.TemporaryDirectory() as work:
+        for extension, codec_args, export_format in FORMATS:
+            source = os.path.join(work, f"source.{extension}")
+            target = os.path.join(work, f"trimmed.{extension}")
+            make_recording(source, seconds, codec_args)
+            print(f"{extension} ({os.path.getsize(source) / 1024:.0f} KiB, {seconds}s):")
+
+            def decode_and_encode() -> None:
+                audio = AudioSegment.from_file(source)
+                audio[int(start * 1000) : int(end * 1000)].export(target, format=export_format)
+
+            def copy_packets() -> None:
+                assert trim_copy(source, target, extension, start, end, tolerance=0.03)
+
+            measure("pydub", decode_and_encode)
+            measure("copy", copy_packets)
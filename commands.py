@@ -0,0 +1,190 @@
+from collections import Counter
+from typing import IO, Optional
+
+import click
+from flask import Flask, current_app
+
+from services.archive_import import import_archive
+from services.audio_conversion import convert_library
+from services.audio_metadata import backfill_metadata
+from services.audio_service import AudioService
+from services.data_service import DataService
+from services.features import backfill_features
+from services.image_service import ImageService
+from services.job_queue import get_job_runner
+from services.journal_repository import JournaledJsonRepository
+from services.normalization import normalize_library
+from services.sharded_repository import split_data_file
+from services.sqlite_repository import migrate_json_to_sqlite
+
+
+@click.group("storage")
+def storage_cli() -> None:
+    """Manage the data store"""
+
+
+@storage_cli.command("migrate-sqlite")
+@click.option("--data-file", default=None, help="Source data.json (defaults to DATA_FILE)")
+@click.option("--database", default=None, help="Target database (defaults to SQLITE_DATABASE)")
+def migrate_sqlite(data_file: Optional[str], database: Optional[str]) -> None:
+    """Copy data.json into the SQLite storage backend"""
+    data_file = data_file or current_app.config["DATA_FILE"]
+    database = database or current_app.config["SQLITE_DATABASE"]
+    count = migrate_json_to_sqlite(data_file, database)
+    click.echo(f"Migrated {count} children from {data_file} to {database}")
+    click.echo("Set STORAGE_BACKEND=sqlite to start using it")
+
+
+@storage_cli.command("migrate-sharded")
+@click.option("--data-file", default=None, help="Source data.json (defaults to DATA_FILE)")
+@click.option("--shard-dir", default=None, help="Target directory (defaults to SHARD_DIR)")
+def migrate_sharded(data_file: Optional[str], shard_dir: Optional[str]) -> None:
+    """Split data.json into one file per child"""
+    data_file = data_file or current_app.config["DATA_FILE"]
+    shard_dir = shard_dir or current_app.config["SHARD_DIR"]
+    count = split_data_file(data_file, shard_dir)
+    click.echo(f"Split {count} children from {data_file} into {shard_dir}")
+    click.echo("Set STORAGE_BACKEND=sharded to start using it")
+
+
+@storage_cli.command("compact")
+def compact_journal() -> None:
+    """Fold the mutation journal into data.json"""
+    repository = JournaledJsonRepository(current_app.config["DATA_FILE"])
+    entries, children = repository.compact()
+    click.echo(f"Folded {entries} journal entries into {children} children")
+
+
+@click.group("recordings")
+def recordings_cli() -> None:
+    """Manage recordings"""
+
+
+@recordings_cli.command("import")
+@click.argument("child_name")
+@click.argument("archive", type=click.File("rb"))
+@click.option("--workers", type=int, default=None, help="Worker processes (defaults to CPUs)")
+def import_recordings(child_name: str, archive: IO[bytes], workers: Optional[int]) -> None:
+    """Import a ZIP or tar of <word>/<YYYY-MM-DD>.<ext> recordings for a child"""
+    try:
+        report = import_archive(archive, child_name, workers=workers)
+    except (LookupError, ValueError) as e:
+        raise click.ClickException(str(e))
+
+    for failure in report.failed:
+        click.echo(f"Skipped {failure['name']}: {failure['error']}", err=True)
+    click.echo(
+        f"Imported {len(report.imported)} recordings "
+        f"({len(report.words_created)} new words, {len(report.failed)} skipped)"
+    )
+
+
+@recordings_cli.command("backfill-metadata")
+@click.option("--workers", type=int, default=None, help="Worker processes (defaults to CPUs)")
+@click.option("--force", is_flag=True, help="Probe recordings that already have metadata too")
+def backfill_recording_metadata(workers: Optional[int], force: bool) -> None:
+    """Probe duration, codec, sample rate and loudness of existing recordings"""
+    report = backfill_metadata(workers=workers, force=force)
+    for filename, error in report.failed:
+        click.echo(f"Skipped {filename}: {error}", err=True)
+    click.echo(f"Stored metadata of {report.updated} recordings ({len(report.failed)} skipped)")
+
+
+@recordings_cli.command("backfill-features")
+@click.option("--workers", type=int, default=None, help="Worker processes (defaults to CPUs)")
+@click.option("--force", is_flag=True, help="Extract features of recordings that have them too")
+def backfill_recording_features(workers: Optional[int], force: bool) -> None:
+    """Extract the acoustic features used to compare recordings, and drop stale ones"""
+    report = backfill_features(workers=workers, force=force)
+    for filename, error in report.failed:
+        click.echo(f"Skipped {filename}: {error}", err=True)
+    click.echo(
+        f"Stored features of {report.extracted} recordings "
+        f"({report.removed} stale removed, {len(report.failed)} skipped)"
+    )
+
+
+@recordings_cli.command("convert")
+@click.option("--workers", type=int, default=None, help="Worker processes (defaults to CPUs)")
+@click.option("--bitrate", default=None, help="Opus bitrate (defaults to AUDIO_OPUS_BITRATE)")
+def convert_recordings(workers: Optional[int], bitrate: Optional[str]) -> None:
+    """Transcode existing recordings to Opus/Ogg and report the bytes saved"""
+    report = convert_library(workers=workers, bitrate=bitrate)
+    for filename, error in report.failed:
+        click.echo(f"Skipped {filename}: {error}", err=True)
+    click.echo(f"Converted {report.converted} recordings ({report.kept} kept as they were)")
+    if report.bytes_before:
+        click.echo(
+            f"{report.bytes_before / 1024 / 1024:.1f}MB -> {report.bytes_after / 1024 / 1024:.1f}MB, "
+            f"saved {report.bytes_saved / 1024 / 1024:.1f}MB "
+            f"({report.bytes_saved / report.bytes_before:.0%})"
+        )
+
+
+@recordings_cli.command("normalize")
+@click.option("--workers", type=int, default=None, help="Worker processes (defaults to CPUs)")
+def normalize_recordings(workers: Optional[int]) -> None:
+    """Bring recordings to LOUDNESS_TARGET; reruns continue with the ones not done yet"""
+
+    def progress(done: int, total: int) -> None:
+        click.echo(f"Processed {done}/{total} files")
+
+    report = normalize_library(workers=workers, progress=progress)
+    for filename, error in report.failed:
+        click.echo(f"Skipped {filename}: {error}", err=True)
+    click.echo(
+        f"Normalized {report.normalized} recordings "
+        f"({report.unchanged} already at the target, {len(report.failed)} skipped)"
+    )
+
+
+@click.group("media")
+def media_cli() -> None:
+    """Manage stored audio and image files"""
+
+
+@media_cli.command("gc")
+def collect_garbage() -> None:
+    """Delete stored files nothing refers to and rebuild reference counts"""
+    audio: Counter[str] = Counter()
+    images: Counter[str] = Counter()
+    for child in DataService().get_children():
+        for word in child.words:
+            if word.image_filename:
+                images[word.image_filename] += 1
+            for recording in word.recordings:
+                audio[recording.filename] += 1
+
+    removed = AudioService().blobs.sweep(audio) + ImageService().blobs.sweep(images)
+    for name in removed:
+        click.echo(f"Removed {name}")
+    click.echo(f"Removed {len(removed)} unreferenced files")
+
+
+@click.group("jobs")
+def jobs_cli() -> None:
+    """Manage background media processing jobs"""
+
+
+@jobs_cli.command("work")
+@click.option("--once", is_flag=True, help="Run the due jobs in this process, then exit")
+@click.option(
+    "--workers", type=int, default=None, help="Worker processes (defaults to JOB_WORKERS)"
+)
+def work_jobs(once: bool, workers: Optional[int]) -> None:
+    """Work the job queue alongside (or instead of) the web app's runners"""
+    runner = get_job_runner()
+    if once:
+        click.echo(f"Ran {runner.run_pending()} jobs")
+        return
+    runner.workers = max(workers or runner.workers, 1)
+    click.echo(f"Working the job queue with {runner.workers} processes")
+    runner.run_forever()
+
+
+def register_commands(app: Flask) -> None:
+    """Register the CLI command groups on the app"""
+    app.cli.add_command(storage_cli)
+    app.cli.add_command(recordings_cli)
+    app.cli.add_command(media_cli)
+    app.cli.add_command(jobs_cli)
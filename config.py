@@ -26,6 +26,24 @@ class Config:
     AUDIO_DIR = os.path.join(DATA_DIR, "audio")
     IMAGES_DIR = os.path.join(DATA_DIR, "images")
     DATA_FILE = os.path.join(DATA_DIR, "data.json")
+    SQLITE_DATABASE = os.path.join(DATA_DIR, "paraulins.db")
+    SHARD_DIR = os.path.join(DATA_DIR, "children")
+    JOB_DATABASE = os.path.join(DATA_DIR, "jobs.db")
+    JOB_STAGING_DIR = os.path.join(DATA_DIR, "jobs")
+
+    # Background media processing: worker processes per app process (0 runs jobs
+    # inline), attempts before a job fails, and how long a claimed job is reserved
+    JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 2))
+    JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", 3))
+    JOB_LEASE_SECONDS = int(os.environ.get("JOB_LEASE_SECONDS", 600))
+
+    # Storage backend for children, words and recordings:
+    # "json", "journal", "sharded" or "sqlite"
+    STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "json")
+
+    # The journal backend folds its journal into data.json past either threshold
+    JOURNAL_COMPACT_ENTRIES = int(os.environ.get("JOURNAL_COMPACT_ENTRIES", 1000))
+    JOURNAL_COMPACT_BYTES = int(os.environ.get("JOURNAL_COMPACT_BYTES", 4 * 1024 * 1024))
 
     ALLOWED_AUDIO_EXTENSIONS = {"mp3", "wav", "ogg", "m4a", "webm"}
     ALLOWED_IMAGE_EXTENSIONS = {"jpg", "jpeg", "png", "gif"}
@@ -33,6 +51,30 @@ class Config:
     MAX_AUDIO_SIZE = 10 * 1024 * 1024  # 10MB
     MAX_IMAGE_SIZE = 5 * 1024 * 1024  # 5MB
 
+    # Recordings are stored as Opus in Ogg at this bitrate whenever that makes them smaller
+    # (needs ffmpeg); "original" keeps them as uploaded
+    AUDIO_STORAGE_CODEC = os.environ.get("AUDIO_STORAGE_CODEC", "opus")
+    AUDIO_OPUS_BITRATE = os.environ.get("AUDIO_OPUS_BITRATE", "32k")
+
+    # Recordings are brought to this integrated loudness (LUFS) when saved, keeping sample
+    # peaks under the ceiling (dBFS) and boosting quiet ones by at most the maximum gain (dB)
+    LOUDNESS_TARGET = float(os.environ.get("LOUDNESS_TARGET", -18))
+    LOUDNESS_PEAK_CEILING = -1.0
+    LOUDNESS_MAX_GAIN = 20.0
+
+    # Seconds of silence between recordings in a word's montage
+    MONTAGE_GAP = float(os.environ.get("MONTAGE_GAP", 0.75))
+
+    # Trim cut points this close (in seconds) to a packet boundary are moved onto it, so
+    # the audio can be copied instead of re-encoded
+    TRIM_SNAP_TOLERANCE = float(os.environ.get("TRIM_SNAP_TOLERANCE", 0.03))
+
+    # Auto-trim treats 20ms windows this many dB below the loudest one as silence, and
+    # keeps this many seconds of it around the sound
+    AUTO_TRIM_THRESHOLD = float(os.environ.get("AUTO_TRIM_THRESHOLD", 35))
+    AUTO_TRIM_WINDOW = 0.02
+    AUTO_TRIM_PADDING = float(os.environ.get("AUTO_TRIM_PADDING", 0.15))
+
     # Image search API configuration
     # Using Pixabay API (free, no authentication required for basic usage)
     IMAGE_SEARCH_API_URL = "https://pixabay.com/api/"
@@ -69,6 +111,10 @@ class ProductionConfig(Config):
     AUDIO_DIR = os.path.join(DATA_DIR, "audio")
     IMAGES_DIR = os.path.join(DATA_DIR, "images")
     DATA_FILE = os.path.join(DATA_DIR, "data.json")
+    SQLITE_DATABASE = os.path.join(DATA_DIR, "paraulins.db")
+    SHARD_DIR = os.path.join(DATA_DIR, "children")
+    JOB_DATABASE = os.path.join(DATA_DIR, "jobs.db")
+    JOB_STAGING_DIR = os.path.join(DATA_DIR, "jobs")
 
     # File size limits (can be overridden by environment)
     MAX_AUDIO_SIZE = int(os.environ.get("MAX_AUDIO_SIZE", 20 * 1024 * 1024))  # 20MB default
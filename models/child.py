@@ -1,43 +1,146 @@
-from dataclasses import dataclass
-from typing import List, Optional
+from typing import Any, Callable, Dict, Iterable, List, Optional
 
 from .word import Word
 
 
-@dataclass
+class _WordList(List[Word]):
+    """A child's words, dropping the child's word index whenever the list is changed"""
+
+    __slots__ = ("_owner",)
+
+    def __init__(self, owner: "Child", words: Iterable[Word] = ()):
+        super().__init__(words)
+        self._owner = owner
+
+    def __reduce__(self) -> tuple:
+        # Rebuilt with its owner, as unpickling a list fills it before setting any slot
+        return (_WordList, (self._owner, list(self)))
+
+    def _changed(self) -> None:
+        """Have the owner rebuild its index on next use"""
+        self._owner._word_index = None
+
+
+def _invalidating(name: str) -> Callable[..., Any]:
+    """Wrap a list method to drop the owner's word index before it runs"""
+    method = getattr(list, name)
+
+    def wrapper(self: _WordList, *args: Any, **kwargs: Any) -> Any:
+        self._changed()
+        return method(self, *args, **kwargs)
+
+    wrapper.__name__ = name
+    return wrapper
+
+
+for _name in (
+    "__setitem__",
+    "__delitem__",
+    "__iadd__",
+    "__imul__",
+    "append",
+    "extend",
+    "insert",
+    "pop",
+    "remove",
+    "clear",
+    "sort",
+    "reverse",
+):
+    setattr(_WordList, _name, _invalidating(_name))
+
+
 class Child:
     """Represents a child in the system"""
 
-    name: str
-    words: List[Word]
+    __slots__ = ("name", "_words", "_raw_words", "_word_index")
 
     def __init__(self, name: str, words: Optional[List[Word]] = None):
         self.name = name
-        self.words = words or []
+        self._words = _WordList(self)
+        # Raw word dictionaries waiting to be hydrated on first access
+        self._raw_words: Optional[List[dict]] = None
+        # Insertion-ordered index of words by text, None until rebuilt after a direct change
+        self._word_index: Optional[Dict[str, Word]] = {}
+        for word in words or []:
+            self.add_word(word)
+
+    @property
+    def words(self) -> List[Word]:
+        """Get the words, hydrating them on first access for lazily loaded children"""
+        if self._raw_words is not None:
+            self._words = _WordList(
+                self, (Word.from_dict(word_data, trusted=True) for word_data in self._raw_words)
+            )
+            self._raw_words = None
+            self._word_index = None
+        return self._words
+
+    @words.setter
+    def words(self, words: List[Word]) -> None:
+        self._words = _WordList(self, words)
+        self._raw_words = None
+        self._word_index = None
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Child):
+            return NotImplemented
+        return (self.name, self.words) == (other.name, other.words)
+
+    def __repr__(self) -> str:
+        return f"Child(name={self.name!r}, words={self.words!r})"
+
+    def _index(self) -> Dict[str, Word]:
+        """Get the word index, rebuilding it after words was changed directly"""
+        words = self.words
+        if self._word_index is None:
+            self._word_index = {}
+            for word in words:
+                self._word_index.setdefault(word.text, word)
+        return self._word_index
 
     def add_word(self, word: Word) -> None:
         """Add a word to this child's vocabulary"""
-        if not any(w.text == word.text for w in self.words):
-            self.words.append(word)
+        index = self._index()
+        if word.text not in index:
+            index[word.text] = word
+            # Bypasses the list's invalidation, as the index was just updated
+            list.append(self.words, word)
 
     def get_word(self, word_text: str) -> Optional[Word]:
         """Get a specific word by text"""
-        return next((w for w in self.words if w.text == word_text), None)
+        return self._index().get(word_text)
 
     def remove_word(self, word_text: str) -> bool:
         """Remove a word from this child's vocabulary"""
-        word = self.get_word(word_text)
-        if word:
-            self.words.remove(word)
-            return True
-        return False
+        word = self._index().pop(word_text, None)
+        if word is None:
+            return False
+        # Found by identity, as comparing words would hydrate every lazy one, and
+        # deleted past the list's invalidation, as the index was just updated
+        words = self.words
+        list.__delitem__(words, next(i for i, w in enumerate(words) if w is word))
+        return True
 
     def to_dict(self) -> dict:
         """Convert to dictionary for JSON serialization"""
         return {"name": self.name, "words": [word.to_dict() for word in self.words]}
 
     @classmethod
-    def from_dict(cls, data: dict) -> "Child":
-        """Create Child instance from dictionary"""
+    def from_dict(cls, data: dict, trusted: bool = False) -> "Child":
+        """Create Child instance from dictionary
+
+        With trusted=True, words and their recordings are hydrated lazily on first
+        access and not re-validated. Only use it for data this application wrote
+        itself, such as the storage layer does.
+        """
+        if trusted:
+            child = cls.__new__(cls)
+            child.name = data["name"]
+            child._words = _WordList(child)
+            child._raw_words = data.get("words", [])
+            child._word_index = None
+            return child
+
         words = [Word.from_dict(word_data) for word_data in data.get("words", [])]
         return cls(name=data["name"], words=words)
@@ -1,8 +1,46 @@
 from dataclasses import dataclass
 from datetime import date
+from typing import Optional
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
+class AudioMetadata:
+    """Technical details of a recording's audio file, probed once when it is saved"""
+
+    duration: float  # seconds
+    codec: str
+    sample_rate: int
+    channels: int
+    loudness: Optional[float] = None  # RMS level in dBFS
+    gain: Optional[float] = None  # dB applied by loudness normalization, once normalized
+
+    def to_dict(self) -> dict:
+        """Convert to dictionary for JSON serialization"""
+        data = {
+            "duration": self.duration,
+            "codec": self.codec,
+            "sample_rate": self.sample_rate,
+            "channels": self.channels,
+            "loudness": self.loudness,
+        }
+        if self.gain is not None:
+            data["gain"] = self.gain
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "AudioMetadata":
+        """Create AudioMetadata instance from dictionary"""
+        return cls(
+            duration=data["duration"],
+            codec=data["codec"],
+            sample_rate=data["sample_rate"],
+            channels=data["channels"],
+            loudness=data.get("loudness"),
+            gain=data.get("gain"),
+        )
+
+
+@dataclass(slots=True)
 class Recording:
     """Represents an audio recording for a specific date"""
 
@@ -10,8 +48,16 @@ class Recording:
     month: int
     day: int
     filename: str
+    metadata: Optional[AudioMetadata] = None
 
-    def __init__(self, year: int, month: int, day: int, filename: str):
+    def __init__(
+        self,
+        year: int,
+        month: int,
+        day: int,
+        filename: str,
+        metadata: Optional[AudioMetadata] = None,
+    ):
         # Validate date by trying to create a date object
         try:
             date(year, month, day)
@@ -25,12 +71,28 @@ class Recording:
         self.month = month
         self.day = day
         self.filename = filename
+        self.metadata = metadata
+
+    @property
+    def duration(self) -> Optional[float]:
+        """Get the length in seconds, if the audio file was probed"""
+        return self.metadata.duration if self.metadata else None
+
+    @property
+    def gain(self) -> Optional[float]:
+        """Get the dB applied by loudness normalization, if the recording was normalized"""
+        return self.metadata.gain if self.metadata else None
 
     @property
     def date_string(self) -> str:
         """Get a formatted date string (YYYY-MM-DD)"""
         return f"{self.year}-{self.month:02d}-{self.day:02d}"
 
+    @property
+    def ordinal(self) -> int:
+        """Get the proleptic Gregorian ordinal of the recording date, used as sort key"""
+        return date(self.year, self.month, self.day).toordinal()
+
     @property
     def display_date(self) -> str:
         """Get a human-readable date string"""
@@ -45,14 +107,31 @@ class Recording:
 
     def to_dict(self) -> dict:
         """Convert to dictionary for JSON serialization"""
-        return {"year": self.year, "month": self.month, "day": self.day, "filename": self.filename}
+        data = {"year": self.year, "month": self.month, "day": self.day, "filename": self.filename}
+        if self.metadata is not None:
+            data["metadata"] = self.metadata.to_dict()
+        return data
 
     @classmethod
-    def from_dict(cls, data: dict) -> "Recording":
-        """Create Recording instance from dictionary"""
+    def from_dict(cls, data: dict, trusted: bool = False) -> "Recording":
+        """Create Recording instance from dictionary
+
+        With trusted=True the date is not re-validated. Only use it for data this
+        application wrote itself, such as the storage layer does.
+        """
         # Handle legacy data that only has year or year/month
         year = data["year"]
         month = data.get("month", 1)  # Default to January for legacy data
         day = data.get("day", 1)  # Default to 1st day for legacy data
+        metadata = AudioMetadata.from_dict(data["metadata"]) if data.get("metadata") else None
+
+        if trusted:
+            recording = cls.__new__(cls)
+            recording.year = year
+            recording.month = month
+            recording.day = day
+            recording.filename = data["filename"]
+            recording.metadata = metadata
+            return recording
 
-        return cls(year=year, month=month, day=day, filename=data["filename"])
+        return cls(year=year, month=month, day=day, filename=data["filename"], metadata=metadata)
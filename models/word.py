@@ -1,16 +1,15 @@
-from dataclasses import dataclass, field
+import calendar
+from bisect import bisect_left, bisect_right
+from datetime import date
 from typing import List, Optional
 
-from .recording import Recording
+from .recording import AudioMetadata, Recording
 
 
-@dataclass
 class Word:
     """Represents a word with its recordings and optional image"""
 
-    text: str
-    image_filename: Optional[str] = None
-    recordings: List[Recording] = field(default_factory=list)
+    __slots__ = ("text", "image_filename", "_recordings", "_raw_recordings", "_ordinals")
 
     def __init__(
         self,
@@ -20,32 +19,101 @@ class Word:
     ):
         self.text = text
         self.image_filename = image_filename
-        self.recordings = recordings or []
-
-    def add_recording(self, year: int, month: int, day: int, filename: str) -> None:
-        """Add a recording for a specific date"""
-        # Remove existing recording for this date if it exists
-        self.recordings = [
-            r for r in self.recordings if not (r.year == year and r.month == month and r.day == day)
-        ]
-        self.recordings.append(Recording(year, month, day, filename))
-        # Sort by date (year, month, day)
-        self.recordings.sort(key=lambda r: (r.year, r.month, r.day))
+        self._recordings = recordings or []
+        # Raw recording dictionaries waiting to be hydrated on first access
+        self._raw_recordings: Optional[List[dict]] = None
+        # Date ordinals of recordings, kept sorted and parallel to recordings.
+        # Built lazily on first lookup, so hydrating a library doesn't pay for it.
+        self._ordinals: List[int] = []
+
+    @property
+    def recordings(self) -> List[Recording]:
+        """Get the recordings, hydrating them on first access for lazily loaded words"""
+        if self._raw_recordings is not None:
+            self._recordings = [
+                Recording.from_dict(rec_data, trusted=True) for rec_data in self._raw_recordings
+            ]
+            self._raw_recordings = None
+        return self._recordings
+
+    @recordings.setter
+    def recordings(self, recordings: List[Recording]) -> None:
+        self._recordings = recordings
+        self._raw_recordings = None
+        self._ordinals = []
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Word):
+            return NotImplemented
+        return (self.text, self.image_filename, self.recordings) == (
+            other.text,
+            other.image_filename,
+            other.recordings,
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"Word(text={self.text!r}, image_filename={self.image_filename!r}, "
+            f"recordings={self.recordings!r})"
+        )
+
+    def _index(self) -> List[int]:
+        """Get the sorted date ordinals, re-sorting if recordings was modified directly"""
+        if len(self._ordinals) != len(self.recordings):
+            self.recordings.sort(key=lambda r: r.ordinal)
+            self._ordinals = [r.ordinal for r in self.recordings]
+        return self._ordinals
+
+    def _find(self, ordinal: int) -> int:
+        """Get the position of the recording for a date ordinal, or -1"""
+        ordinals = self._index()
+        i = bisect_left(ordinals, ordinal)
+        return i if i < len(ordinals) and ordinals[i] == ordinal else -1
+
+    def add_recording(
+        self,
+        year: int,
+        month: int,
+        day: int,
+        filename: str,
+        metadata: Optional[AudioMetadata] = None,
+    ) -> None:
+        """Add a recording for a specific date, replacing any existing one"""
+        recording = Recording(year, month, day, filename, metadata)
+        ordinals = self._index()
+        i = bisect_left(ordinals, recording.ordinal)
+        if i < len(ordinals) and ordinals[i] == recording.ordinal:
+            self.recordings[i] = recording
+        else:
+            ordinals.insert(i, recording.ordinal)
+            self.recordings.insert(i, recording)
 
     def get_recording(self, year: int, month: int, day: int) -> Optional[Recording]:
         """Get recording for a specific date"""
-        return next(
-            (r for r in self.recordings if r.year == year and r.month == month and r.day == day),
-            None,
-        )
+        try:
+            i = self._find(date(year, month, day).toordinal())
+        except ValueError:
+            return None
+        return self.recordings[i] if i >= 0 else None
 
     def remove_recording(self, year: int, month: int, day: int) -> bool:
         """Remove recording for a specific date"""
-        recording = self.get_recording(year, month, day)
-        if recording:
-            self.recordings.remove(recording)
-            return True
-        return False
+        try:
+            i = self._find(date(year, month, day).toordinal())
+        except ValueError:
+            return False
+        if i < 0:
+            return False
+        del self.recordings[i]
+        del self._ordinals[i]
+        return True
+
+    def get_recordings_between(self, start: date, end: date) -> List[Recording]:
+        """Get recordings dated from start to end, both inclusive, in date order"""
+        ordinals = self._index()
+        lo = bisect_left(ordinals, start.toordinal())
+        hi = bisect_right(ordinals, end.toordinal())
+        return self.recordings[lo:hi]
 
     # Legacy methods for backward compatibility
     def add_recording_legacy(self, year: int, month: int, filename: str) -> None:
@@ -54,16 +122,22 @@ class Word:
 
     def get_recording_legacy(self, year: int, month: int) -> Optional[Recording]:
         """Get recording for a specific month and year (legacy - gets first recording of that month)"""
-        month_recordings = [r for r in self.recordings if r.year == year and r.month == month]
+        last_day = calendar.monthrange(year, month)[1]
+        month_recordings = self.get_recordings_between(
+            date(year, month, 1), date(year, month, last_day)
+        )
         return month_recordings[0] if month_recordings else None
 
     def get_dates(self) -> List[tuple]:
         """Get all (year, month) tuples that have recordings"""
-        return sorted([(r.year, r.month) for r in self.recordings])
+        self._index()
+        return [(r.year, r.month) for r in self.recordings]
 
     def get_years(self) -> List[int]:
         """Get all years that have recordings (for backward compatibility)"""
-        return sorted(list(set([r.year for r in self.recordings])))
+        self._index()
+        # Recordings are sorted by date, so equal years are adjacent
+        return list(dict.fromkeys(r.year for r in self.recordings))
 
     def set_image(self, filename: str) -> None:
         """Set the image filename for this word"""
@@ -78,8 +152,17 @@ class Word:
         }
 
     @classmethod
-    def from_dict(cls, data: dict) -> "Word":
-        """Create Word instance from dictionary"""
+    def from_dict(cls, data: dict, trusted: bool = False) -> "Word":
+        """Create Word instance from dictionary
+
+        With trusted=True, recordings are hydrated lazily on first access and not
+        re-validated (see Recording.from_dict).
+        """
+        if trusted:
+            word = cls(text=data["text"], image_filename=data.get("image_filename"))
+            word._raw_recordings = data.get("recordings", [])
+            return word
+
         recordings = [Recording.from_dict(rec_data) for rec_data in data.get("recordings", [])]
         return cls(
             text=data["text"], image_filename=data.get("image_filename"), recordings=recordings
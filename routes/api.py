@@ -1,31 +1,48 @@
-from flask import Blueprint, jsonify, request, send_file
+from typing import Any, Dict, List, Optional, Tuple
+
+from flask import Blueprint, Response, current_app, jsonify, request, url_for
+from flask.typing import ResponseReturnValue
 
 from config import get_project_version
 from models.child import Child
+from models.recording import Recording
 from models.word import Word
+from routes.conditional import not_modified, send_media, set_media_cache, with_validators
+from services.archive_import import import_archive
 from services.audio_service import AudioService
+from services.blob_store import is_blob_name
 from services.data_service import DataService
+from services.feature_store import feature_key
+from services.features import extract_features
 from services.image_search_service import ImageSearchService
 from services.image_service import ImageService
+from services.job_queue import Job, get_job_runner, submit_job
+from services.media_jobs import stage_upload
+from services.montage import find_montage, montage_dir, montage_key, remove_montages
+from services.query import QUERY_ARGS, ChildQuery
+from services.waveform import ensure_peaks, peaks_level
 
 api = Blueprint("api", __name__)
 
+MAX_BATCH_WORDS = 1000
+MAX_SIMILAR_RECORDINGS = 100
+
 
 @api.route("/health", methods=["GET"])
-def health_check():
+def health_check() -> ResponseReturnValue:
     """Health check endpoint for container monitoring"""
     try:
         # Basic health check - verify services can be instantiated
         data_service = DataService()
         # Simple validation that services are working
-        children = data_service.get_children()
+        children_count = data_service.count_children()
         return (
             jsonify(
                 {
                     "status": "healthy",
                     "service": "paraulins",
                     "version": get_project_version(),
-                    "children_count": len(children),
+                    "children_count": children_count,
                 }
             ),
             200,
@@ -35,18 +52,37 @@ def health_check():
 
 
 @api.route("/children", methods=["GET"])
-def get_children():
-    """Get all children"""
+def get_children() -> ResponseReturnValue:
+    """Get all children, or one filtered and projected page of them"""
     try:
+        paged = any(arg in request.args for arg in QUERY_ARGS)
+        query = ChildQuery.from_args(request.args) if paged else None
+
         data_service = DataService()
-        children = data_service.get_children()
-        return jsonify([child.to_dict() for child in children])
+        version = data_service.get_version()
+        scope = f"api:children?{request.query_string.decode()}" if paged else "api:children"
+        cached = not_modified(version, scope)
+        if cached:
+            return cached
+
+        if query is None:
+            children = data_service.get_children()
+            return with_validators(jsonify([child.to_dict() for child in children]), version, scope)
+
+        page = data_service.query_children(query)
+        response = with_validators(jsonify(page.children), version, scope)
+        if page.next_cursor:
+            args: Dict[str, Any] = {**request.args.to_dict(), "cursor": page.next_cursor}
+            response.headers["Link"] = f'<{url_for("api.get_children", **args)}>; rel="next"'
+        return response
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
 @api.route("/children", methods=["POST"])
-def create_child():
+def create_child() -> ResponseReturnValue:
     """Create a new child"""
     try:
         data = request.get_json()
@@ -58,12 +94,13 @@ def create_child():
             return jsonify({"error": "Child name cannot be empty"}), 400
 
         data_service = DataService()
-        # Check if child already exists
-        if data_service.get_child(name):
-            return jsonify({"error": "Child already exists"}), 409
+        with data_service.transaction() as transaction:
+            # Check if child already exists
+            if transaction.get_child(name):
+                return jsonify({"error": "Child already exists"}), 409
 
-        child = Child(name)
-        data_service.save_child(child)
+            child = Child(name)
+            transaction.save_child(child)
 
         return jsonify(child.to_dict()), 201
     except Exception as e:
@@ -71,55 +108,135 @@ def create_child():
 
 
 @api.route("/children/<child_name>", methods=["GET"])
-def get_child(child_name):
+def get_child(child_name: str) -> ResponseReturnValue:
     """Get a specific child"""
     try:
         data_service = DataService()
+        version = data_service.get_version(child_name)
+        scope = f"api:child:{child_name}"
+        cached = not_modified(version, scope)
+        if cached:
+            return cached
+
         child = data_service.get_child(child_name)
         if not child:
             return jsonify({"error": "Child not found"}), 404
 
-        return jsonify(child.to_dict())
+        return with_validators(jsonify(child.to_dict()), version, scope)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
 @api.route("/children/<child_name>/words", methods=["POST"])
-def add_word_to_child(child_name):
+def add_word_to_child(child_name: str) -> ResponseReturnValue:
     """Add a word to a child's vocabulary"""
     try:
         data_service = DataService()
-        child = data_service.get_child(child_name)
-        if not child:
-            return jsonify({"error": "Child not found"}), 404
+        with data_service.transaction() as transaction:
+            child = transaction.get_child(child_name)
+            if not child:
+                return jsonify({"error": "Child not found"}), 404
 
-        data = request.get_json()
-        if not data or "text" not in data:
-            return jsonify({"error": "Word text is required"}), 400
+            data = request.get_json()
+            if not data or "text" not in data:
+                return jsonify({"error": "Word text is required"}), 400
 
-        word_text = data["text"].strip()
-        if not word_text:
-            return jsonify({"error": "Word text cannot be empty"}), 400
+            word_text = data["text"].strip()
+            if not word_text:
+                return jsonify({"error": "Word text cannot be empty"}), 400
 
-        # Check if word already exists
-        if child.get_word(word_text):
-            return jsonify({"error": "Word already exists for this child"}), 409
+            # Check if word already exists
+            if child.get_word(word_text):
+                return jsonify({"error": "Word already exists for this child"}), 409
 
-        word = Word(word_text)
-        child.add_word(word)
-        data_service.save_child(child)
+            word = Word(word_text)
+            transaction.add_word(child_name, word)
 
         return jsonify(word.to_dict()), 201
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
-@api.route("/children/<child_name>/words/<word_text>/image", methods=["POST"])
-def upload_word_image(child_name, word_text):
-    """Upload an image for a word"""
+def _parse_batch_word(item: Any) -> Tuple[str, Optional[str]]:
+    """Get the (text, image URL) of a batch item, raising ValueError if it's invalid"""
+    if isinstance(item, str):
+        item = {"text": item}
+    if not isinstance(item, dict):
+        raise ValueError("Item must be a word or an object with text")
+
+    text = item.get("text")
+    if not isinstance(text, str) or not text.strip():
+        raise ValueError("Word text is required")
+
+    image_url = item.get("imageUrl")
+    if image_url is not None and (
+        not isinstance(image_url, str) or not image_url.startswith(("http://", "https://"))
+    ):
+        raise ValueError("Image URL must be an http(s) URL")
+    return text.strip(), image_url
+
+
+@api.route("/children/<child_name>/words:batch", methods=["POST"])
+def add_words_batch(child_name: str) -> ResponseReturnValue:
+    """Add many words to a child with a single write, queueing a download per image URL"""
     try:
+        data = request.get_json(silent=True)
+        items = data.get("words") if isinstance(data, dict) else data
+        if not isinstance(items, list) or not items:
+            return jsonify({"error": "A non-empty list of words is required"}), 400
+        if len(items) > MAX_BATCH_WORDS:
+            return jsonify({"error": f"At most {MAX_BATCH_WORDS} words per batch"}), 400
+
         data_service = DataService()
-        child = data_service.get_child(child_name)
+        with data_service.transaction() as transaction:
+            child = transaction.get_child(child_name)
+            if not child:
+                return jsonify({"error": "Child not found"}), 404
+
+            results: List[Dict[str, Any]] = []
+            downloads: List[Tuple[Dict[str, Any], str]] = []
+            for item in items:
+                try:
+                    word_text, image_url = _parse_batch_word(item)
+                except ValueError as e:
+                    results.append({"status": "invalid", "error": str(e)})
+                    continue
+
+                # The working copy already holds earlier words of this batch
+                if child.get_word(word_text):
+                    results.append({"text": word_text, "status": "duplicate"})
+                    continue
+
+                transaction.add_word(child_name, Word(word_text))
+                results.append({"text": word_text, "status": "created"})
+                if image_url:
+                    downloads.append((results[-1], image_url))
+
+        # Images are downloaded by background jobs, once the words they attach to exist
+        for result, image_url in downloads:
+            job = submit_job(
+                "download_image",
+                {"child": child_name, "word": result["text"], "image_url": image_url},
+            )
+            result["image_job"] = {
+                "job_id": job.id,
+                "status_url": url_for("api.get_job", job_id=job.id),
+            }
+
+        summary = {
+            status: sum(1 for r in results if r["status"] == status)
+            for status in ("created", "duplicate", "invalid")
+        }
+        return jsonify({"results": results, **summary})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@api.route("/children/<child_name>/words/<word_text>/image", methods=["POST"])
+def upload_word_image(child_name: str, word_text: str) -> ResponseReturnValue:
+    """Upload an image for a word, processed by a background job"""
+    try:
+        child = DataService().get_child(child_name)
         if not child:
             return jsonify({"error": "Child not found"}), 404
 
@@ -135,13 +252,23 @@ def upload_word_image(child_name, word_text):
             return jsonify({"error": "No image file selected"}), 400
 
         image_service = ImageService()
-        filename = image_service.save_image_file(file, word_text)
-        if filename:
-            word.set_image(filename)
-            data_service.save_child(child)
-            return jsonify({"filename": filename})
-        else:
-            return jsonify({"error": "Failed to save image"}), 500
+        staged_path = stage_upload(
+            file,
+            current_app.config["JOB_STAGING_DIR"],
+            image_service.allowed_extensions,
+            image_service.max_file_size,
+        )
+        job = submit_job(
+            "process_image",
+            {
+                "child": child_name,
+                "word": word_text,
+                "images_dir": image_service.images_dir,
+                "staged_path": staged_path,
+                "filename": file.filename,
+            },
+        )
+        return _job_accepted(job)
 
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
@@ -150,71 +277,137 @@ def upload_word_image(child_name, word_text):
 
 
 @api.route("/children/<child_name>/words/<word_text>/recordings", methods=["POST"])
-def upload_recording(child_name, word_text):
+def upload_recording(child_name: str, word_text: str) -> ResponseReturnValue:
     """Upload an audio recording for a word"""
     try:
         data_service = DataService()
-        child = data_service.get_child(child_name)
-        if not child:
-            return jsonify({"error": "Child not found"}), 404
+        with data_service.transaction() as transaction:
+            child = transaction.get_child(child_name)
+            if not child:
+                return jsonify({"error": "Child not found"}), 404
 
-        word = child.get_word(word_text)
-        if not word:
-            return jsonify({"error": "Word not found"}), 404
+            word = child.get_word(word_text)
+            if not word:
+                return jsonify({"error": "Word not found"}), 404
 
-        if "audio" not in request.files:
-            return jsonify({"error": "No audio file provided"}), 400
+            if "audio" not in request.files:
+                return jsonify({"error": "No audio file provided"}), 400
 
-        file = request.files["audio"]
-        if file.filename == "":
-            return jsonify({"error": "No audio file selected"}), 400
+            file = request.files["audio"]
+            if file.filename == "":
+                return jsonify({"error": "No audio file selected"}), 400
 
-        if "date" not in request.form:
-            return jsonify({"error": "Date is required"}), 400
+            if "date" not in request.form:
+                return jsonify({"error": "Date is required"}), 400
 
-        try:
-            # Parse date string (YYYY-MM-DD format)
-            date_str = request.form["date"]
-            from datetime import datetime
-
-            date_obj = datetime.strptime(date_str, "%Y-%m-%d")
-            year = date_obj.year
-            month = date_obj.month
-            day = date_obj.day
-        except ValueError:
-            return jsonify({"error": "Invalid date format. Use YYYY-MM-DD"}), 400
+            try:
+                # Parse date string (YYYY-MM-DD format)
+                date_str = request.form["date"]
+                from datetime import datetime
+
+                date_obj = datetime.strptime(date_str, "%Y-%m-%d")
+                year = date_obj.year
+                month = date_obj.month
+                day = date_obj.day
+            except ValueError:
+                return jsonify({"error": "Invalid date format. Use YYYY-MM-DD"}), 400
+
+            # Check for trimming parameters; explicit times win over auto-trim
+            trim_start = request.form.get("trimStart")
+            trim_end = request.form.get("trimEnd")
+            auto_trim = request.form.get("autoTrim", "").lower() == "true"
+
+            audio_service = AudioService()
+
+            # If trimming parameters are provided, handle audio trimming
+            if (trim_start is not None and trim_end is not None) or auto_trim:
+                trim: Dict[str, Any] = {"auto_trim": True}
+                if trim_start is not None and trim_end is not None:
+                    try:
+                        start_time = float(trim_start)
+                        end_time = float(trim_end)
+
+                        if start_time < 0 or end_time <= start_time:
+                            return jsonify({"error": "Invalid trim times"}), 400
+
+                    except ValueError:
+                        return jsonify({"error": "Invalid trim time format"}), 400
+                    trim = {"start": start_time, "end": end_time}
+
+                # Decoding and re-encoding is slow, so it runs as a background job
+                staged_path = stage_upload(
+                    file,
+                    current_app.config["JOB_STAGING_DIR"],
+                    audio_service.allowed_extensions,
+                    audio_service.max_file_size,
+                )
+                job = submit_job(
+                    "trim_recording",
+                    {
+                        "child": child_name,
+                        "word": word_text,
+                        "year": year,
+                        "month": month,
+                        "day": day,
+                        **trim,
+                        "audio_dir": audio_service.audio_dir,
+                        "staged_path": staged_path,
+                        "filename": file.filename,
+                    },
+                )
+                return _job_accepted(job)
+            else:
+                # Save without trimming
+                filename = audio_service.save_audio_file(
+                    file, child_name, word_text, year, month, day
+                )
 
-        # Check for trimming parameters
-        trim_start = request.form.get("trimStart")
-        trim_end = request.form.get("trimEnd")
+            if not filename:
+                return jsonify({"error": "Failed to save audio"}), 500
+
+            previous = word.get_recording(year, month, day)
+            transaction.add_recording(child_name, word_text, year, month, day, filename)
+
+        # Released once committed, so a failed write leaves the data's file in place
+        if previous:
+            audio_service.delete_audio_file(child_name, word_text, previous.filename)
+
+        # Submitted once the recording is committed, so the job can attach its metadata
+        submit_job(
+            "analyze_recording",
+            {
+                "audio_dir": audio_service.audio_dir,
+                "child": child_name,
+                "word": word_text,
+                "year": year,
+                "month": month,
+                "day": day,
+                "filename": filename,
+            },
+        )
+        return jsonify({"year": year, "month": month, "day": day, "filename": filename})
 
-        audio_service = AudioService()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-        # If trimming parameters are provided, handle audio trimming
-        if trim_start is not None and trim_end is not None:
-            try:
-                start_time = float(trim_start)
-                end_time = float(trim_end)
 
-                if start_time < 0 or end_time <= start_time:
-                    return jsonify({"error": "Invalid trim times"}), 400
+@api.route("/children/<child_name>/recordings:import", methods=["POST"])
+def import_recordings(child_name: str) -> ResponseReturnValue:
+    """Import a ZIP or tar archive of <word>/<YYYY-MM-DD>.<ext> recordings"""
+    try:
+        if "archive" not in request.files:
+            return jsonify({"error": "No archive file provided"}), 400
 
-                filename = audio_service.save_audio_file_with_trim(
-                    file, child_name, word_text, year, month, day, start_time, end_time
-                )
-            except ValueError:
-                return jsonify({"error": "Invalid trim time format"}), 400
-        else:
-            # Save without trimming
-            filename = audio_service.save_audio_file(file, child_name, word_text, year, month, day)
-
-        if filename:
-            word.add_recording(year, month, day, filename)
-            data_service.save_child(child)
-            return jsonify({"year": year, "month": month, "day": day, "filename": filename})
-        else:
-            return jsonify({"error": "Failed to save audio"}), 500
+        file = request.files["archive"]
+        if file.filename == "":
+            return jsonify({"error": "No archive file selected"}), 400
 
+        report = import_archive(file.stream, child_name)
+        return jsonify(report.to_dict())
+    except LookupError:
+        return jsonify({"error": "Child not found"}), 404
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
     except Exception as e:
@@ -222,29 +415,176 @@ def upload_recording(child_name, word_text):
 
 
 @api.route("/audio/<child_name>/<word_text>/<filename>")
-def serve_audio(child_name, word_text, filename):
-    """Serve an audio file"""
+def serve_audio(child_name: str, word_text: str, filename: str) -> ResponseReturnValue:
+    """Serve an audio file, cached forever when content-addressed"""
     try:
         audio_service = AudioService()
         file_path = audio_service.get_audio_file_path(child_name, word_text, filename)
         if not file_path:
             return jsonify({"error": "Audio file not found"}), 404
 
-        return send_file(file_path)
+        return send_media(file_path, immutable=is_blob_name(filename))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@api.route("/audio/<child_name>/<word_text>/<filename>/peaks")
+def get_audio_peaks(child_name: str, word_text: str, filename: str) -> ResponseReturnValue:
+    """Get a recording's waveform as min/max peak pairs, for ?buckets= display columns"""
+    try:
+        file_path = AudioService().get_audio_file_path(child_name, word_text, filename)
+        if not file_path:
+            return jsonify({"error": "Audio file not found"}), 404
+
+        buckets = request.args.get("buckets", type=int)
+        response = jsonify(peaks_level(ensure_peaks(file_path), buckets))
+        return set_media_cache(response, immutable=is_blob_name(filename))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@api.route("/children/<child_name>/words/<word_text>/montage")
+def get_word_montage(child_name: str, word_text: str) -> ResponseReturnValue:
+    """Get a word's recordings joined in date order, built by a background job on first request"""
+    try:
+        child = DataService().get_child(child_name)
+        if not child:
+            return jsonify({"error": "Child not found"}), 404
+
+        word = child.get_word(word_text)
+        if not word:
+            return jsonify({"error": "Word not found"}), 404
+        if not word.recordings:
+            return jsonify({"error": "No recordings"}), 404
+
+        audio_service = AudioService()
+        gap = current_app.config["MONTAGE_GAP"]
+        key = montage_key(word, gap)
+        directory = montage_dir(audio_service.audio_dir, child_name, word_text)
+        path = find_montage(directory, key)
+        if path:
+            return send_media(path)
+
+        job = submit_job(
+            "build_montage",
+            {
+                "audio_dir": audio_service.audio_dir,
+                "child": child_name,
+                "word": word_text,
+                "key": key,
+                "filenames": [recording.filename for recording in word.recordings],
+                "gap": gap,
+            },
+        )
+        return _job_accepted(job)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+def _find_recording(
+    data_service: DataService, child_name: str, word_text: str, date: str
+) -> Optional[Recording]:
+    """Get a recording by child name, word text and YYYY-MM-DD date, if it still exists"""
+    child = data_service.get_child(child_name)
+    word = child.get_word(word_text) if child else None
+    if not word:
+        return None
+    year, month, day = (int(part) for part in date.split("-"))
+    return word.get_recording(year, month, day)
+
+
+@api.route("/children/<child_name>/words/<word_text>/similar")
+def get_similar_recordings(child_name: str, word_text: str) -> ResponseReturnValue:
+    """Rank recordings by how close they sound to one of the word's (?date=, latest by default)
+
+    ?scope=word (the default) compares with this word's recordings by every child,
+    ?scope=all with every recording in the library.
+    """
+    try:
+        data_service = DataService()
+        child = data_service.get_child(child_name)
+        if not child:
+            return jsonify({"error": "Child not found"}), 404
+
+        word = child.get_word(word_text)
+        if not word:
+            return jsonify({"error": "Word not found"}), 404
+        if not word.recordings:
+            return jsonify({"error": "No recordings"}), 404
+
+        recording = word.recordings[-1]
+        if "date" in request.args:
+            try:
+                from datetime import datetime
+
+                date_obj = datetime.strptime(request.args["date"], "%Y-%m-%d")
+            except ValueError:
+                return jsonify({"error": "Invalid date format. Use YYYY-MM-DD"}), 400
+            found = word.get_recording(date_obj.year, date_obj.month, date_obj.day)
+            if not found:
+                return jsonify({"error": "Recording not found"}), 404
+            recording = found
+
+        scope = request.args.get("scope", "word")
+        if scope not in ("word", "all"):
+            return jsonify({"error": "Invalid scope. Use word or all"}), 400
+        limit = max(1, min(request.args.get("limit", 10, type=int), MAX_SIMILAR_RECORDINGS))
+
+        audio_service = AudioService()
+        key = feature_key(child_name, word_text, recording)
+        scope_word = word_text if scope == "word" else None
+        matches = audio_service.features.nearest(key, scope_word, limit)
+        if matches is None:
+            # Recordings saved before features were extracted get theirs on first request
+            file_path = audio_service.get_audio_file_path(child_name, word_text, recording.filename)
+            if not file_path:
+                return jsonify({"error": "Audio file not found"}), 404
+            audio_service.features.put({key: extract_features(file_path)})
+            matches = audio_service.features.nearest(key, scope_word, limit)
+            if matches is None:
+                # The recording was removed, and its vector freed, in the meantime
+                return jsonify({"error": "Recording features not available"}), 503
+
+        results = []
+        for (match_child, match_word, match_date), distance in matches:
+            match = _find_recording(data_service, match_child, match_word, match_date)
+            if match:
+                results.append(
+                    {
+                        "child": match_child,
+                        "word": match_word,
+                        "date": match_date,
+                        "filename": match.filename,
+                        "distance": distance,
+                    }
+                )
+        return jsonify(
+            {
+                "child": child_name,
+                "word": word_text,
+                "date": recording.date_string,
+                "scope": scope,
+                "matches": results,
+            }
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
 @api.route("/images/<filename>")
-def serve_image(filename):
-    """Serve an image file"""
+def serve_image(filename: str) -> ResponseReturnValue:
+    """Serve an image file, cached forever when content-addressed"""
     try:
         image_service = ImageService()
         file_path = image_service.get_image_file_path(filename)
         if not file_path:
             return jsonify({"error": "Image file not found"}), 404
 
-        return send_file(file_path)
+        return send_media(file_path, immutable=is_blob_name(filename))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -253,7 +593,9 @@ def serve_image(filename):
     "/children/<child_name>/words/<word_text>/recordings/<int:year>/<int:month>/<int:day>",
     methods=["DELETE"],
 )
-def delete_recording(child_name, word_text, year, month, day):
+def delete_recording(
+    child_name: str, word_text: str, year: int, month: int, day: int
+) -> ResponseReturnValue:
     """Delete a recording for a specific date"""
     try:
         # Validate date by trying to create a date object
@@ -265,25 +607,27 @@ def delete_recording(child_name, word_text, year, month, day):
             return jsonify({"error": "Invalid date"}), 400
 
         data_service = DataService()
-        child = data_service.get_child(child_name)
-        if not child:
-            return jsonify({"error": "Child not found"}), 404
+        with data_service.transaction() as transaction:
+            child = transaction.get_child(child_name)
+            if not child:
+                return jsonify({"error": "Child not found"}), 404
 
-        word = child.get_word(word_text)
-        if not word:
-            return jsonify({"error": "Word not found"}), 404
+            word = child.get_word(word_text)
+            if not word:
+                return jsonify({"error": "Word not found"}), 404
 
-        recording = word.get_recording(year, month, day)
-        if not recording:
-            return jsonify({"error": "Recording not found"}), 404
+            recording = word.get_recording(year, month, day)
+            if not recording:
+                return jsonify({"error": "Recording not found"}), 404
 
-        # Delete the audio file
+            transaction.remove_recording(child_name, word_text, year, month, day)
+
+        # Delete the audio file once the recording is gone from the data; the montage
+        # without it is built on demand
         audio_service = AudioService()
         audio_service.delete_audio_file(child_name, word_text, recording.filename)
-
-        # Remove from word
-        word.remove_recording(year, month, day)
-        data_service.save_child(child)
+        remove_montages(audio_service.audio_dir, child_name, word_text)
+        audio_service.features.remove([feature_key(child_name, word_text, recording)])
 
         return jsonify({"message": "Recording deleted successfully"})
     except Exception as e:
@@ -291,30 +635,32 @@ def delete_recording(child_name, word_text, year, month, day):
 
 
 @api.route("/children/<child_name>/words/<word_text>", methods=["DELETE"])
-def delete_word(child_name, word_text):
+def delete_word(child_name: str, word_text: str) -> ResponseReturnValue:
     """Delete a word and all its recordings and images"""
     try:
         data_service = DataService()
-        child = data_service.get_child(child_name)
-        if not child:
-            return jsonify({"error": "Child not found"}), 404
+        with data_service.transaction() as transaction:
+            child = transaction.get_child(child_name)
+            if not child:
+                return jsonify({"error": "Child not found"}), 404
 
-        word = child.get_word(word_text)
-        if not word:
-            return jsonify({"error": "Word not found"}), 404
+            word = child.get_word(word_text)
+            if not word:
+                return jsonify({"error": "Word not found"}), 404
 
-        # Delete all audio files for this word
+            # Remove the word from the child
+            transaction.remove_word(child_name, word_text)
+
+        # Delete all audio files for this word once it is gone from the data
         audio_service = AudioService()
         for recording in word.recordings:
             audio_service.delete_audio_file(child_name, word_text, recording.filename)
+        remove_montages(audio_service.audio_dir, child_name, word_text)
+        audio_service.features.remove([(child_name, word_text, None)])
 
         # Delete the word image if it exists
         image_service = ImageService()
-        image_service.delete_image_file(word_text)
-
-        # Remove the word from the child
-        child.remove_word(word_text)
-        data_service.save_child(child)
+        image_service.delete_image_file(word_text, word.image_filename)
 
         return jsonify({"message": "Word deleted successfully"})
     except Exception as e:
@@ -322,7 +668,7 @@ def delete_word(child_name, word_text):
 
 
 @api.route("/search/images", methods=["GET"])
-def search_images():
+def search_images() -> ResponseReturnValue:
     """Search for images using external API"""
     try:
         query = request.args.get("q", "").strip()
@@ -346,11 +692,10 @@ def search_images():
 
 
 @api.route("/children/<child_name>/words/<word_text>/image/download", methods=["POST"])
-def download_word_image(child_name, word_text):
-    """Download an image from URL for a word"""
+def download_word_image(child_name: str, word_text: str) -> ResponseReturnValue:
+    """Download an image from URL for a word, processed by a background job"""
     try:
-        data_service = DataService()
-        child = data_service.get_child(child_name)
+        child = DataService().get_child(child_name)
         if not child:
             return jsonify({"error": "Child not found"}), 404
 
@@ -366,17 +711,27 @@ def download_word_image(child_name, word_text):
         if not image_url:
             return jsonify({"error": "Image URL cannot be empty"}), 400
 
-        # Download and save the image
-        image_search_service = ImageSearchService()
-        filename = image_search_service.download_image(image_url, word_text)
+        job = submit_job(
+            "download_image", {"child": child_name, "word": word_text, "image_url": image_url}
+        )
+        return _job_accepted(job)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-        if not filename:
-            return jsonify({"error": "Failed to download image"}), 500
 
-        # Update the word with the new image
-        word.image_filename = filename
-        data_service.save_child(child)
+@api.route("/jobs/<job_id>")
+def get_job(job_id: str) -> ResponseReturnValue:
+    """Get the status and result of a background job"""
+    job = get_job_runner().queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job.to_dict())
 
-        return jsonify({"message": "Image downloaded and saved successfully", "filename": filename})
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+
+def _job_accepted(job: Job) -> Response:
+    """Respond 202 with the job's status and where to poll it"""
+    status_url = url_for("api.get_job", job_id=job.id)
+    response = jsonify({"job_id": job.id, "status": job.status, "status_url": status_url})
+    response.status_code = 202
+    response.headers["Location"] = status_url
+    return response
@@ -0,0 +1,95 @@
+import hashlib
+import os
+from datetime import datetime, timezone
+from typing import Optional
+
+from flask import Response, request, send_file
+
+from config import get_project_version
+from services.repository import DataVersion
+
+# Versioned media URLs never change content, so they may be cached for a year
+MEDIA_MAX_AGE = 365 * 24 * 60 * 60
+
+
+def make_etag(version: DataVersion, scope: str) -> str:
+    """Build a strong ETag for one representation of versioned data
+
+    The scope names the representation (for example the endpoint and child), and the
+    app version is mixed in so that deploys invalidate cached pages.
+    """
+    key = f"{get_project_version()}:{scope}:{version.tag}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+
+
+def set_validators(response: Response, etag: str, version: DataVersion) -> Response:
+    """Attach ETag, Last-Modified and a revalidate-every-time cache policy"""
+    response.set_etag(etag)
+    response.last_modified = datetime.fromtimestamp(int(version.modified), tz=timezone.utc)
+    response.cache_control.no_cache = True
+    response.cache_control.private = True
+    return response
+
+
+def not_modified(version: Optional[DataVersion], scope: str) -> Optional[Response]:
+    """Get a 304 response if the client's cached copy is still current
+
+    Call this before loading or serializing anything, so unchanged polls cost only
+    a version lookup. Returns None when the full response must be sent.
+    """
+    if version is None:
+        return None
+
+    etag = make_etag(version, scope)
+    if not _is_fresh(etag, version.modified):
+        return None
+    return set_validators(Response(status=304), etag, version)
+
+
+def _is_fresh(etag: str, modified: float) -> bool:
+    """Check the request's If-None-Match, or else If-Modified-Since, against a resource"""
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since:
+        return int(modified) <= request.if_modified_since.timestamp()
+    return False
+
+
+def with_validators(response: Response, version: Optional[DataVersion], scope: str) -> Response:
+    """Attach cache validators to a full response when the data is versioned"""
+    if version is not None:
+        set_validators(response, make_etag(version, scope), version)
+    return response
+
+
+def send_media(file_path: str, immutable: bool = False) -> Response:
+    """Send a media file with Range support, a strong ETag and an explicit cache policy
+
+    The ETag comes from the file's size and modification time, so conditional requests
+    are answered from a stat alone and a 304 never opens the file. Range requests are
+    answered with 206 by reading only the requested bytes.
+    """
+    stat = os.stat(file_path)
+    etag = f"{stat.st_size:x}-{stat.st_mtime_ns:x}"
+
+    if _is_fresh(etag, stat.st_mtime):
+        response = Response(status=304)
+        response.set_etag(etag)
+        response.last_modified = datetime.fromtimestamp(int(stat.st_mtime), tz=timezone.utc)
+    else:
+        response = send_file(file_path, etag=etag, last_modified=stat.st_mtime, conditional=True)
+
+    return set_media_cache(response, immutable)
+
+
+def set_media_cache(response: Response, immutable: bool) -> Response:
+    """Cache a media response for a year when its URL names its content, else revalidate"""
+    if immutable:
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = MEDIA_MAX_AGE
+        response.cache_control.immutable = True
+    else:
+        # Other URLs can change content: cache, but revalidate every time
+        response.cache_control.no_cache = True
+    return response
@@ -1,5 +1,6 @@
-from flask import Blueprint, render_template
+from flask import Blueprint, make_response, render_template
 
+from routes.conditional import not_modified, with_validators
 from services.data_service import DataService
 
 web = Blueprint("web", __name__)
@@ -22,8 +23,16 @@ def index():
 def child_page(child_name):
     """Child-specific page"""
     data_service = get_data_service()
+    version = data_service.get_version(child_name)
+    scope = f"web:child:{child_name}"
+    cached = not_modified(version, scope)
+    if cached:
+        return cached
+
     child = data_service.get_child(child_name)
     if not child:
         return render_template("error.html", message="Child not found"), 404
 
-    return render_template("child.html", child=child)
+    return with_validators(
+        make_response(render_template("child.html", child=child)), version, scope
+    )
@@ -0,0 +1,260 @@
+import io
+import os
+import tarfile
+import tempfile
+import unicodedata
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import IO, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+from pydub import AudioSegment
+from werkzeug.datastructures import FileStorage
+
+from config import Config
+from models.recording import AudioMetadata
+from models.word import Word
+from services.audio_metadata import analyze_if_possible
+from services.audio_service import AudioService
+from services.data_service import DataService
+from services.normalization import normalize_new_recording
+
+# Format that entries with an unsupported extension are transcoded to
+TRANSCODE_FORMAT = "ogg"
+
+
+@dataclass
+class ArchiveEntry:
+    """An audio file found in an import archive, staged on local disk"""
+
+    name: str
+    word: str
+    date: date
+    extension: str
+    staged_path: str
+
+
+@dataclass
+class ImportReport:
+    """Outcome of importing an archive of recordings"""
+
+    imported: List[dict] = field(default_factory=list)
+    failed: List[dict] = field(default_factory=list)
+    words_created: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        """Convert to dictionary for JSON serialization"""
+        return {
+            "imported": self.imported,
+            "failed": self.failed,
+            "words_created": self.words_created,
+        }
+
+
+def parse_entry_name(name: str) -> Tuple[str, date, str]:
+    """Get the word, date and extension of a `<word>/<YYYY-MM-DD>.<ext>` entry name
+
+    Leading folders are ignored, so archives of a whole export folder work too.
+    """
+    parts = [part for part in name.replace("\\", "/").split("/") if part]
+    if len(parts) < 2 or "." not in parts[-1]:
+        raise ValueError("Expected <word>/<YYYY-MM-DD>.<ext>")
+    # Archives made on macOS store decomposed unicode names
+    word = unicodedata.normalize("NFC", parts[-2]).strip()
+    stem, extension = parts[-1].rsplit(".", 1)
+    try:
+        recorded = datetime.strptime(stem, "%Y-%m-%d").date()
+    except ValueError:
+        raise ValueError("File name must be a YYYY-MM-DD date") from None
+    if not word:
+        raise ValueError("Word folder name is empty")
+    return word, recorded, extension.lower()
+
+
+def _iter_members(archive: IO[bytes]) -> Iterator[Tuple[str, int, IO[bytes]]]:
+    """Stream the regular files of a ZIP or tar archive as (name, size, stream)"""
+    if zipfile.is_zipfile(archive):
+        archive.seek(0)
+        with zipfile.ZipFile(archive) as zf:
+            for info in zf.infolist():
+                if not info.is_dir():
+                    with zf.open(info) as stream:
+                        yield info.filename, info.file_size, stream
+        return
+
+    archive.seek(0)
+    try:
+        # Stream mode reads members sequentially without seeking back
+        with tarfile.open(fileobj=archive, mode="r|*") as tf:
+            for member in tf:
+                extracted = tf.extractfile(member) if member.isfile() else None
+                if extracted is not None:
+                    yield member.name, member.size, extracted
+    except tarfile.ReadError:
+        raise ValueError("Archive must be a ZIP or tar file") from None
+
+
+def _stage(stream: IO[bytes], path: str, size: int, max_size: int) -> None:
+    """Copy an archive member to disk, refusing members over the audio size limit"""
+    too_large = ValueError(f"File too large. Maximum size: {max_size / 1024 / 1024:.1f}MB")
+    if size > max_size:
+        raise too_large
+    with open(path, "wb") as f:
+        # Declared sizes can lie, so never copy more than the limit
+        copied = f.write(stream.read(max_size + 1))
+    if copied > max_size:
+        os.unlink(path)
+        raise too_large
+
+
+def _import_entry(
+    audio_dir: str, child_name: str, entry: ArchiveEntry
+) -> Tuple[str, Optional[AudioMetadata], Optional[np.ndarray]]:
+    """Save one staged entry with the AudioService rules, transcoding if needed
+
+    Runs in a worker process, which also brings the recording to the target loudness and
+    the storage codec, probes it and computes its waveform peaks and features, and
+    returns the stored filename with the metadata and features.
+    """
+    audio_service = AudioService(audio_dir)
+    year, month, day = entry.date.year, entry.date.month, entry.date.day
+
+    if entry.extension in audio_service.allowed_extensions:
+        with open(entry.staged_path, "rb") as f:
+            file = FileStorage(stream=f, filename=f"{entry.date}.{entry.extension}")
+            filename = audio_service.save_audio_file(file, child_name, entry.word, year, month, day)
+    else:
+        try:
+            audio = AudioSegment.from_file(entry.staged_path, format=entry.extension)
+        except Exception as e:
+            raise ValueError(f"Unsupported audio file: {e}") from None
+        buffer = io.BytesIO()
+        audio.export(buffer, format=TRANSCODE_FORMAT)
+        buffer.seek(0)
+        file = FileStorage(stream=buffer, filename=f"{entry.date}.{TRANSCODE_FORMAT}")
+        filename = audio_service.save_audio_file(file, child_name, entry.word, year, month, day)
+    if not filename:
+        raise RuntimeError("Failed to save audio")
+
+    filename, metadata, features = normalize_new_recording(
+        audio_service, child_name, entry.word, filename, convert=True
+    )
+    if metadata is None:
+        # Files this host can't decode are still probed, and left for the library-wide run
+        path = audio_service.get_audio_file_path(child_name, entry.word, filename)
+        metadata = analyze_if_possible(path)
+    return filename, metadata, features
+
+
+def import_archive(
+    archive: IO[bytes],
+    child_name: str,
+    data_service: Optional[DataService] = None,
+    audio_dir: Optional[str] = None,
+    workers: Optional[int] = None,
+) -> ImportReport:
+    """Import an archive of `<word>/<YYYY-MM-DD>.<ext>` recordings for a child
+
+    Entries are streamed to a staging directory and saved by a process pool while the
+    archive is still being read. Missing words are created, and every recording is
+    registered with one data store write once all files are saved.
+    """
+    data_service = data_service or DataService()
+    if data_service.get_child(child_name) is None:
+        raise LookupError(f"Child not found: {child_name}")
+
+    audio_dir = audio_dir or AudioService().audio_dir
+    max_size = Config.MAX_AUDIO_SIZE
+    report = ImportReport()
+    seen: Set[Tuple[str, date]] = set()
+    pending: Dict[Future, ArchiveEntry] = {}
+    saved: List[Tuple[ArchiveEntry, str, Optional[AudioMetadata], Optional[np.ndarray]]] = []
+
+    def collect(futures: Iterable[Future]) -> None:
+        for future in futures:
+            entry = pending.pop(future)
+            try:
+                saved.append((entry, *future.result()))
+            except Exception as e:
+                report.failed.append({"name": entry.name, "error": str(e)})
+
+    with tempfile.TemporaryDirectory() as staging, ProcessPoolExecutor(workers) as pool:
+        # Bound the number of staged entries waiting for a worker
+        max_pending = 2 * (workers or os.cpu_count() or 1)
+        for index, (name, size, stream) in enumerate(_iter_members(archive)):
+            if os.path.basename(name).startswith(".") or name.startswith("__MACOSX/"):
+                continue
+            try:
+                word, recorded, extension = parse_entry_name(name)
+                if (word, recorded) in seen:
+                    raise ValueError("Duplicate recording for this word and date")
+                staged_path = os.path.join(staging, f"{index}.{extension}")
+                _stage(stream, staged_path, max(size, 0), max_size)
+            except ValueError as e:
+                report.failed.append({"name": name, "error": str(e)})
+                continue
+            seen.add((word, recorded))
+
+            entry = ArchiveEntry(name, word, recorded, extension, staged_path)
+            pending[pool.submit(_import_entry, audio_dir, child_name, entry)] = entry
+
+            if len(pending) >= max_pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+        collect(list(pending))
+
+    audio_service = AudioService(audio_dir)
+    replaced = []
+    try:
+        with data_service.transaction() as transaction:
+            child = transaction.get_child(child_name)
+            if child is None:
+                raise LookupError(f"Child not found: {child_name}")
+            for entry, filename, metadata, _ in saved:
+                existing = child.get_word(entry.word)
+                if existing is None:
+                    transaction.add_word(child_name, Word(entry.word))
+                    report.words_created.append(entry.word)
+                recorded = entry.date
+                previous = (
+                    existing.get_recording(recorded.year, recorded.month, recorded.day)
+                    if existing
+                    else None
+                )
+                transaction.add_recording(
+                    child_name,
+                    entry.word,
+                    recorded.year,
+                    recorded.month,
+                    recorded.day,
+                    filename,
+                    metadata,
+                )
+                if previous:
+                    replaced.append((entry.word, previous.filename))
+                report.imported.append(
+                    {"name": entry.name, "word": entry.word, "filename": filename}
+                )
+    except BaseException:
+        # Nothing was registered: the saved files belong to no recording
+        for entry, filename, *_ in saved:
+            audio_service.delete_audio_file(child_name, entry.word, filename)
+        raise
+
+    # Release the replaced files only once no stored recording points at them
+    for word_text, filename in replaced:
+        audio_service.delete_audio_file(child_name, word_text, filename)
+
+    # Recordings this host couldn't describe lose the features of the ones they replaced
+    vectors, undescribed = {}, []
+    for entry, _, _, vector in saved:
+        key = (child_name, entry.word, entry.date.isoformat())
+        if vector is None:
+            undescribed.append(key)
+        else:
+            vectors[key] = vector
+    audio_service.features.remove(undescribed)
+    audio_service.features.put(vectors)
+    return report
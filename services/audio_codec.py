@@ -0,0 +1,80 @@
+import json
+import os
+import shutil
+import subprocess
+from typing import Optional
+
+# Recordings are stored as Opus in Ogg: speech stays clear at a few dozen kbit/s
+CANONICAL_CODEC = "opus"
+CANONICAL_EXTENSION = "ogg"
+
+
+def probe_codec(path: str) -> Optional[str]:
+    """Get the codec name of a file's first audio stream"""
+    try:
+        output = subprocess.run(
+            [
+                "ffprobe",
+                "-v",
+                "error",
+                "-select_streams",
+                "a:0",
+                "-show_entries",
+                "stream=codec_name",
+                "-of",
+                "json",
+                path,
+            ],
+            check=True,
+            capture_output=True,
+        ).stdout
+        codec: str = json.loads(output)["streams"][0]["codec_name"]
+        return codec
+    except (subprocess.CalledProcessError, KeyError, IndexError, ValueError):
+        return None
+
+
+def transcode_to_canonical(
+    source_path: str, extension: str, target_path: str, bitrate: str
+) -> bool:
+    """Write a smaller Opus/Ogg version of an audio file, if there is one to be had
+
+    Opus in another container is remuxed without re-encoding, so nothing is lost.
+    Returns False, leaving the target alone or empty, when the file is canonical
+    already, when the result would not be smaller, or when ffmpeg is unavailable.
+    """
+    if not shutil.which("ffmpeg") or not shutil.which("ffprobe"):
+        return False
+
+    codec = probe_codec(source_path)
+    if codec is None or (codec == CANONICAL_CODEC and extension == CANONICAL_EXTENSION):
+        return False
+    if codec == CANONICAL_CODEC:
+        codec_args = ["-c:a", "copy"]
+    else:
+        codec_args = ["-c:a", "libopus", "-b:a", bitrate, "-application", "voip"]
+
+    try:
+        subprocess.run(
+            [
+                "ffmpeg",
+                "-v",
+                "error",
+                "-y",
+                "-i",
+                source_path,
+                "-map",
+                "0:a:0",
+                "-map_metadata",
+                "-1",
+                *codec_args,
+                "-f",
+                "ogg",
+                target_path,
+            ],
+            check=True,
+            capture_output=True,
+        )
+    except (subprocess.CalledProcessError, OSError):
+        return False
+    return 0 < os.path.getsize(target_path) < os.path.getsize(source_path)
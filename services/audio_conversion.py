@@ -0,0 +1,121 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, replace
+from typing import List, Optional, Tuple
+
+from config import Config
+from models.recording import AudioMetadata, Recording
+from services.audio_codec import CANONICAL_EXTENSION, transcode_to_canonical
+from services.audio_metadata import analyze_if_possible
+from services.audio_service import AudioService
+from services.blob_store import BlobStore
+from services.data_service import DataService
+from services.library import chunk_size, library_files, recordings_by_file
+
+
+@dataclass
+class ConversionReport:
+    """Outcome of converting existing recordings to the storage codec"""
+
+    converted: int = 0
+    kept: int = 0
+    bytes_before: int = 0
+    bytes_after: int = 0
+    failed: List[Tuple[str, str]] = field(default_factory=list)
+
+    @property
+    def bytes_saved(self) -> int:
+        """Bytes freed on disk, and no longer served, by the converted files"""
+        return self.bytes_before - self.bytes_after
+
+
+def _convert(task: Tuple[str, str, str]) -> Optional[str]:
+    """Transcode one file to a temporary path in the blob store, or None to keep it"""
+    source_path, blob_root, bitrate = task
+    extension = os.path.splitext(source_path)[1].lstrip(".").lower()
+    target = BlobStore(blob_root).temp_path(CANONICAL_EXTENSION)
+    if transcode_to_canonical(source_path, extension, target, bitrate):
+        return target
+    os.unlink(target)
+    return None
+
+
+def switch_recording_files(
+    data_service: DataService,
+    audio_service: AudioService,
+    switches: List[Tuple[str, str, Recording, str, Optional[AudioMetadata]]],
+) -> int:
+    """Point recordings at new files with one write, and release their old files
+
+    Each switch names a child, word, recording, the stored file replacing the
+    recording's (holding one reference for it) and the new file's metadata. Recordings
+    replaced since they were read keep their file, and the reference is released.
+    Returns the number of recordings switched.
+    """
+    switched = []
+    with data_service.transaction() as transaction:
+        for child_name, word_text, recording, name, metadata in switches:
+            child = transaction.get_child(child_name)
+            word = child.get_word(word_text) if child else None
+            date = (recording.year, recording.month, recording.day)
+            current = word.get_recording(*date) if word else None
+            if current is None or current.filename != recording.filename:
+                audio_service.blobs.release(name)
+                continue
+            transaction.add_recording(child_name, word_text, *date, name, metadata)
+            switched.append((child_name, word_text, recording.filename))
+
+    # Release the old files only once no stored recording points at them
+    for child_name, word_text, filename in switched:
+        audio_service.delete_audio_file(child_name, word_text, filename)
+    return len(switched)
+
+
+def convert_library(
+    data_service: Optional[DataService] = None,
+    audio_service: Optional[AudioService] = None,
+    workers: Optional[int] = None,
+    bitrate: Optional[str] = None,
+) -> ConversionReport:
+    """Transcode every stored recording to Opus/Ogg on a process pool, where that saves space
+
+    Files shared by several recordings are converted once. Recordings are switched to
+    their new files with one data store write, unless they were replaced meanwhile, and
+    their metadata is probed again.
+    """
+    data_service = data_service or DataService()
+    audio_service = audio_service or AudioService()
+    bitrate = bitrate or Config.AUDIO_OPUS_BITRATE
+    report = ConversionReport()
+
+    users = recordings_by_file(library_files(data_service, audio_service, report.failed))
+    if not users:
+        return report
+
+    paths = list(users)
+    with ProcessPoolExecutor(workers) as pool:
+        tasks = [(path, audio_service.blobs.root, bitrate) for path in paths]
+        converted = pool.map(_convert, tasks, chunksize=chunk_size(len(tasks), workers))
+        names = {}
+        for path, target in zip(paths, converted):
+            if target is None:
+                report.kept += len(users[path])
+                continue
+            report.bytes_before += os.path.getsize(path)
+            report.bytes_after += os.path.getsize(target)
+            names[path] = audio_service.blobs.put_file(target, CANONICAL_EXTENSION)
+            audio_service.blobs.retain(names[path], len(users[path]) - 1)
+        # Probe the new files in the same pool, so their metadata describes what is stored
+        new_paths = [audio_service.blobs.path(name) for name in names.values()]
+        probed = pool.map(analyze_if_possible, new_paths, chunksize=chunk_size(len(names), workers))
+        metadata = dict(zip(names, probed))
+
+    switches = []
+    for path, name in names.items():
+        for child_name, word_text, recording in users[path]:
+            # Transcoding keeps the loudness, and so the normalization gain
+            stored = metadata[path]
+            new_metadata = stored and replace(stored, gain=recording.gain)
+            switches.append((child_name, word_text, recording, name, new_metadata))
+    report.converted = switch_recording_files(data_service, audio_service, switches)
+    return report
@@ -0,0 +1,165 @@
+import json
+import math
+import os
+import shutil
+import subprocess
+import wave
+from dataclasses import dataclass, field, replace
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from models.recording import AudioMetadata
+from services.audio_service import AudioService
+from services.data_service import DataService
+from services.library import library_files, map_on_pool
+from services.waveform import read_pcm, to_mono, write_peaks
+
+
+def read_header(audio_path: str) -> Optional[dict]:
+    """Read duration and stream format from the file's headers, without decoding it"""
+    try:
+        with wave.open(audio_path, "rb") as f:
+            width, rate = f.getsampwidth(), f.getframerate()
+            return {
+                "duration": round(f.getnframes() / rate, 3),
+                "codec": f"pcm_{'u' if width == 1 else 's'}{8 * width}le",
+                "sample_rate": rate,
+                "channels": f.getnchannels(),
+            }
+    except (wave.Error, EOFError):
+        pass
+
+    if not shutil.which("ffprobe"):
+        return None
+    try:
+        output = subprocess.run(
+            [
+                "ffprobe",
+                "-v",
+                "error",
+                "-select_streams",
+                "a:0",
+                "-show_entries",
+                "format=duration:stream=codec_name,sample_rate,channels",
+                "-of",
+                "json",
+                audio_path,
+            ],
+            check=True,
+            capture_output=True,
+        ).stdout
+        info = json.loads(output)
+        stream = info["streams"][0]
+        return {
+            "duration": round(float(info["format"]["duration"]), 3),
+            "codec": stream["codec_name"],
+            "sample_rate": int(stream["sample_rate"]),
+            "channels": int(stream["channels"]),
+        }
+    except (subprocess.CalledProcessError, KeyError, IndexError, ValueError):
+        return None
+
+
+def rms_dbfs(frames: np.ndarray) -> Optional[float]:
+    """Get the RMS level of samples in dBFS, or None for digital silence"""
+    if frames.size == 0:
+        return None
+    rms = float(np.sqrt(np.mean(np.square(frames, dtype=np.float64))))
+    return round(20 * math.log10(rms), 2) if rms > 0 else None
+
+
+def analyze_recording(
+    audio_path: str, pcm: Optional[Tuple[np.ndarray, int]] = None
+) -> AudioMetadata:
+    """Probe a recording's metadata and store its waveform peaks, decoding it at most once
+
+    Duration and format come from the headers when they can be read, and from the
+    decoded audio otherwise. Loudness needs the decoded audio and is None without it.
+    Callers that already decoded the file pass its frames and rate as pcm.
+    Raises ValueError when the file can neither be probed nor decoded.
+    """
+    header = read_header(audio_path)
+    try:
+        frames, rate = pcm or read_pcm(audio_path)
+    except ValueError:
+        if header is None:
+            raise
+        return AudioMetadata(**header)
+
+    write_peaks(audio_path, to_mono(frames), rate)
+    if header is None:
+        header = {
+            "duration": round(len(frames) / rate, 3),
+            "codec": os.path.splitext(audio_path)[1].lstrip(".").lower(),
+            "sample_rate": rate,
+            "channels": frames.shape[1],
+        }
+    return AudioMetadata(**header, loudness=rms_dbfs(frames))
+
+
+def analyze_if_possible(audio_path: Optional[str]) -> Optional[AudioMetadata]:
+    """Analyze an audio file, or get None when this host can neither probe nor decode it"""
+    if not audio_path:
+        return None
+    try:
+        return analyze_recording(audio_path)
+    except ValueError:
+        return None
+
+
+@dataclass
+class BackfillReport:
+    """Outcome of probing existing recordings"""
+
+    updated: int = 0
+    failed: List[Tuple[str, str]] = field(default_factory=list)
+
+
+def backfill_metadata(
+    data_service: Optional[DataService] = None,
+    audio_service: Optional[AudioService] = None,
+    workers: Optional[int] = None,
+    force: bool = False,
+) -> BackfillReport:
+    """Probe every recording without metadata (or all with force) on a process pool
+
+    Results are stored with one data store write. Recordings replaced while the
+    backfill ran keep the metadata of their new file.
+    """
+    data_service = data_service or DataService()
+    audio_service = audio_service or AudioService()
+    report = BackfillReport()
+
+    targets = list(
+        library_files(
+            data_service,
+            audio_service,
+            report.failed,
+            skip=None if force else lambda child, word, recording: recording.metadata is not None,
+        )
+    )
+    if not targets:
+        return report
+
+    results = map_on_pool(analyze_if_possible, [path for *_, path in targets], workers)
+
+    with data_service.transaction() as transaction:
+        for (child_name, word_text, recording, _), metadata in zip(targets, results):
+            if metadata is None:
+                report.failed.append((recording.filename, "Audio file could not be read"))
+                continue
+            if recording.metadata is not None:
+                # Probing again doesn't undo normalization
+                metadata = replace(metadata, gain=recording.metadata.gain)
+            if transaction.set_recording_metadata(
+                child_name,
+                word_text,
+                recording.year,
+                recording.month,
+                recording.day,
+                recording.filename,
+                metadata,
+            ):
+                report.updated += 1
+    return report
@@ -2,18 +2,32 @@ import os
 import tempfile
 from typing import List, Optional
 
+import numpy as np
 from pydub import AudioSegment
 from werkzeug.datastructures import FileStorage
 from werkzeug.utils import secure_filename
 
 from config import Config
+from services.audio_codec import CANONICAL_CODEC, CANONICAL_EXTENSION, transcode_to_canonical
+from services.audio_trim import trim_copy
+from services.blob_store import BlobStore, is_blob_name, remove_sidecars
+from services.feature_store import FeatureStore
+from services.silence import find_sound
+from services.waveform import read_wav, segment_pcm, to_mono
+
+# pydub export formats of the stored file extensions
+EXPORT_FORMATS = {"mp3": "mp3", "wav": "wav", "ogg": "ogg", "m4a": "mp4"}
 
 
 class AudioService:
     """Service for managing audio files"""
 
-    def __init__(self):
-        self.audio_dir = Config.AUDIO_DIR
+    def __init__(self, audio_dir: Optional[str] = None):
+        self.audio_dir = audio_dir or Config.AUDIO_DIR
+        # Recordings are stored by content hash; date-named files are from older versions
+        self.blobs = BlobStore(os.path.join(self.audio_dir, ".blobs"))
+        # Acoustic features of recordings, by child, word and date, for comparing them
+        self.features = FeatureStore(os.path.join(self.audio_dir, ".features"))
         self.allowed_extensions = Config.ALLOWED_AUDIO_EXTENSIONS
         self.max_file_size = Config.MAX_AUDIO_SIZE
 
@@ -21,6 +35,47 @@ class AudioService:
         """Check if file extension is allowed"""
         return "." in filename and filename.rsplit(".", 1)[1].lower() in self.allowed_extensions
 
+    def _check_upload(self, file: FileStorage) -> str:
+        """Check an uploaded file's type and size and return its extension"""
+        filename = file.filename or ""
+        if not self._allowed_file(filename):
+            raise ValueError(
+                f"File type not allowed. Allowed types: " f"{', '.join(self.allowed_extensions)}"
+            )
+
+        # Check file size
+        file.seek(0, 2)  # Seek to end
+        file_size = file.tell()
+        file.seek(0)  # Reset to beginning
+
+        if file_size > self.max_file_size:
+            max_size_mb = self.max_file_size / 1024 / 1024
+            raise ValueError(f"File too large. Maximum size: {max_size_mb:.1f}MB")
+
+        return filename.rsplit(".", 1)[1].lower()
+
+    def _store(self, path: str, extension: str) -> str:
+        """Put an audio file into the store, in the storage codec when that makes it smaller"""
+        return self.store_transcoded(path, extension) or self.blobs.put_file(path, extension)
+
+    def store_transcoded(self, path: str, extension: Optional[str] = None) -> Optional[str]:
+        """Store an audio file in the storage codec, taking a reference, and return its name
+
+        Returns None when the file is better kept as it is: the storage codec is
+        "original", the file is canonical already, or transcoding would not shrink it.
+        """
+        if Config.AUDIO_STORAGE_CODEC != CANONICAL_CODEC:
+            return None
+        extension = extension or os.path.splitext(path)[1].lstrip(".").lower()
+        target = self.blobs.temp_path(CANONICAL_EXTENSION)
+        try:
+            if transcode_to_canonical(path, extension, target, Config.AUDIO_OPUS_BITRATE):
+                return self.blobs.put_file(target, CANONICAL_EXTENSION)
+        finally:
+            if os.path.exists(target):
+                os.unlink(target)
+        return None
+
     def _get_audio_path(
         self, child_name: str, word: str, year: int, month: int, day: int, extension: str
     ) -> str:
@@ -49,35 +104,24 @@ class AudioService:
     def save_audio_file(
         self, file: FileStorage, child_name: str, word: str, year: int, month: int, day: int
     ) -> Optional[str]:
-        """Save an audio file and return the filename"""
+        """Save an audio file as it was sent and return the filename
+
+        Transcoding to the storage codec is left to the analyze_recording job, so the
+        request doesn't wait for ffmpeg.
+        """
         if not file or not file.filename:
             return None
 
-        if not self._allowed_file(file.filename):
-            raise ValueError(
-                f"File type not allowed. Allowed types: " f"{', '.join(self.allowed_extensions)}"
-            )
-
-        # Check file size
-        file.seek(0, 2)  # Seek to end
-        file_size = file.tell()
-        file.seek(0)  # Reset to beginning
-
-        if file_size > self.max_file_size:
-            max_size_mb = self.max_file_size / 1024 / 1024
-            raise ValueError(f"File too large. Maximum size: {max_size_mb:.1f}MB")
-
-        # Get file extension
-        extension = file.filename.rsplit(".", 1)[1].lower()
-
-        # Create the file path
-        file_path = self._get_audio_path(child_name, word, year, month, day, extension)
+        extension = self._check_upload(file)
 
-        # Save the file
-        file.save(file_path)
-
-        # Return just the filename for storage in data
-        return f"{year}-{month:02d}-{day:02d}.{extension}"
+        # Save the file into the content-addressed store
+        temp_path = self.blobs.temp_path(extension)
+        try:
+            file.save(temp_path)
+            return self.blobs.put_file(temp_path, extension)
+        finally:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
 
     def save_audio_file_with_trim(
         self,
@@ -94,31 +138,85 @@ class AudioService:
         if not file or not file.filename:
             return None
 
-        if not self._allowed_file(file.filename):
-            raise ValueError(
-                f"File type not allowed. Allowed types: " f"{', '.join(self.allowed_extensions)}"
-            )
+        extension = self._check_upload(file)
 
-        # Check file size
-        file.seek(0, 2)  # Seek to end
-        file_size = file.tell()
-        file.seek(0)  # Reset to beginning
+        # Create temporary file to save the original
+        with tempfile.NamedTemporaryFile(suffix=f".{extension}", delete=False) as temp_file:
+            file.save(temp_file.name)
+            temp_path = temp_file.name
 
-        if file_size > self.max_file_size:
-            max_size_mb = self.max_file_size / 1024 / 1024
-            raise ValueError(f"File too large. Maximum size: {max_size_mb:.1f}MB")
+        try:
+            return self._trim_to_blob(temp_path, extension, start_time, end_time)
+        except Exception as e:
+            raise ValueError(f"Error processing audio: {str(e)}")
+        finally:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
 
-        # Get file extension
-        extension = file.filename.rsplit(".", 1)[1].lower()
+    def save_audio_file_with_auto_trim(
+        self, file: FileStorage, child_name: str, word: str, year: int, month: int, day: int
+    ) -> Optional[str]:
+        """Save an audio file without its leading and trailing silence and return the filename"""
+        if not file or not file.filename:
+            return None
+
+        extension = self._check_upload(file)
 
-        # Create temporary file to save the original
         with tempfile.NamedTemporaryFile(suffix=f".{extension}", delete=False) as temp_file:
             file.save(temp_file.name)
             temp_path = temp_file.name
 
         try:
+            # Decode once: the silence search and a re-encoding cut share the samples
+            audio = None
+            pcm = read_wav(temp_path)
+            if pcm is None:
+                audio = AudioSegment.from_file(temp_path)
+                pcm = segment_pcm(audio)
+            frames, rate = pcm
+
+            span = find_sound(
+                to_mono(frames),
+                rate,
+                Config.AUTO_TRIM_THRESHOLD,
+                Config.AUTO_TRIM_WINDOW,
+                Config.AUTO_TRIM_PADDING,
+            )
+            if span is None or (span[0] == 0 and span[1] >= len(frames) / rate):
+                # Silent throughout, or no silence at the ends: keep the file as it is
+                return self._store(temp_path, extension)
+            return self._trim_to_blob(temp_path, extension, span[0], span[1], audio)
+        except Exception as e:
+            raise ValueError(f"Error processing audio: {str(e)}")
+        finally:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+
+    def _trim_to_blob(
+        self,
+        source_path: str,
+        extension: str,
+        start_time: float,
+        end_time: float,
+        audio: Optional[AudioSegment] = None,
+    ) -> str:
+        """Store the span of an audio file between two times, reusing its decoded audio if given"""
+        # Cut without decoding when the format allows: faster, and lossless
+        file_path = self.blobs.temp_path(extension)
+        try:
+            if trim_copy(
+                source_path,
+                file_path,
+                extension,
+                start_time,
+                end_time,
+                Config.TRIM_SNAP_TOLERANCE,
+            ):
+                return self._store(file_path, extension)
+
             # Load audio with pydub
-            audio = AudioSegment.from_file(temp_path)
+            if audio is None:
+                audio = AudioSegment.from_file(source_path)
 
             # Convert times to milliseconds
             start_ms = int(start_time * 1000)
@@ -135,45 +233,48 @@ class AudioService:
             # Trim the audio
             trimmed_audio = audio[start_ms:end_ms]
 
-            # Create the file path
-            file_path = self._get_audio_path(child_name, word, year, month, day, extension)
-
-            # Export the trimmed audio
-            # Use the original format for export
-            if extension in ["mp3"]:
-                trimmed_audio.export(file_path, format="mp3")
-            elif extension in ["wav"]:
-                trimmed_audio.export(file_path, format="wav")
-            elif extension in ["ogg"]:
-                trimmed_audio.export(file_path, format="ogg")
-            elif extension in ["m4a"]:
-                trimmed_audio.export(file_path, format="mp4")
-            elif extension in ["webm"]:
-                # WebM is not directly supported by pydub, convert to ogg
-                ogg_path = file_path.replace(".webm", ".ogg")
-                trimmed_audio.export(ogg_path, format="ogg")
-                # Update the extension and filename
-                extension = "ogg"
-                file_path = ogg_path
-            else:
-                # Default to wav for unsupported formats
-                wav_path = file_path.replace(f".{extension}", ".wav")
-                trimmed_audio.export(wav_path, format="wav")
-                extension = "wav"
-                file_path = wav_path
-
-            # Return just the filename for storage in data
-            return f"{year}-{month:02d}-{day:02d}.{extension}"
-
-        except Exception as e:
-            raise ValueError(f"Error processing audio: {str(e)}")
+            return self._export(trimmed_audio, extension)
         finally:
-            # Clean up temporary file
-            if os.path.exists(temp_path):
-                os.unlink(temp_path)
+            if os.path.exists(file_path):
+                os.unlink(file_path)
+
+    def _export(self, audio: AudioSegment, extension: str) -> str:
+        """Encode decoded audio in the format of an extension and store it"""
+        if extension == "webm":
+            # WebM is not directly supported by pydub, convert to ogg
+            extension = "ogg"
+        elif extension not in EXPORT_FORMATS:
+            # Default to wav for unsupported formats
+            extension = "wav"
+
+        file_path = self.blobs.temp_path(extension)
+        try:
+            audio.export(file_path, format=EXPORT_FORMATS[extension])
+            return self._store(file_path, extension)
+        finally:
+            if os.path.exists(file_path):
+                os.unlink(file_path)
+
+    def store_pcm(self, frames: np.ndarray, rate: int, extension: str) -> str:
+        """Store float frames as a new audio file, taking a reference, and return its name
+
+        The audio follows the storage codec, or with "original" the format of the
+        extension it was decoded from.
+        """
+        samples = np.clip(np.round(frames * 32767), -32768, 32767).astype("<i2")
+        audio = AudioSegment(
+            data=samples.tobytes(), sample_width=2, frame_rate=rate, channels=frames.shape[1]
+        )
+        if Config.AUDIO_STORAGE_CODEC == CANONICAL_CODEC:
+            # Lossless until _store transcodes it
+            extension = "wav"
+        return self._export(audio, extension)
 
     def get_audio_file_path(self, child_name: str, word: str, filename: str) -> Optional[str]:
         """Get the full path to an audio file"""
+        if self.blobs.exists(filename):
+            return self.blobs.path(filename)
+
         child_dir = os.path.join(self.audio_dir, secure_filename(child_name))
         word_dir = os.path.join(child_dir, secure_filename(word))
         file_path = os.path.join(word_dir, filename)
@@ -183,10 +284,14 @@ class AudioService:
         return None
 
     def delete_audio_file(self, child_name: str, word: str, filename: str) -> bool:
-        """Delete an audio file"""
+        """Delete an audio file, or release this recording's reference to a stored blob"""
+        if is_blob_name(filename):
+            return self.blobs.release(filename)
+
         file_path = self.get_audio_file_path(child_name, word, filename)
         if file_path and os.path.exists(file_path):
             os.remove(file_path)
+            remove_sidecars(file_path)
 
             # Clean up empty directories
             word_dir = os.path.dirname(file_path)
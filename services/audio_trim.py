@@ -0,0 +1,217 @@
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import wave
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+# ffmpeg muxers for the containers that can be trimmed by copying packets
+MUXERS = {"webm": "webm", "ogg": "ogg", "mp3": "mp3", "m4a": "ipod"}
+
+# Encoders for re-encoding the edges of a cut, by ffprobe codec name; the encoded edges
+# must be joinable with copied packets, so only the codec's own encoder will do
+EDGE_ENCODERS = {"opus": "libopus", "vorbis": "libvorbis", "mp3": "libmp3lame", "aac": "aac"}
+
+WAV_CHUNK_FRAMES = 64 * 1024
+
+
+@dataclass(frozen=True)
+class TrimPlan:
+    """How to cut a span out of a stream: packets to copy plus edges to re-encode"""
+
+    copy_start: float
+    copy_end: float
+    head: Optional[Tuple[float, float]] = None
+    tail: Optional[Tuple[float, float]] = None
+
+
+def plan_trim(
+    boundaries: List[float], start: float, end: float, tolerance: float
+) -> Optional[TrimPlan]:
+    """Plan a cut given the sorted packet boundaries of a stream
+
+    Cut points within tolerance of a boundary are moved onto it. Other cut points get an
+    edge, from the cut to the nearest boundary inside the span, that has to be
+    re-encoded. Returns None when no whole packet falls inside the span.
+    """
+    if not boundaries:
+        return None
+    start = max(start, boundaries[0])
+    end = min(end, boundaries[-1])
+
+    def snap(time: float) -> Optional[float]:
+        index = bisect_left(boundaries, time)
+        nearest = min(boundaries[max(index - 1, 0) : index + 1], key=lambda b: abs(b - time))
+        return nearest if abs(nearest - time) <= tolerance else None
+
+    head = tail = None
+    copy_start = snap(start)
+    if copy_start is None:
+        index = bisect_left(boundaries, start)
+        if index == len(boundaries):
+            return None
+        copy_start = boundaries[index]
+        head = (start, copy_start)
+
+    copy_end = snap(end)
+    if copy_end is None:
+        index = bisect_right(boundaries, end)
+        if index == 0:
+            return None
+        copy_end = boundaries[index - 1]
+        tail = (copy_end, end)
+
+    if copy_end <= copy_start:
+        return None
+    return TrimPlan(copy_start, copy_end, head, tail)
+
+
+def trim_wav(source_path: str, target_path: str, start: float, end: float) -> bool:
+    """Cut a PCM WAV file by copying sample frames, exactly at the requested times"""
+    try:
+        with wave.open(source_path, "rb") as source:
+            rate = source.getframerate()
+            first = max(int(round(start * rate)), 0)
+            last = min(int(round(end * rate)), source.getnframes())
+            if first >= last:
+                return False
+
+            source.setpos(first)
+            with wave.open(target_path, "wb") as target:
+                target.setparams(source.getparams())
+                remaining = last - first
+                while remaining > 0:
+                    frames = source.readframes(min(remaining, WAV_CHUNK_FRAMES))
+                    if not frames:
+                        break
+                    target.writeframes(frames)
+                    remaining -= min(remaining, WAV_CHUNK_FRAMES)
+    except (wave.Error, EOFError):
+        # Not plain PCM (for example float or compressed WAV)
+        return False
+    return True
+
+
+def probe_stream(path: str) -> Optional[dict]:
+    """Get the first audio stream's codec parameters and packet boundaries"""
+    output = subprocess.run(
+        [
+            "ffprobe",
+            "-v",
+            "error",
+            "-select_streams",
+            "a:0",
+            "-show_entries",
+            "stream=codec_name,sample_rate,channels,bit_rate:packet=pts_time,duration_time",
+            "-of",
+            "json",
+            path,
+        ],
+        check=True,
+        capture_output=True,
+    ).stdout
+    info = json.loads(output)
+    if not info.get("streams"):
+        return None
+
+    boundaries = []
+    for packet in info.get("packets", []):
+        if packet.get("pts_time") not in (None, "N/A"):
+            boundaries.append(float(packet["pts_time"]))
+    if not boundaries:
+        return None
+    boundaries.sort()
+    last = info["packets"][-1].get("duration_time")
+    if last not in (None, "N/A"):
+        boundaries.append(boundaries[-1] + float(last))
+    return {**info["streams"][0], "boundaries": boundaries}
+
+
+def _ffmpeg(*args: str) -> None:
+    """Run ffmpeg quietly, raising CalledProcessError on failure"""
+    subprocess.run(["ffmpeg", "-v", "error", "-y", *args], check=True, capture_output=True)
+
+
+def trim_copy(
+    source_path: str, target_path: str, extension: str, start: float, end: float, tolerance: float
+) -> bool:
+    """Trim an audio file without decoding it, when its format allows
+
+    WAV is cut sample-exactly. Compressed formats are cut by copying whole packets with
+    ffmpeg, re-encoding only the edges whose cut points are not near a packet boundary.
+    Returns False when the file has to be decoded and re-encoded instead.
+    """
+    if extension == "wav":
+        return trim_wav(source_path, target_path, start, end)
+    if extension not in MUXERS or not shutil.which("ffmpeg") or not shutil.which("ffprobe"):
+        return False
+
+    muxer = MUXERS[extension]
+    try:
+        stream = probe_stream(source_path)
+        if stream is None:
+            return False
+        plan = plan_trim(stream["boundaries"], start, end, tolerance)
+        if plan is None:
+            return False
+        encoder = EDGE_ENCODERS.get(stream["codec_name"])
+        if (plan.head or plan.tail) and encoder is None:
+            return False
+
+        with tempfile.TemporaryDirectory(dir=os.path.dirname(target_path)) as work:
+            pieces: List[str] = []
+
+            def piece(span: Tuple[float, float], codec_args: List[str]) -> None:
+                path = os.path.join(work, f"{len(pieces)}.{extension}")
+                _ffmpeg(
+                    "-ss",
+                    f"{span[0]:.6f}",
+                    "-i",
+                    source_path,
+                    "-t",
+                    f"{span[1] - span[0]:.6f}",
+                    "-map",
+                    "0:a:0",
+                    *codec_args,
+                    "-f",
+                    muxer,
+                    path,
+                )
+                pieces.append(path)
+
+            edge_args = ["-c:a", encoder or "copy"]
+            for key, flag in (("sample_rate", "-ar"), ("channels", "-ac"), ("bit_rate", "-b:a")):
+                if stream.get(key) not in (None, "N/A"):
+                    edge_args += [flag, str(stream[key])]
+
+            if plan.head:
+                piece(plan.head, edge_args)
+            piece((plan.copy_start, plan.copy_end), ["-c", "copy"])
+            if plan.tail:
+                piece(plan.tail, edge_args)
+
+            if len(pieces) == 1:
+                os.replace(pieces[0], target_path)
+            else:
+                concat_list = os.path.join(work, "pieces.txt")
+                with open(concat_list, "w", encoding="utf-8") as f:
+                    f.writelines(f"file '{path}'\n" for path in pieces)
+                _ffmpeg(
+                    "-f",
+                    "concat",
+                    "-safe",
+                    "0",
+                    "-i",
+                    concat_list,
+                    "-c",
+                    "copy",
+                    "-f",
+                    muxer,
+                    target_path,
+                )
+    except (subprocess.CalledProcessError, OSError, ValueError, KeyError):
+        return False
+    return True
@@ -0,0 +1,184 @@
+import glob
+import hashlib
+import json
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+from contextlib import closing, contextmanager
+from typing import Dict, Iterator, List
+
+# Content-addressed names: the first 16 hex digits of the SHA-256 plus the extension
+BLOB_NAME = re.compile(r"^[0-9a-f]{16}\.[a-z0-9]+$")
+
+
+# Files derived from a blob (such as waveform peaks) are named after it plus a suffix
+SIDECAR_NAME = re.compile(r"^([0-9a-f]{16}\.[a-z0-9]+)\..+$")
+
+
+REFS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS refs (
+    name TEXT PRIMARY KEY,
+    count INTEGER NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+def is_blob_name(filename: str) -> bool:
+    """Check if a stored filename refers to a content-addressed blob"""
+    return bool(filename) and BLOB_NAME.match(filename) is not None
+
+
+def remove_sidecars(path: str) -> None:
+    """Delete the files derived from a media file, named after it plus a suffix"""
+    for sidecar in glob.glob(f"{glob.escape(path)}.*"):
+        os.remove(sidecar)
+
+
+class BlobStore:
+    """Content-addressed file store with reference counts
+
+    Files are named after a hash of their content, so identical files are stored once
+    and a name always refers to the same bytes. Each put takes a reference and each
+    release drops one; a blob is deleted when its last reference is released. Counts
+    are rows of an SQLite table, so each change updates one row.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self.refs_database = os.path.join(root, "refs.db")
+        # Counts kept by earlier versions, moved into the database on first use
+        self.legacy_refs_file = os.path.join(root, "refs.json")
+        self._initialized = False
+
+    def path(self, name: str) -> str:
+        """Get the file path of a blob"""
+        return os.path.join(self.root, name[:2], name)
+
+    def exists(self, name: str) -> bool:
+        """Check if a blob is stored"""
+        return is_blob_name(name) and os.path.exists(self.path(name))
+
+    def temp_path(self, extension: str) -> str:
+        """Get a fresh temporary path on the store's filesystem to build a blob in"""
+        os.makedirs(self.root, exist_ok=True)
+        fd, path = tempfile.mkstemp(dir=self.root, prefix=".incoming.", suffix=f".{extension}")
+        os.close(fd)
+        return path
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection, creating the store and its schema on first use"""
+        if not self._initialized:
+            os.makedirs(self.root, exist_ok=True)
+        conn = sqlite3.connect(self.refs_database, timeout=30, isolation_level=None)
+        if not self._initialized:
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.executescript(REFS_SCHEMA)
+            self._migrate_legacy_refs(conn)
+            self._initialized = True
+        return conn
+
+    def _migrate_legacy_refs(self, conn: sqlite3.Connection) -> None:
+        """Move the counts of a refs.json file into the database"""
+        if not os.path.exists(self.legacy_refs_file):
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Another process may have migrated while this one waited for the lock
+            if os.path.exists(self.legacy_refs_file):
+                with open(self.legacy_refs_file, "r", encoding="utf-8") as f:
+                    refs = json.load(f)
+                conn.executemany(
+                    "INSERT OR IGNORE INTO refs (name, count) VALUES (?, ?)", refs.items()
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        if os.path.exists(self.legacy_refs_file):
+            os.remove(self.legacy_refs_file)
+
+    @contextmanager
+    def _write(self) -> Iterator[sqlite3.Connection]:
+        """Hold the store's write lock in a transaction, committed on success"""
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def load_refs(self) -> Dict[str, int]:
+        """Get the reference count of every blob"""
+        with closing(self._connect()) as conn:
+            return dict(conn.execute("SELECT name, count FROM refs ORDER BY name"))
+
+    def put_file(self, source_path: str, extension: str) -> str:
+        """Move a file into the store, taking a reference, and return its blob name"""
+        digest = hashlib.sha256()
+        with open(source_path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        name = f"{digest.hexdigest()[:16]}.{extension.lower()}"
+        target = self.path(name)
+
+        with self._write() as conn:
+            if os.path.exists(target):
+                os.unlink(source_path)
+            else:
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.move(source_path, target)
+            conn.execute(
+                "INSERT INTO refs (name, count) VALUES (?, 1) "
+                "ON CONFLICT (name) DO UPDATE SET count = count + 1",
+                (name,),
+            )
+        return name
+
+    def retain(self, name: str, count: int = 1) -> bool:
+        """Take more references to a stored blob, one by default"""
+        with self._write() as conn:
+            cursor = conn.execute("UPDATE refs SET count = count + ? WHERE name = ?", (count, name))
+        return cursor.rowcount > 0
+
+    def release(self, name: str) -> bool:
+        """Drop a reference to a blob, deleting it with its last reference"""
+        if not is_blob_name(name):
+            return False
+        with self._write() as conn:
+            row = conn.execute(
+                "UPDATE refs SET count = count - 1 WHERE name = ? RETURNING count", (name,)
+            ).fetchone()
+            if row is None:
+                return False
+            if row[0] <= 0:
+                conn.execute("DELETE FROM refs WHERE name = ?", (name,))
+                if os.path.exists(self.path(name)):
+                    os.remove(self.path(name))
+                remove_sidecars(self.path(name))
+        return True
+
+    def sweep(self, live: Dict[str, int]) -> List[str]:
+        """Reset reference counts to the given live counts and delete every other blob
+
+        Used to garbage-collect after crashes or manual edits left counts out of sync.
+        Returns the names of deleted blobs.
+        """
+        removed = []
+        with self._write() as conn:
+            for directory, _, files in os.walk(self.root):
+                for name in files:
+                    if is_blob_name(name) and name not in live:
+                        os.remove(os.path.join(directory, name))
+                        removed.append(name)
+                    elif (sidecar := SIDECAR_NAME.match(name)) and sidecar.group(1) not in live:
+                        os.remove(os.path.join(directory, name))
+            conn.execute("DELETE FROM refs")
+            conn.executemany(
+                "INSERT INTO refs (name, count) VALUES (?, ?)",
+                [(name, count) for name, count in live.items() if self.exists(name)],
+            )
+        return sorted(removed)
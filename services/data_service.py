@@ -1,101 +1,190 @@
-import json
-import os
-from typing import List, Optional
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
 
 from flask import current_app
 
 from config import Config
 from models.child import Child
+from models.recording import AudioMetadata
 from models.word import Word
+from services.journal_repository import JournaledJsonRepository
+from services.json_repository import JsonRepository
+from services.mutations import DELETE_CHILD, PUT_CHILD, Mutation, MutationMethods, apply_mutation
+from services.query import ChildPage, ChildQuery
+from services.repository import ChildRepository, DataVersion
+from services.sharded_repository import ShardedJsonRepository
+from services.sqlite_repository import SqliteRepository
+
+
+def get_config_value(key: str) -> Any:
+    """Read a setting from the Flask app config, falling back to the Config class"""
+    try:
+        return current_app.config[key]
+    except (RuntimeError, KeyError):
+        # No app context, use default config
+        return getattr(Config, key)
+
+
+def create_repository(backend: str) -> ChildRepository:
+    """Create the storage backend selected by STORAGE_BACKEND"""
+    if backend == "json":
+        return JsonRepository(get_config_value("DATA_FILE"))
+    if backend == "journal":
+        return JournaledJsonRepository(
+            get_config_value("DATA_FILE"),
+            compact_entries=get_config_value("JOURNAL_COMPACT_ENTRIES"),
+            compact_bytes=get_config_value("JOURNAL_COMPACT_BYTES"),
+        )
+    if backend == "sharded":
+        return ShardedJsonRepository(get_config_value("SHARD_DIR"))
+    if backend == "sqlite":
+        return SqliteRepository(get_config_value("SQLITE_DATABASE"))
+    raise ValueError(f"Unknown storage backend: {backend}")
+
+
+class Transaction(MutationMethods):
+    """Unit of work that collects mutations and persists them with a single write
+
+    Children read through the transaction are private copies that reflect the
+    mutations recorded so far, so validation sees earlier changes in the same batch.
+    Nothing reaches the repository until commit.
+    """
+
+    def __init__(self, repository: ChildRepository):
+        self.repository = repository
+        self.mutations: List[Mutation] = []
+        self._children: Dict[str, Optional[Child]] = {}
+
+    def get_child(self, name: str) -> Optional[Child]:
+        """Get a working copy of a child"""
+        if name not in self._children:
+            child = self.repository.get_child(name)
+            self._children[name] = Child.from_dict(child.to_dict(), trusted=True) if child else None
+        return self._children[name]
+
+    def _submit(self, mutation: Mutation) -> bool:
+        """Apply a mutation to the working copy and queue it for commit"""
+        if mutation.op == PUT_CHILD:
+            self._children[mutation.child] = Child.from_dict(mutation.args["child"], trusted=True)
+            applied = True
+        elif mutation.op == DELETE_CHILD:
+            applied = self.get_child(mutation.child) is not None
+            self._children[mutation.child] = None
+        else:
+            child = self.get_child(mutation.child)
+            applied = child is not None and apply_mutation([child], mutation)
+
+        if applied:
+            self.mutations.append(mutation)
+        return applied
+
+    def commit(self) -> None:
+        """Persist all queued mutations"""
+        if self.mutations:
+            self.repository.apply_mutations(self.mutations)
+        self.rollback()
+
+    def rollback(self) -> None:
+        """Discard all queued mutations and working copies"""
+        self.mutations = []
+        self._children = {}
 
 
 class DataService:
     """Service for managing application data persistence"""
 
-    def __init__(self):
+    def __init__(self, repository: Optional[ChildRepository] = None):
         # Use Flask app config if available, otherwise fallback to Config class
-        try:
-            self.data_file = current_app.config["DATA_FILE"]
-        except RuntimeError:
-            # No app context, use default config
-            self.data_file = Config.DATA_FILE
+        self.data_file = get_config_value("DATA_FILE")
+        self.repository = repository or create_repository(get_config_value("STORAGE_BACKEND"))
         self._ensure_data_file_exists()
 
+    @contextmanager
+    def transaction(self) -> Iterator[Transaction]:
+        """Batch several changes into one write, discarding them if the block raises"""
+        transaction = Transaction(self.repository)
+        try:
+            yield transaction
+        except BaseException:
+            transaction.rollback()
+            raise
+        transaction.commit()
+
     def _ensure_data_file_exists(self) -> None:
-        """Create data file if it doesn't exist"""
-        if not os.path.exists(self.data_file):
-            initial_data = {"children": []}
-            self.save_data(initial_data)
+        """Create the backing store if it doesn't exist"""
+        self.repository.initialize()
 
     def load_data(self) -> dict:
-        """Load data from JSON file"""
-        try:
-            with open(self.data_file, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            return {"children": []}
+        """Load the full data set in the data.json document format"""
+        return self.repository.export_data()
 
     def save_data(self, data: dict) -> None:
-        """Save data to JSON file"""
-        with open(self.data_file, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        """Replace the full data set with a data.json formatted document"""
+        self.repository.import_data(data)
 
     def get_children(self) -> List[Child]:
         """Get all children"""
-        data = self.load_data()
-        return [Child.from_dict(child_data) for child_data in data.get("children", [])]
+        return self.repository.get_children()
 
     def get_child(self, name: str) -> Optional[Child]:
         """Get a specific child by name"""
-        children = self.get_children()
-        return next((child for child in children if child.name == name), None)
+        return self.repository.get_child(name)
 
-    def save_child(self, child: Child) -> None:
-        """Save or update a child"""
-        data = self.load_data()
-        children = data.get("children", [])
+    def query_children(self, query: ChildQuery) -> ChildPage:
+        """Get one page of children, filtered and projected as the query asks"""
+        return self.repository.query_children(query)
 
-        # Remove existing child with same name
-        children = [c for c in children if c["name"] != child.name]
+    def get_version(self, child_name: Optional[str] = None) -> Optional[DataVersion]:
+        """Get the version of all data, or of one child's data"""
+        return self.repository.get_version(child_name)
 
-        # Add updated child
-        children.append(child.to_dict())
+    def count_children(self) -> int:
+        """Count children"""
+        return self.repository.count_children()
 
-        data["children"] = children
-        self.save_data(data)
+    def save_child(self, child: Child) -> None:
+        """Save or update a child"""
+        self.repository.save_child(child)
 
     def delete_child(self, name: str) -> bool:
         """Delete a child"""
-        data = self.load_data()
-        children = data.get("children", [])
-
-        original_length = len(children)
-        children = [c for c in children if c["name"] != name]
-
-        if len(children) < original_length:
-            data["children"] = children
-            self.save_data(data)
-            return True
-        return False
+        return self.repository.delete_child(name)
 
     def add_word_to_child(self, child_name: str, word: Word) -> bool:
         """Add a word to a child's vocabulary"""
-        child = self.get_child(child_name)
-        if child:
-            child.add_word(word)
-            self.save_child(child)
-            return True
-        return False
+        return self.repository.add_word(child_name, word)
+
+    def remove_word_from_child(self, child_name: str, word_text: str) -> bool:
+        """Remove a word from a child's vocabulary"""
+        return self.repository.remove_word(child_name, word_text)
+
+    def set_word_image(self, child_name: str, word_text: str, filename: Optional[str]) -> bool:
+        """Set or clear the image of a word"""
+        return self.repository.set_word_image(child_name, word_text, filename)
 
     def add_recording_to_word(
         self, child_name: str, word_text: str, year: int, month: int, day: int, filename: str
     ) -> bool:
         """Add a recording to a word"""
-        child = self.get_child(child_name)
-        if child:
-            word = child.get_word(word_text)
-            if word:
-                word.add_recording(year, month, day, filename)
-                self.save_child(child)
-                return True
-        return False
+        return self.repository.add_recording(child_name, word_text, year, month, day, filename)
+
+    def delete_recording(
+        self, child_name: str, word_text: str, year: int, month: int, day: int
+    ) -> bool:
+        """Remove a word's recording for a specific date"""
+        return self.repository.remove_recording(child_name, word_text, year, month, day)
+
+    def set_recording_metadata(
+        self,
+        child_name: str,
+        word_text: str,
+        year: int,
+        month: int,
+        day: int,
+        filename: str,
+        metadata: AudioMetadata,
+    ) -> bool:
+        """Store the probed metadata of a recording, unless its file was replaced since"""
+        return self.repository.set_recording_metadata(
+            child_name, word_text, year, month, day, filename, metadata
+        )
@@ -0,0 +1,315 @@
+import json
+import os
+import sqlite3
+from contextlib import closing, contextmanager
+from typing import BinaryIO, ContextManager, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+
+from models.recording import Recording
+from services.file_lock import FileLock
+
+# A recording is identified by child name, word text and date (YYYY-MM-DD)
+FeatureKey = Tuple[str, str, str]
+
+# Length of each recording's vector: mean cepstra of 3 segments plus their deviation
+FEATURE_SIZE = 48
+FEATURE_DTYPE = np.dtype("<f4")
+ROW_BYTES = FEATURE_SIZE * FEATURE_DTYPE.itemsize
+
+# Each row's word id is stored next to the matrix; free rows have FREE_ROW
+WORD_ID_DTYPE = np.dtype("<i4")
+FREE_ROW = -1
+
+INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS words (
+    id INTEGER PRIMARY KEY,
+    text TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS rows (
+    row INTEGER PRIMARY KEY,
+    child TEXT,
+    word TEXT,
+    date TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_rows_key ON rows (child, word, date);
+CREATE INDEX IF NOT EXISTS idx_rows_free ON rows (row) WHERE child IS NULL;
+"""
+
+
+def feature_key(child_name: str, word_text: str, recording: Recording) -> FeatureKey:
+    """Get the key of a recording's vector"""
+    return (child_name, word_text, recording.date_string)
+
+
+class FeatureStore:
+    """Acoustic feature vectors of recordings, one row each of a memory-mapped matrix
+
+    Vectors live in a raw float32 file, with the id of each row's word in a raw int32
+    file next to it, so a library-wide comparison reads two arrays instead of decoding
+    any audio, and limiting it to a word is one comparison of the id column. An SQLite
+    index maps rows to recordings, so storing or freeing a row updates one index row.
+    Rows of removed recordings are reused by later ones.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self.matrix_file = os.path.join(root, "features.f32")
+        self.word_id_file = os.path.join(root, "words.i32")
+        self.index_database = os.path.join(root, "index.db")
+        # Index kept by earlier versions, moved into the database on first use
+        self.legacy_index_file = os.path.join(root, "index.json")
+        self.lock = FileLock(os.path.join(root, "features.lock"))
+        self._initialized = False
+
+    def _exists(self) -> bool:
+        """Check if anything was stored, so readers don't create an empty store"""
+        return os.path.exists(self.index_database) or os.path.exists(self.legacy_index_file)
+
+    def _exclusive(self) -> ContextManager[None]:
+        """Take the store's exclusive lock, creating the store on first use"""
+        os.makedirs(self.root, exist_ok=True)
+        return self.lock.exclusive()
+
+    def _shared(self) -> ContextManager[None]:
+        """Take the store's shared lock; callers check the store exists first"""
+        return self.lock.shared()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the index, creating it on first use; call before taking the store's lock"""
+        if not self._initialized:
+            os.makedirs(self.root, exist_ok=True)
+        conn = sqlite3.connect(self.index_database, timeout=30, isolation_level=None)
+        if not self._initialized:
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.executescript(INDEX_SCHEMA)
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version != FEATURE_SIZE or os.path.exists(self.legacy_index_file):
+                with self._exclusive():
+                    self._rebuild(conn)
+            self._initialized = True
+        return conn
+
+    def _rebuild(self, conn: sqlite3.Connection) -> None:
+        """Start the index over from a legacy index.json, or empty for vectors of another size"""
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Another process may have rebuilt it while this one waited for the lock
+            if conn.execute("PRAGMA user_version").fetchone()[0] != FEATURE_SIZE:
+                conn.execute("DELETE FROM rows")
+                keys = self._legacy_rows()
+                conn.executemany(
+                    "INSERT INTO rows (row, child, word, date) VALUES (?, ?, ?, ?)",
+                    [(row, *(key or (None, None, None))) for row, key in enumerate(keys)],
+                )
+                word_ids = [self._word_id(conn, key[1]) if key else FREE_ROW for key in keys]
+                with open(self.word_id_file, "wb") as f:
+                    f.write(np.array(word_ids, dtype=WORD_ID_DTYPE).tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+                conn.execute(f"PRAGMA user_version = {FEATURE_SIZE}")
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        if os.path.exists(self.legacy_index_file):
+            os.remove(self.legacy_index_file)
+
+    def _legacy_rows(self) -> List[Optional[FeatureKey]]:
+        """Get the recording of every row of a legacy index.json, None for free rows"""
+        try:
+            with open(self.legacy_index_file, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except FileNotFoundError:
+            return []
+        # Vectors of another length come from an older extractor and can't be compared
+        if index.get("size") != FEATURE_SIZE:
+            return []
+        return [tuple(key) if key else None for key in index["rows"]]
+
+    @contextmanager
+    def _write(self) -> Iterator[sqlite3.Connection]:
+        """Hold the store's exclusive lock in an index transaction, committed on success"""
+        with closing(self._connect()) as conn, self._exclusive():
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    @staticmethod
+    def _row(conn: sqlite3.Connection, key: FeatureKey) -> Optional[int]:
+        """Get the row of a recording's vector"""
+        found = conn.execute(
+            "SELECT row FROM rows WHERE child = ? AND word = ? AND date = ?", tuple(key)
+        ).fetchone()
+        return found[0] if found else None
+
+    @staticmethod
+    def _word_id(conn: sqlite3.Connection, word_text: str) -> int:
+        """Get the id of a word's text, numbering it on first use"""
+        conn.execute("INSERT OR IGNORE INTO words (text) VALUES (?)", (word_text,))
+        return int(conn.execute("SELECT id FROM words WHERE text = ?", (word_text,)).fetchone()[0])
+
+    def _word_ids(self) -> np.ndarray:
+        """Map the word id of every row read-only"""
+        try:
+            rows = min(
+                os.path.getsize(self.word_id_file) // WORD_ID_DTYPE.itemsize,
+                os.path.getsize(self.matrix_file) // ROW_BYTES,
+            )
+        except FileNotFoundError:
+            rows = 0
+        if rows == 0:
+            return np.empty(0, dtype=WORD_ID_DTYPE)
+        return np.memmap(self.word_id_file, dtype=WORD_ID_DTYPE, mode="r", shape=(rows,))
+
+    def _matrix(self, rows: int) -> np.ndarray:
+        """Map the first `rows` vectors read-only"""
+        if rows == 0:
+            return np.empty((0, FEATURE_SIZE), dtype=FEATURE_DTYPE)
+        return np.memmap(
+            self.matrix_file, dtype=FEATURE_DTYPE, mode="r", shape=(rows, FEATURE_SIZE)
+        )
+
+    @staticmethod
+    def _open(path: str) -> BinaryIO:
+        """Open one of the store's raw files to write rows in place, creating it if needed"""
+        return open(path, "r+b" if os.path.exists(path) else "w+b")
+
+    def keys(self) -> Set[FeatureKey]:
+        """Get the recordings that have a stored vector"""
+        if not self._exists():
+            return set()
+        with closing(self._connect()) as conn, self._shared():
+            return set(conn.execute("SELECT child, word, date FROM rows WHERE child IS NOT NULL"))
+
+    def get(self, key: FeatureKey) -> Optional[np.ndarray]:
+        """Get a recording's stored vector"""
+        if not self._exists():
+            return None
+        with closing(self._connect()) as conn, self._shared():
+            row = self._row(conn, key)
+            if row is None:
+                return None
+            return np.array(self._matrix(row + 1)[row])
+
+    def put(self, vectors: Dict[FeatureKey, np.ndarray]) -> None:
+        """Store the vectors of recordings, replacing the ones they had"""
+        if not vectors:
+            return
+        with self._write() as conn:
+            # Vectors and word ids are written before the index rows that point at them
+            with self._open(self.matrix_file) as matrix, self._open(self.word_id_file) as ids:
+                for key, vector in vectors.items():
+                    child_name, word_text, date = key
+                    row = self._row(conn, key)
+                    if row is None:
+                        free = conn.execute(
+                            "SELECT row FROM rows WHERE child IS NULL ORDER BY row LIMIT 1"
+                        ).fetchone()
+                        if free is None:
+                            free = conn.execute(
+                                "SELECT COALESCE(MAX(row) + 1, 0) FROM rows"
+                            ).fetchone()
+                        row = free[0]
+                        conn.execute(
+                            "INSERT OR REPLACE INTO rows (row, child, word, date) "
+                            "VALUES (?, ?, ?, ?)",
+                            (row, child_name, word_text, date),
+                        )
+                    matrix.seek(row * ROW_BYTES)
+                    vector = np.asarray(vector, dtype=FEATURE_DTYPE).reshape(FEATURE_SIZE)
+                    matrix.write(vector.tobytes())
+                    ids.seek(row * WORD_ID_DTYPE.itemsize)
+                    ids.write(np.array(self._word_id(conn, word_text), WORD_ID_DTYPE).tobytes())
+                for f in (matrix, ids):
+                    f.flush()
+                    os.fsync(f.fileno())
+
+    def remove(self, keys: Iterable[Tuple[str, str, Optional[str]]]) -> int:
+        """Free the rows of recordings; a key without a date frees all of the word's
+
+        Returns the number of rows freed.
+        """
+        keys = list(keys)
+        if not self._exists() or not keys:
+            return 0
+
+        freed = []
+        with self._write() as conn:
+            for child_name, word_text, date in keys:
+                conditions, params = "child = ? AND word = ?", [child_name, word_text]
+                if date is not None:
+                    conditions += " AND date = ?"
+                    params.append(date)
+                freed += conn.execute(
+                    "UPDATE rows SET child = NULL, word = NULL, date = NULL "
+                    f"WHERE {conditions} RETURNING row",
+                    params,
+                ).fetchall()
+            if freed:
+                with open(self.word_id_file, "r+b") as f:
+                    free = np.array(FREE_ROW, dtype=WORD_ID_DTYPE).tobytes()
+                    for (row,) in freed:
+                        f.seek(row * WORD_ID_DTYPE.itemsize)
+                        f.write(free)
+                    f.flush()
+                    os.fsync(f.fileno())
+        return len(freed)
+
+    def nearest(
+        self, key: FeatureKey, word_text: Optional[str] = None, limit: int = 10
+    ) -> Optional[List[Tuple[FeatureKey, float]]]:
+        """Rank other recordings by distance to a recording's vector, closest first
+
+        Only recordings of `word_text` are ranked when given. The distance is the RMS
+        difference between vectors, computed for all rows at once on the mapped matrix.
+        Returns None when the recording has no stored vector.
+        """
+        if not self._exists():
+            return None
+        with closing(self._connect()) as conn, self._shared():
+            target = self._row(conn, key)
+            word_ids = self._word_ids()
+            if target is None or target >= len(word_ids):
+                return None
+            if word_text is None:
+                candidates = word_ids != FREE_ROW
+            else:
+                found = conn.execute("SELECT id FROM words WHERE text = ?", (word_text,))
+                word_id = found.fetchone()
+                if word_id is None:
+                    return []
+                candidates = word_ids == word_id[0]
+            candidates[target] = False
+            indices = np.flatnonzero(candidates)
+            if indices.size == 0:
+                return []
+
+            matrix = self._matrix(len(word_ids))
+            difference = matrix[indices] - matrix[target]
+            distances = np.sqrt(np.einsum("ij,ij->i", difference, difference) / FEATURE_SIZE)
+            if limit < indices.size:
+                closest = np.argpartition(distances, limit)[:limit]
+            else:
+                closest = np.arange(indices.size)
+            closest = closest[np.argsort(distances[closest], kind="stable")]
+
+            rows = [int(indices[i]) for i in closest]
+            placeholders = ", ".join("?" * len(rows))
+            keys = {
+                row: tuple(key)
+                for row, *key in conn.execute(
+                    "SELECT row, child, word, date FROM rows "
+                    f"WHERE row IN ({placeholders}) AND child IS NOT NULL",
+                    rows,
+                )
+            }
+            return [
+                (keys[row], round(float(distances[i]), 4))
+                for row, i in zip(rows, closest)
+                if row in keys
+            ]
@@ -0,0 +1,180 @@
+import math
+import os
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from services.audio_service import AudioService
+from services.data_service import DataService
+from services.feature_store import FeatureKey, feature_key
+from services.library import library_files, library_recordings, map_on_pool
+from services.waveform import decode_pcm, to_mono
+
+# MFCC frames: 25ms Hamming windows every 10ms, 26 mel bands between 60Hz and 7.6kHz
+FRAME_SECONDS = 0.025
+HOP_SECONDS = 0.01
+PRE_EMPHASIS = 0.97
+MEL_BANDS = 26
+LOW_HZ = 60.0
+HIGH_HZ = 7600.0
+LIFTER = 22
+
+# Coefficient 0 is the frame's level; the 12 after it describe the spectral shape
+CEPSTRA = 12
+
+# Frames more than this many dB below the loudest are silence around the word
+SOUND_RANGE = 35.0
+
+# The sound is cut into equal segments so vectors keep a coarse notion of order
+SEGMENTS = 3
+
+
+def _mel(hz: float) -> float:
+    """Convert a frequency in Hz to the mel scale"""
+    return 2595 * math.log10(1 + hz / 700)
+
+
+@lru_cache(maxsize=16)
+def mel_filterbank(rate: int, size: int) -> np.ndarray:
+    """Get triangular mel filters over the bins of a real FFT of `size`, one per row"""
+    high = min(HIGH_HZ, rate / 2)
+    edges = 700 * (10 ** (np.linspace(_mel(LOW_HZ), _mel(high), MEL_BANDS + 2) / 2595) - 1)
+    bins = np.fft.rfftfreq(size, 1 / rate)
+    lower, center, upper = edges[:-2, None], edges[1:-1, None], edges[2:, None]
+    rising = (bins - lower) / (center - lower)
+    falling = (upper - bins) / (upper - center)
+    return np.maximum(0, np.minimum(rising, falling)).astype(np.float32)
+
+
+@lru_cache(maxsize=1)
+def _dct_matrix() -> np.ndarray:
+    """Get the orthonormal DCT-II from log mel energies to liftered cepstra"""
+    bands = np.arange(MEL_BANDS)[:, None] + 0.5
+    coefficients = np.arange(CEPSTRA + 1)[None, :]
+    dct: np.ndarray = np.cos(np.pi / MEL_BANDS * bands * coefficients) * math.sqrt(2 / MEL_BANDS)
+    dct[:, 0] /= math.sqrt(2)
+    lifter = 1 + LIFTER / 2 * np.sin(np.pi * np.arange(CEPSTRA + 1) / LIFTER)
+    return (dct * lifter).astype(np.float32)
+
+
+def mfcc(samples: np.ndarray, rate: int) -> np.ndarray:
+    """Get the mel-frequency cepstral coefficients 0 to 12 of every frame of mono samples
+
+    Filters are built for the recording's own sample rate, so nothing is resampled.
+    """
+    size = max(int(FRAME_SECONDS * rate), 2)
+    hop = max(int(HOP_SECONDS * rate), 1)
+    if len(samples) < size:
+        samples = np.pad(samples, (0, size - len(samples)))
+    emphasized = np.empty_like(samples)
+    emphasized[0] = samples[0]
+    np.subtract(samples[1:], PRE_EMPHASIS * samples[:-1], out=emphasized[1:])
+
+    frames = sliding_window_view(emphasized, size)[::hop] * np.hamming(size).astype(np.float32)
+    fft_size = 1 << (size - 1).bit_length()
+    power = np.square(np.abs(np.fft.rfft(frames, fft_size))) / fft_size
+    energies = power @ mel_filterbank(rate, fft_size).T
+    cepstra: np.ndarray = np.log(np.maximum(energies, 1e-10)) @ _dct_matrix()
+    return cepstra
+
+
+def recording_features(samples: np.ndarray, rate: int) -> np.ndarray:
+    """Describe how a recording sounds with a fixed-size vector, whatever its length
+
+    The vector holds the mean cepstra of each third of the sound, then their standard
+    deviation over the whole sound. Silence around the word is left out, and the level
+    (coefficient 0) is too, so the vector doesn't depend on loudness or padding.
+    Raises ValueError for recordings without sound.
+    """
+    cepstra = mfcc(samples, rate)
+    # Coefficient 0 is the mean log mel energy, scaled by the DCT
+    levels = cepstra[:, 0] * (10 / math.log(10) / math.sqrt(MEL_BANDS))
+    if levels.max() <= -90:
+        raise ValueError("Recording has no sound")
+    sound = np.flatnonzero(levels >= levels.max() - SOUND_RANGE)
+
+    shape = cepstra[sound[0] : sound[-1] + 1, 1:]
+    if len(shape) < SEGMENTS:
+        shape = np.resize(shape, (SEGMENTS, CEPSTRA))
+    means = [segment.mean(axis=0) for segment in np.array_split(shape, SEGMENTS)]
+    return np.concatenate([*means, shape.std(axis=0)]).astype(np.float32)
+
+
+def pcm_features(frames: np.ndarray, rate: int) -> Optional[np.ndarray]:
+    """Describe already decoded frames, or get None for a recording without sound"""
+    try:
+        return recording_features(to_mono(frames), rate)
+    except ValueError:
+        return None
+
+
+def extract_features(audio_path: str) -> np.ndarray:
+    """Decode an audio file and describe it, raising ValueError when that isn't possible"""
+    return recording_features(*decode_pcm(audio_path))
+
+
+def features_if_possible(audio_path: Optional[str]) -> Optional[np.ndarray]:
+    """Describe an audio file's sound, or get None when this host can't decode it"""
+    if not audio_path:
+        return None
+    try:
+        return extract_features(audio_path)
+    except ValueError:
+        return None
+
+
+@dataclass
+class FeatureReport:
+    """Outcome of extracting the features of existing recordings"""
+
+    extracted: int = 0
+    removed: int = 0
+    failed: List[Tuple[str, str]] = field(default_factory=list)
+
+
+def backfill_features(
+    data_service: Optional[DataService] = None,
+    audio_service: Optional[AudioService] = None,
+    workers: Optional[int] = None,
+    force: bool = False,
+) -> FeatureReport:
+    """Extract the features of every recording without (or all with force) on a process pool
+
+    Vectors are stored with one write, and rows of recordings that no longer exist
+    are freed.
+    """
+    data_service = data_service or DataService()
+    audio_service = audio_service or AudioService()
+    store = audio_service.features
+    report = FeatureReport()
+
+    stored = store.keys()
+    live = {feature_key(*recording) for recording in library_recordings(data_service)}
+    report.removed = store.remove(stored - live)
+
+    targets: List[Tuple[FeatureKey, str]] = [
+        (feature_key(child_name, word_text, recording), path)
+        for child_name, word_text, recording, path in library_files(
+            data_service,
+            audio_service,
+            report.failed,
+            skip=None if force else lambda *recording: feature_key(*recording) in stored,
+        )
+    ]
+    if not targets:
+        return report
+
+    results = map_on_pool(features_if_possible, [path for _, path in targets], workers)
+
+    vectors = {}
+    for (key, path), vector in zip(targets, results):
+        if vector is None:
+            report.failed.append((os.path.basename(path), "Audio file could not be read"))
+        else:
+            vectors[key] = vector
+    store.put(vectors)
+    report.extracted = len(vectors)
+    return report
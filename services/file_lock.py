@@ -0,0 +1,85 @@
+import fcntl
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Any, ContextManager, Dict, Iterator, Tuple
+
+# Locks held by the current thread: lock path -> (mode, depth)
+_held = threading.local()
+
+
+class FileLock:
+    """Cross-process reader/writer lock backed by flock on a sidecar file
+
+    Each acquisition opens its own file descriptor, so threads of the same process
+    exclude each other as well. Nested acquisitions by the same thread are no-ops,
+    except that upgrading a shared lock to an exclusive one is refused.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def _held_locks(self) -> Dict[str, Tuple[int, int]]:
+        """Get the locks held by the current thread"""
+        if not hasattr(_held, "locks"):
+            _held.locks = {}
+        locks: Dict[str, Tuple[int, int]] = _held.locks
+        return locks
+
+    @contextmanager
+    def _acquire(self, mode: int) -> Iterator[None]:
+        """Hold the lock in the given flock mode"""
+        held = self._held_locks()
+        if self.path in held:
+            held_mode, depth = held[self.path]
+            if held_mode == fcntl.LOCK_SH and mode == fcntl.LOCK_EX:
+                raise RuntimeError(f"Cannot upgrade shared lock on {self.path}")
+            held[self.path] = (held_mode, depth + 1)
+            try:
+                yield
+            finally:
+                held[self.path] = (held_mode, depth)
+            return
+
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, mode)
+            held[self.path] = (mode, 1)
+            try:
+                yield
+            finally:
+                del held[self.path]
+                fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+
+    def shared(self) -> ContextManager[None]:
+        """Hold the lock for reading"""
+        return self._acquire(fcntl.LOCK_SH)
+
+    def exclusive(self) -> ContextManager[None]:
+        """Hold the lock for writing"""
+        return self._acquire(fcntl.LOCK_EX)
+
+
+def atomic_write_json(path: str, data: dict, **dump_kwargs: Any) -> None:
+    """Write JSON to a temporary file and rename it over the target
+
+    Readers see either the previous or the new document, never a partial one.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(
+        dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, **dump_kwargs)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
@@ -6,15 +6,18 @@ from werkzeug.datastructures import FileStorage
 from werkzeug.utils import secure_filename
 
 from config import Config
+from services.blob_store import BlobStore, is_blob_name
 
 
 class ImageService:
     """Service for managing image files"""
 
-    def __init__(self):
-        self.images_dir = Config.IMAGES_DIR
+    def __init__(self, images_dir: Optional[str] = None):
+        self.images_dir = images_dir or Config.IMAGES_DIR
         self.allowed_extensions = Config.ALLOWED_IMAGE_EXTENSIONS
         self.max_file_size = Config.MAX_IMAGE_SIZE
+        # Images are stored by content hash; word-named files are from older versions
+        self.blobs = BlobStore(os.path.join(self.images_dir, ".blobs"))
 
     def _allowed_file(self, filename: str) -> bool:
         """Check if file extension is allowed"""
@@ -47,13 +50,8 @@ class ImageService:
         # Get file extension
         extension = file.filename.rsplit(".", 1)[1].lower()
 
-        # Create the file path
-        file_path = self._get_image_path(word, extension)
-
-        # Remove existing image for this word
-        self.delete_image_file(word)
-
-        # Save and optimize the image
+        # Build the optimized image next to the content-addressed store, then move it in
+        file_path = self.blobs.temp_path(extension)
         try:
             with Image.open(file) as img:
                 # Convert to RGB if necessary
@@ -84,21 +82,30 @@ class ImageService:
                     img.save(file_path, "JPEG", quality=90, optimize=True)
                 else:
                     img.save(file_path, optimize=True)
+
+            # Return just the filename for storage in data
+            return self.blobs.put_file(file_path, extension)
         except Exception as e:
             raise ValueError(f"Error processing image: {str(e)}")
-
-        # Return just the filename for storage in data
-        return f"{secure_filename(word)}.{extension}"
+        finally:
+            if os.path.exists(file_path):
+                os.unlink(file_path)
 
     def get_image_file_path(self, filename: str) -> Optional[str]:
         """Get the full path to an image file"""
+        if self.blobs.exists(filename):
+            return self.blobs.path(filename)
+
         file_path = os.path.join(self.images_dir, filename)
         if os.path.exists(file_path):
             return file_path
         return None
 
-    def delete_image_file(self, word: str) -> bool:
-        """Delete image file(s) for a word"""
+    def delete_image_file(self, word: str, filename: Optional[str] = None) -> bool:
+        """Delete a word's image: release its stored blob, or remove legacy word-named files"""
+        if filename and is_blob_name(filename):
+            return self.blobs.release(filename)
+
         deleted = False
         word_safe = secure_filename(word)
 
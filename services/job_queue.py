@@ -0,0 +1,411 @@
+import importlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import closing
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+from flask import Flask, current_app
+
+# Modules defining job types, imported on demand so worker processes find them too
+JOB_MODULES = ("services.media_jobs",)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    result TEXT,
+    error TEXT,
+    run_after REAL NOT NULL,
+    lease TEXT,
+    lease_until REAL,
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_due ON jobs (status, run_after);
+"""
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+@dataclass
+class JobType:
+    """How to run a kind of job
+
+    run executes in a worker process and returns a JSON-serializable result. complete
+    runs in the app process once run succeeded, and is where data store updates
+    happen. discard undoes what run stored (such as a blob reference) when complete
+    fails, so the result is not leaked. summarize reduces the result to what the job
+    status shows. cleanup runs once the job is finished for good, successfully or not.
+    """
+
+    run: Callable[[dict], dict]
+    complete: Optional[Callable[[dict, dict], None]] = None
+    cleanup: Optional[Callable[[dict], None]] = None
+    discard: Optional[Callable[[dict, dict], None]] = None
+    summarize: Optional[Callable[[dict], dict]] = None
+
+
+JOB_TYPES: Dict[str, JobType] = {}
+
+
+def job_type(
+    kind: str,
+    complete: Optional[Callable[[dict, dict], None]] = None,
+    cleanup: Optional[Callable[[dict], None]] = None,
+    discard: Optional[Callable[[dict, dict], None]] = None,
+    summarize: Optional[Callable[[dict], dict]] = None,
+) -> Callable[[Callable[[dict], dict]], Callable[[dict], dict]]:
+    """Register the decorated function as the runner of a kind of job"""
+
+    def register(run: Callable[[dict], dict]) -> Callable[[dict], dict]:
+        JOB_TYPES[kind] = JobType(run, complete, cleanup, discard, summarize)
+        return run
+
+    return register
+
+
+def get_job_type(kind: str) -> JobType:
+    """Get a registered job type, importing the modules that define them if needed"""
+    if kind not in JOB_TYPES:
+        for module in JOB_MODULES:
+            importlib.import_module(module)
+    if kind not in JOB_TYPES:
+        raise ValueError(f"Unknown job kind: {kind}")
+    return JOB_TYPES[kind]
+
+
+def execute_job(kind: str, payload: dict) -> dict:
+    """Run a job's work function (the entry point of worker processes)"""
+    return get_job_type(kind).run(payload)
+
+
+@dataclass
+class Job:
+    """A queued unit of background work"""
+
+    id: str
+    kind: str
+    payload: dict
+    status: str
+    attempts: int
+    max_attempts: int
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    created: float = 0.0
+    updated: float = 0.0
+    # Token of the claim this copy was taken with, so a lapsed claim can't update the job
+    lease: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        """Convert to dictionary for JSON serialization, without the internal payload"""
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "attempts": self.attempts,
+            "max_attempts": self.max_attempts,
+            "result": self.result,
+            "error": self.error,
+            "created": self.created,
+            "updated": self.updated,
+        }
+
+    @classmethod
+    def from_row(cls, row: sqlite3.Row) -> "Job":
+        """Create Job instance from a jobs table row"""
+        return cls(
+            id=row["id"],
+            kind=row["kind"],
+            payload=json.loads(row["payload"]),
+            status=row["status"],
+            attempts=row["attempts"],
+            max_attempts=row["max_attempts"],
+            result=json.loads(row["result"]) if row["result"] else None,
+            error=row["error"],
+            created=row["created"],
+            updated=row["updated"],
+            lease=row["lease"],
+        )
+
+
+class JobQueue:
+    """Persistent job queue in SQLite, shared by every process of the app
+
+    Jobs are claimed atomically with a lease, so several processes can work the same
+    queue and jobs claimed by a process that died are picked up again once the lease
+    runs out. Each claim gets a new lease token, and a job is only updated by the holder
+    of its current token, so a process whose lease ran out can't finish it twice.
+    """
+
+    def __init__(self, database_path: str, lease_seconds: float = 600, retry_delay: float = 2):
+        self.database_path = database_path
+        self.lease_seconds = lease_seconds
+        self.retry_delay = retry_delay
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection, creating the schema on first use"""
+        conn = sqlite3.connect(self.database_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        if not self._initialized:
+            os.makedirs(os.path.dirname(os.path.abspath(self.database_path)), exist_ok=True)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.executescript(SCHEMA)
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if "lease" not in columns:
+                # Queues created before lease tokens
+                conn.execute("ALTER TABLE jobs ADD COLUMN lease TEXT")
+            self._initialized = True
+        return conn
+
+    def submit(self, kind: str, payload: dict, max_attempts: int = 3) -> Job:
+        """Queue a job"""
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, payload, status, max_attempts, run_after, "
+                "created, updated) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, json.dumps(payload), QUEUED, max_attempts, now, now, now),
+            )
+        job = self.get(job_id)
+        if job is None:
+            raise LookupError(f"Job disappeared after it was queued: {job_id}")
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Get a job by id"""
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return Job.from_row(row) if row else None
+
+    def claim(self, job_id: Optional[str] = None) -> Optional[Job]:
+        """Atomically take the oldest due job (or a specific one) and lease it"""
+        now = time.time()
+        job_filter = " AND id = ?" if job_id else ""
+        params = (job_id,) if job_id else ()
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, lease = ?, "
+                "lease_until = ?, updated = ? WHERE id = (SELECT id FROM jobs WHERE "
+                f"((status = ? AND run_after <= ?) OR (status = ? AND lease_until < ?)){job_filter} "
+                "ORDER BY created LIMIT 1) RETURNING *",
+                (
+                    RUNNING,
+                    uuid.uuid4().hex,
+                    now + self.lease_seconds,
+                    now,
+                    QUEUED,
+                    now,
+                    RUNNING,
+                    now,
+                    *params,
+                ),
+            ).fetchone()
+        return Job.from_row(row) if row else None
+
+    def renew(self, job: Job) -> bool:
+        """Extend a claimed job's lease, returning False if another claim replaced it"""
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET lease_until = ?, updated = ? WHERE id = ? AND lease IS ?",
+                (now + self.lease_seconds, now, job.id, job.lease),
+            )
+        return cursor.rowcount > 0
+
+    def succeed(self, job: Job, result: dict) -> bool:
+        """Record a job's result, returning False if another claim replaced this one"""
+        return self._update(job, SUCCEEDED, result=json.dumps(result), error=None)
+
+    def fail(self, job: Job, error: str, retry: bool = True) -> bool:
+        """Record a failed attempt, re-queueing with backoff while attempts remain
+
+        Returns True if the job will run again: it was re-queued, or another process
+        claimed it after this one's lease ran out.
+        """
+        if retry and job.attempts < job.max_attempts:
+            delay = self.retry_delay * 2 ** (job.attempts - 1)
+            self._update(job, QUEUED, error=error, run_after=time.time() + delay)
+            return True
+        return not self._update(job, FAILED, error=error)
+
+    def _update(self, job: Job, status: str, **columns: Any) -> bool:
+        """Set a claimed job's status and other columns, releasing its lease
+
+        Returns False, changing nothing, if another claim replaced the job's.
+        """
+        columns.update(status=status, lease=None, lease_until=None, updated=time.time())
+        assignments = ", ".join(f"{column} = ?" for column in columns)
+        with closing(self._connect()) as conn, conn:
+            cursor = conn.execute(
+                f"UPDATE jobs SET {assignments} WHERE id = ? AND lease IS ?",
+                (*columns.values(), job.id, job.lease),
+            )
+        return cursor.rowcount > 0
+
+
+class JobRunner:
+    """Runs queued jobs on a process pool from a background thread of the app process"""
+
+    def __init__(self, queue: JobQueue, app: Flask, workers: int = 2, poll_seconds: float = 1):
+        self.queue = queue
+        self.app = app
+        self.workers = workers
+        self.poll_seconds = poll_seconds
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _finish(self, job: Job, outcome: Callable[[], dict]) -> None:
+        """Complete a job from the outcome of its work function"""
+        try:
+            job_type = get_job_type(job.kind)
+        except ValueError as e:
+            self.queue.fail(job, str(e), retry=False)
+            return
+
+        try:
+            result = outcome()
+        except ValueError as e:
+            # Invalid input won't get better on a retry
+            retried = self.queue.fail(job, str(e), retry=False)
+        except Exception as e:
+            retried = self.queue.fail(job, str(e))
+        else:
+            if not self.queue.renew(job):
+                # The lease ran out and another process claimed the job: its run completes it
+                self._discard(job_type, job, result)
+                return
+            try:
+                if job_type.complete:
+                    with self.app.app_context():
+                        job_type.complete(job.payload, result)
+            except Exception as e:
+                try:
+                    self._discard(job_type, job, result)
+                finally:
+                    retried = self.queue.fail(job, str(e), retry=False)
+            else:
+                summary = job_type.summarize(result) if job_type.summarize else result
+                retried = not self.queue.succeed(job, summary)
+
+        if not retried and job_type.cleanup:
+            job_type.cleanup(job.payload)
+
+    def _discard(self, job_type: JobType, job: Job, result: dict) -> None:
+        """Undo what a job's run stored, for a result that won't be completed"""
+        if job_type.discard:
+            with self.app.app_context():
+                job_type.discard(job.payload, result)
+
+    def run_job(self, job: Job) -> None:
+        """Run a claimed job in this process"""
+        self._finish(job, lambda: execute_job(job.kind, job.payload))
+
+    def run_pending(self) -> int:
+        """Run every due job in this process until none are left, returning the count"""
+        count = 0
+        while (job := self.queue.claim()) is not None:
+            self.run_job(job)
+            count += 1
+        return count
+
+    def notify(self) -> None:
+        """Wake the runner up because a job was queued"""
+        self._wake.set()
+
+    def start(self) -> None:
+        """Start working the queue in a daemon thread"""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self.run_forever, name="job-runner", daemon=True)
+            self._thread.start()
+
+    def run_forever(self) -> None:
+        """Keep a process pool busy with due jobs, replacing the pool if it fails"""
+        while True:
+            try:
+                self._work_pool()
+            except BrokenProcessPool:
+                # Jobs that were in flight are retried once their lease runs out
+                continue
+            except Exception:
+                # Such as the queue database staying locked; keep the runner alive
+                self.app.logger.exception("Job runner failed, restarting its pool")
+                time.sleep(self.poll_seconds)
+
+    def _work_pool(self) -> None:
+        """Feed due jobs to a process pool and finish them as they complete"""
+        running: Dict[Future, Job] = {}
+        with ProcessPoolExecutor(self.workers) as pool:
+            while True:
+                while len(running) < self.workers:
+                    job = self.queue.claim()
+                    if job is None:
+                        break
+                    running[pool.submit(execute_job, job.kind, job.payload)] = job
+
+                if running:
+                    done, _ = wait(running, timeout=self.poll_seconds, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        job = running.pop(future)
+                        try:
+                            self._finish(job, future.result)
+                        except BrokenProcessPool:
+                            raise
+                        except Exception:
+                            # The job is retried once its lease runs out
+                            self.app.logger.exception("Failed to finish job %s", job.id)
+                else:
+                    self._wake.wait(self.poll_seconds)
+                    self._wake.clear()
+
+
+def get_job_runner() -> JobRunner:
+    """Get the current app's job runner, creating it on first use
+
+    Every app process has its own runner, whose thread starts a pool of JOB_WORKERS
+    processes on the first job: a server with N worker processes runs up to
+    N * JOB_WORKERS jobs at once. Size JOB_WORKERS for that, or set it to 0 in the
+    server and run `flask jobs work` processes instead.
+    """
+    # The app itself, as the runner's thread outlives the request's context
+    app: Flask = current_app._get_current_object()  # type: ignore[attr-defined]
+    runner: Optional[JobRunner] = app.extensions.get("job_runner")
+    if runner is None:
+        queue = JobQueue(app.config["JOB_DATABASE"], app.config["JOB_LEASE_SECONDS"])
+        runner = JobRunner(queue, app, app.config["JOB_WORKERS"])
+        app.extensions["job_runner"] = runner
+    return runner
+
+
+def submit_job(kind: str, payload: dict) -> Job:
+    """Queue a job for the background runner
+
+    With JOB_WORKERS set to 0 there is no runner and the job runs before returning,
+    which keeps development setups and tests free of background processes.
+    """
+    runner = get_job_runner()
+    job = runner.queue.submit(kind, payload, current_app.config["JOB_MAX_ATTEMPTS"])
+    if runner.workers > 0:
+        runner.start()
+        runner.notify()
+        return job
+
+    claimed = runner.queue.claim(job.id)
+    if claimed is not None:
+        runner.run_job(claimed)
+    return runner.queue.get(job.id) or job
@@ -0,0 +1,181 @@
+import json
+import os
+import threading
+from typing import BinaryIO, List, Optional, Tuple
+
+from models.child import Child
+from services.json_repository import (
+    DataSnapshot,
+    FileVersion,
+    JsonRepository,
+    invalidate_snapshot_cache,
+)
+from services.mutations import Mutation, apply_mutation
+
+
+def journal_path_for(data_file: str) -> str:
+    """Get the default journal location for a data file"""
+    return f"{os.path.splitext(data_file)[0]}.journal.jsonl"
+
+
+class JournaledJsonRepository(JsonRepository):
+    """JSON repository that appends mutations to a journal instead of rewriting data.json
+
+    data.json holds the last compacted snapshot. Every mutation is appended to a JSONL
+    journal next to it and replayed on load. Once the journal passes the configured
+    number of entries or bytes, it is folded back into data.json.
+    """
+
+    def __init__(
+        self,
+        data_file: str,
+        journal_file: Optional[str] = None,
+        compact_entries: int = 1000,
+        compact_bytes: int = 4 * 1024 * 1024,
+        background_compaction: bool = True,
+    ):
+        super().__init__(data_file)
+        self.journal_file = journal_file or journal_path_for(data_file)
+        self.compact_entries = compact_entries
+        self.compact_bytes = compact_bytes
+        self.background_compaction = background_compaction
+
+    def _file_version(self) -> Optional[FileVersion]:
+        """Get the combined version stamp of data.json and the journal"""
+        data_version = self._stat_version(self.data_file)
+        if data_version is None:
+            return None
+        return data_version + (self._stat_version(self.journal_file) or (0, 0, 0))
+
+    def read_journal(self) -> List[Mutation]:
+        """Read all complete journal entries"""
+        mutations = []
+        try:
+            with open(self.journal_file, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        mutations.append(Mutation.from_dict(json.loads(line)))
+                    except (json.JSONDecodeError, KeyError, TypeError):
+                        # A torn final line from an interrupted append
+                        continue
+        except FileNotFoundError:
+            pass
+        return mutations
+
+    def _build_snapshot(self, version: FileVersion) -> DataSnapshot:
+        """Load the compacted snapshot and replay the journal on top of it"""
+        data = self.load_data()
+        children = [
+            Child.from_dict(child_data, trusted=True) for child_data in data.get("children", [])
+        ]
+        mutations = self.read_journal()
+        for mutation in mutations:
+            apply_mutation(children, mutation)
+        return DataSnapshot.from_children(version, children, journal_entries=len(mutations))
+
+    def export_data(self) -> dict:
+        """Get the full data set with the journal applied"""
+        with self.lock.shared():
+            return {"children": [child.to_dict() for child in self.get_children()]}
+
+    def import_data(self, data: dict) -> None:
+        """Replace the full data set and discard the journal"""
+        with self.lock.exclusive():
+            self._truncate_journal()
+            self.save_data(data)
+
+    def _truncate_journal(self) -> None:
+        """Empty the journal file"""
+        if os.path.exists(self.journal_file):
+            open(self.journal_file, "w").close()
+
+    @staticmethod
+    def _drop_torn_tail(f: BinaryIO) -> None:
+        """Cut the partial last line an interrupted append left, back to the last newline
+
+        Otherwise the next entry would continue that line and be skipped on replay.
+        """
+        end = position = f.seek(0, os.SEEK_END)
+        while position > 0:
+            step = min(4096, position)
+            f.seek(position - step)
+            newline = f.read(step).rfind(b"\n")
+            if newline >= 0:
+                position += newline + 1 - step
+                break
+            position -= step
+        if position != end:
+            f.truncate(position)
+
+    def _append(self, mutations: List[Mutation]) -> None:
+        """Append mutations to the journal as one durable write"""
+        payload = "".join(
+            json.dumps(m.to_dict(), ensure_ascii=False, separators=(",", ":")) + "\n"
+            for m in mutations
+        )
+        with open(self.journal_file, "a+b") as f:
+            self._drop_torn_tail(f)
+            f.write(payload.encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def apply_mutations(self, mutations: List[Mutation]) -> List[bool]:
+        """Validate mutations against the current state and journal them in one append
+
+        Mutations are checked on copies of the children they target, so the cached
+        snapshot other threads read is never changed.
+        """
+        with self.lock.exclusive():
+            snapshot = self.get_snapshot()
+            children = list(snapshot.children)
+            copied = set()
+            results = []
+            for mutation in mutations:
+                if mutation.child not in copied:
+                    copied.add(mutation.child)
+                    index = next(
+                        (i for i, c in enumerate(children) if c.name == mutation.child), None
+                    )
+                    if index is not None:
+                        children[index] = Child.from_dict(children[index].to_dict(), trusted=True)
+                results.append(apply_mutation(children, mutation))
+            applied = [m for m, ok in zip(mutations, results) if ok]
+            if applied:
+                try:
+                    self._append(applied)
+                finally:
+                    invalidate_snapshot_cache(self.data_file)
+
+        if applied and self._needs_compaction(snapshot.journal_entries + len(applied)):
+            self._schedule_compaction()
+        return results
+
+    def _needs_compaction(self, entries: int) -> bool:
+        """Check whether the journal has grown past the compaction thresholds"""
+        if entries >= self.compact_entries:
+            return True
+        version = self._stat_version(self.journal_file)
+        return version is not None and version[1] >= self.compact_bytes
+
+    def _schedule_compaction(self) -> None:
+        """Compact now, or on a background thread when enabled"""
+        if self.background_compaction:
+            threading.Thread(target=self.compact, daemon=True).start()
+        else:
+            self.compact()
+
+    def compact(self) -> Tuple[int, int]:
+        """Fold the journal into data.json
+
+        Returns the number of folded entries and the number of children written.
+        """
+        with self.lock.exclusive():
+            version = self._file_version() or (0, 0, 0)
+            snapshot = self._build_snapshot(version)
+            if snapshot.journal_entries == 0:
+                return 0, len(snapshot.children)
+            # Replaying is idempotent, so a crash between these two steps is harmless
+            self.save_data({"children": [child.to_dict() for child in snapshot.children]})
+            self._truncate_journal()
+            invalidate_snapshot_cache(self.data_file)
+            return snapshot.journal_entries, len(snapshot.children)
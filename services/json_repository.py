@@ -0,0 +1,204 @@
+import json
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from models.child import Child
+from services.file_lock import FileLock, atomic_write_json
+from services.mutations import DELETE_CHILD, PUT_CHILD, Mutation, apply_mutation
+from services.repository import ChildRepository, CorruptDataError, DataVersion
+
+FileVersion = Tuple[int, ...]
+
+
+@dataclass
+class DataSnapshot:
+    """Hydrated view of the data file at a specific on-disk version"""
+
+    version: FileVersion
+    children: List[Child]
+    by_name: Dict[str, Child] = field(default_factory=dict)
+    journal_entries: int = 0
+
+    @classmethod
+    def from_children(
+        cls, version: FileVersion, children: List[Child], journal_entries: int = 0
+    ) -> "DataSnapshot":
+        """Build a snapshot from hydrated children"""
+        return cls(
+            version=version,
+            children=children,
+            by_name={c.name: c for c in children},
+            journal_entries=journal_entries,
+        )
+
+    @classmethod
+    def from_data(cls, version: FileVersion, data: dict) -> "DataSnapshot":
+        """Build a snapshot from the raw JSON document"""
+        children = [
+            Child.from_dict(child_data, trusted=True) for child_data in data.get("children", [])
+        ]
+        return cls.from_children(version, children)
+
+
+# Process-wide snapshot cache, keyed by data file path. Every request builds its own
+# DataService, so the cache lives at module level and is shared between instances.
+_snapshot_cache: Dict[str, DataSnapshot] = {}
+_snapshot_lock = threading.Lock()
+
+
+def invalidate_snapshot_cache(data_file: Optional[str] = None) -> None:
+    """Drop cached snapshots for one data file, or for all of them"""
+    with _snapshot_lock:
+        if data_file is None:
+            _snapshot_cache.clear()
+        else:
+            _snapshot_cache.pop(data_file, None)
+
+
+class JsonRepository(ChildRepository):
+    """Repository storing every child in a single data.json document
+
+    Mutations run as a read-modify-write under an exclusive file lock, and data.json is
+    replaced atomically, so several worker processes can share the file.
+    """
+
+    def __init__(self, data_file: str):
+        self.data_file = data_file
+        self.lock = FileLock(f"{data_file}.lock")
+
+    def initialize(self) -> None:
+        """Create data file if it doesn't exist"""
+        if not os.path.exists(self.data_file):
+            with self.lock.exclusive():
+                if not os.path.exists(self.data_file):
+                    self.save_data({"children": []})
+
+    def load_data(self) -> dict:
+        """Load data from JSON file"""
+        try:
+            with open(self.data_file, "r", encoding="utf-8") as f:
+                data: dict = json.load(f)
+                return data
+        except FileNotFoundError:
+            return {"children": []}
+        except json.JSONDecodeError as e:
+            # Writes are atomic, so this is real corruption: refuse to overwrite it
+            raise CorruptDataError(f"Data file {self.data_file} is corrupt: {e}") from e
+
+    def save_data(self, data: dict) -> None:
+        """Save data to JSON file"""
+        try:
+            atomic_write_json(self.data_file, data, indent=2)
+        finally:
+            invalidate_snapshot_cache(self.data_file)
+
+    def export_data(self) -> dict:
+        """Get the full data set as stored in data.json"""
+        with self.lock.shared():
+            return self.load_data()
+
+    def import_data(self, data: dict) -> None:
+        """Replace data.json with the given document"""
+        with self.lock.exclusive():
+            self.save_data(data)
+
+    @staticmethod
+    def _stat_version(path: str) -> Optional[FileVersion]:
+        """Get the (inode, size, mtime) stamp of a file"""
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+    def _file_version(self) -> Optional[FileVersion]:
+        """Get the version stamp of the stored data"""
+        return self._stat_version(self.data_file)
+
+    def get_version(self, child_name: Optional[str] = None) -> Optional[DataVersion]:
+        """Get the version of the stored data from file stamps alone
+
+        A single document holds every child, so each child shares the global version.
+        """
+        version = self._file_version()
+        if version is None:
+            return None
+        # Stamps are (inode, size, mtime_ns) triples, one per backing file
+        modified = max(version[2::3]) / 1e9
+        return DataVersion(tag="-".join(f"{part:x}" for part in version), modified=modified)
+
+    def _build_snapshot(self, version: FileVersion) -> DataSnapshot:
+        """Parse the stored data into a snapshot"""
+        return DataSnapshot.from_data(version, self.load_data())
+
+    def get_snapshot(self) -> DataSnapshot:
+        """Get the hydrated snapshot, re-parsing only when the data file changed
+
+        Models in the snapshot are shared by every caller in this process. Callers that
+        mutate them must persist the change with save_child (which drops the snapshot)
+        or call invalidate_snapshot_cache.
+        """
+        version = self._file_version()
+        with _snapshot_lock:
+            snapshot = _snapshot_cache.get(self.data_file)
+        if snapshot is not None and version is not None and snapshot.version == version:
+            return snapshot
+
+        with self.lock.shared():
+            version = self._file_version()
+            snapshot = self._build_snapshot(version or (0, 0, 0))
+        if version is not None:
+            with _snapshot_lock:
+                _snapshot_cache[self.data_file] = snapshot
+        return snapshot
+
+    def get_children(self) -> List[Child]:
+        """Get all children"""
+        return list(self.get_snapshot().children)
+
+    def get_child(self, name: str) -> Optional[Child]:
+        """Get a specific child by name"""
+        return self.get_snapshot().by_name.get(name)
+
+    def apply_mutations(self, mutations: List[Mutation]) -> List[bool]:
+        """Apply mutations to data.json with one read and one write under the exclusive lock
+
+        Only the targeted children are hydrated; the others are copied through as raw JSON.
+        """
+        with self.lock.exclusive():
+            data = self.load_data()
+            children = data.get("children", [])
+            hydrated: Dict[str, Child] = {}
+            results = []
+
+            for mutation in mutations:
+                index = next(
+                    (i for i, c in enumerate(children) if c["name"] == mutation.child), None
+                )
+                if mutation.op == PUT_CHILD:
+                    # Remove existing child with same name and add updated child
+                    if index is not None:
+                        del children[index]
+                    children.append(mutation.args["child"])
+                    hydrated.pop(mutation.child, None)
+                    results.append(True)
+                elif index is None:
+                    results.append(False)
+                elif mutation.op == DELETE_CHILD:
+                    del children[index]
+                    hydrated.pop(mutation.child, None)
+                    results.append(True)
+                else:
+                    if mutation.child not in hydrated:
+                        hydrated[mutation.child] = Child.from_dict(children[index], trusted=True)
+                    results.append(apply_mutation([hydrated[mutation.child]], mutation))
+
+            if any(results):
+                for i, child_data in enumerate(children):
+                    if child_data["name"] in hydrated:
+                        children[i] = hydrated[child_data["name"]].to_dict()
+                data["children"] = children
+                self.save_data(data)
+            return results
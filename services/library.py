@@ -0,0 +1,61 @@
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from models.recording import Recording
+from services.audio_service import AudioService
+from services.data_service import DataService
+
+# A recording with the names of its child and word
+LibraryRecording = Tuple[str, str, Recording]
+
+
+def library_recordings(data_service: DataService) -> Iterator[LibraryRecording]:
+    """Walk every recording in the data store"""
+    for child in data_service.get_children():
+        for word in child.words:
+            for recording in word.recordings:
+                yield child.name, word.text, recording
+
+
+def library_files(
+    data_service: DataService,
+    audio_service: AudioService,
+    failed: List[Tuple[str, str]],
+    skip: Optional[Callable[[str, str, Recording], bool]] = None,
+) -> Iterator[Tuple[str, str, Recording, str]]:
+    """Walk the recordings a library-wide run works on, with the path of their file
+
+    Recordings `skip` returns True for are left out, and the ones whose file is
+    missing are added to `failed` instead.
+    """
+    for child_name, word_text, recording in library_recordings(data_service):
+        if skip and skip(child_name, word_text, recording):
+            continue
+        path = audio_service.get_audio_file_path(child_name, word_text, recording.filename)
+        if path is None:
+            failed.append((recording.filename, "Audio file not found"))
+        else:
+            yield child_name, word_text, recording, path
+
+
+def recordings_by_file(
+    files: Iterator[Tuple[str, str, Recording, str]],
+) -> Dict[str, List[LibraryRecording]]:
+    """Group recordings by the path of the file they share, so each file is processed once"""
+    users = defaultdict(list)
+    for child_name, word_text, recording, path in files:
+        users[path].append((child_name, word_text, recording))
+    return users
+
+
+def chunk_size(count: int, workers: Optional[int]) -> int:
+    """Get a pool.map chunk size giving each worker about four chunks of `count` items"""
+    return max(1, count // (4 * (workers or os.cpu_count() or 1)))
+
+
+def map_on_pool(function: Callable, items: list, workers: Optional[int] = None) -> list:
+    """Apply a function to every item on a new process pool, in order"""
+    with ProcessPoolExecutor(workers) as pool:
+        return list(pool.map(function, items, chunksize=chunk_size(len(items), workers)))
@@ -0,0 +1,109 @@
+import math
+from typing import Optional
+
+import numpy as np
+
+# ITU-R BS.1770 gating: 400ms blocks every 100ms, an absolute gate at -70 LUFS and a
+# relative gate 10 LU below the loudness of the blocks passing the absolute gate
+BLOCK_SECONDS = 0.4
+STEP_SECONDS = 0.1
+ABSOLUTE_GATE = -70.0
+RELATIVE_GATE = -10.0
+
+
+def _fft_size(minimum: int) -> int:
+    """Get the smallest length of at least `minimum` with only 2, 3 and 5 as factors"""
+    best = 1 << (minimum - 1).bit_length()
+    power5 = 1
+    while power5 < best:
+        power35 = power5
+        while power35 < best:
+            size = power35 << max(0, (minimum - 1) // power35).bit_length()
+            best = min(best, size)
+            power35 *= 3
+        power5 *= 5
+    return best
+
+
+def _biquad_response(b: tuple, a: tuple, z: np.ndarray) -> np.ndarray:
+    """Evaluate a biquad's transfer function on the unit circle points z"""
+    response: np.ndarray = (b[0] + b[1] / z + b[2] / z**2) / (a[0] + a[1] / z + a[2] / z**2)
+    return response
+
+
+def k_weighting(rate: int, size: int) -> np.ndarray:
+    """Get the BS.1770 K-weighting filter's response at the bins of a real FFT of `size`
+
+    The shelving and high-pass stages are derived for the given sample rate, so
+    recordings need no resampling to 48kHz first.
+    """
+    z = np.exp(2j * np.pi * np.fft.rfftfreq(size))
+
+    # High shelf: +4dB above about 1.5kHz, modelling the head
+    k = math.tan(math.pi * 1681.9744509555319 / rate)
+    q, vh = 0.7071752369554193, 10 ** (3.99984385397 / 20)
+    vb = vh**0.4996667741545416
+    a0 = 1 + k / q + k * k
+    shelf = _biquad_response(
+        ((vh + vb * k / q + k * k) / a0, 2 * (k * k - vh) / a0, (vh - vb * k / q + k * k) / a0),
+        (1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0),
+        z,
+    )
+
+    # High-pass at about 38Hz
+    k = math.tan(math.pi * 38.13547087613982 / rate)
+    q = 0.5003270373253953
+    a0 = 1 + k / q + k * k
+    high_pass = _biquad_response(
+        (1.0, -2.0, 1.0), (1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0), z
+    )
+    weighting: np.ndarray = shelf * high_pass
+    return weighting
+
+
+def integrated_loudness(frames: np.ndarray, rate: int) -> Optional[float]:
+    """Measure the gated integrated loudness of float frames in LUFS, or None for silence
+
+    K-weighting is applied to all channels at once in the frequency domain, and block
+    energies come from one cumulative sum, so there is no per-sample Python loop.
+    """
+    if len(frames) == 0 or not rate:
+        return None
+
+    # Pad generously so the filters' decay does not wrap around to the start
+    size = _fft_size(len(frames) + rate // 2)
+    spectrum = np.fft.rfft(frames, n=size, axis=0) * k_weighting(rate, size)[:, None]
+    weighted = np.fft.irfft(spectrum, n=size, axis=0)[: len(frames)]
+
+    # Mean square of every block, summed over channels (all weighted 1.0 for mono/stereo)
+    block = min(int(BLOCK_SECONDS * rate), len(frames))
+    step = max(int(STEP_SECONDS * rate), 1)
+    energy = np.concatenate([[0.0], np.cumsum(np.square(weighted).sum(axis=1))])
+    starts = np.arange(0, len(frames) - block + 1, step)
+    power = (energy[starts + block] - energy[starts]) / block
+
+    with np.errstate(divide="ignore"):
+        levels = -0.691 + 10 * np.log10(power)
+    gated = power[levels > ABSOLUTE_GATE]
+    if gated.size == 0:
+        return None
+    threshold = -0.691 + 10 * np.log10(gated.mean()) + RELATIVE_GATE
+    gated = power[levels > max(threshold, ABSOLUTE_GATE)]
+    return round(-0.691 + 10 * math.log10(gated.mean()), 2)
+
+
+def normalization_gain(
+    frames: np.ndarray, rate: int, target: float, peak_ceiling: float, max_gain: float
+) -> float:
+    """Get the gain in dB that brings frames to the target loudness
+
+    The gain is limited so samples stay below the peak ceiling (dBFS), and boosts are
+    capped at max_gain so quiet, noisy recordings don't become loud noise. Silent
+    recordings get no gain.
+    """
+    loudness = integrated_loudness(frames, rate)
+    peak = float(np.abs(frames).max()) if frames.size else 0.0
+    if loudness is None or peak == 0:
+        return 0.0
+    headroom = peak_ceiling - 20 * math.log10(peak)
+    return min(target - loudness, headroom, max_gain)
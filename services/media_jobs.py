@@ -0,0 +1,284 @@
+import os
+import shutil
+import tempfile
+from typing import Collection, Optional
+
+import numpy as np
+from werkzeug.datastructures import FileStorage
+
+from config import Config
+from models.recording import AudioMetadata, Recording
+from services.audio_codec import CANONICAL_CODEC
+from services.audio_conversion import switch_recording_files
+from services.audio_metadata import analyze_recording
+from services.audio_service import AudioService
+from services.data_service import DataService
+from services.feature_store import feature_key
+from services.features import pcm_features
+from services.image_search_service import ImageSearchService
+from services.image_service import ImageService
+from services.job_queue import job_type
+from services.montage import build_montage, find_montage, montage_dir
+from services.normalization import normalize_new_recording, normalize_recording
+from services.waveform import read_pcm
+
+
+def stage_upload(
+    file: FileStorage, staging_dir: str, allowed_extensions: Collection[str], max_size: int
+) -> str:
+    """Check an uploaded file's type and size and save it for a job to process
+
+    Raises ValueError for files the job would refuse, so requests fail fast with 400.
+    """
+    name = file.filename or ""
+    extension = name.rsplit(".", 1)[1].lower() if "." in name else ""
+    if extension not in allowed_extensions:
+        raise ValueError(
+            f"File type not allowed. Allowed types: " f"{', '.join(allowed_extensions)}"
+        )
+
+    os.makedirs(staging_dir, exist_ok=True)
+    fd, path = tempfile.mkstemp(dir=staging_dir, suffix=f".{extension}")
+    with os.fdopen(fd, "wb") as f:
+        # Never copy more than the limit, whatever the request claims
+        copied = f.write(file.stream.read(max_size + 1))
+    if copied > max_size:
+        os.unlink(path)
+        raise ValueError(f"File too large. Maximum size: {max_size / 1024 / 1024:.1f}MB")
+    return path
+
+
+def remove_staged(payload: dict) -> None:
+    """Delete a job's staged upload"""
+    if os.path.exists(payload["staged_path"]):
+        os.unlink(payload["staged_path"])
+
+
+def _staged_file(payload: dict) -> FileStorage:
+    """Open a job's staged upload under its original filename"""
+    return FileStorage(stream=open(payload["staged_path"], "rb"), filename=payload["filename"])
+
+
+def _feature_list(features: Optional[np.ndarray]) -> Optional[list]:
+    """Get a recording's feature vector in JSON form, for its job result"""
+    return features.tolist() if features is not None else None
+
+
+def _store_features(audio_service: AudioService, payload: dict, result: dict) -> None:
+    """Store a registered recording's features, or drop the stale ones of its date"""
+    recording = Recording(payload["year"], payload["month"], payload["day"], result["filename"])
+    key = feature_key(payload["child"], payload["word"], recording)
+    if result.get("features"):
+        audio_service.features.put({key: result["features"]})
+    else:
+        audio_service.features.remove([key])
+
+
+def complete_recording(payload: dict, result: dict) -> None:
+    """Register a processed recording, replacing the word's recording for that date"""
+    child_name, word_text = payload["child"], payload["word"]
+    year, month, day = payload["year"], payload["month"], payload["day"]
+    audio_service = AudioService(payload["audio_dir"])
+    metadata = AudioMetadata.from_dict(result["metadata"]) if result.get("metadata") else None
+
+    with DataService().transaction() as transaction:
+        child = transaction.get_child(child_name)
+        word = child.get_word(word_text) if child else None
+        if word is None:
+            # The word was deleted while the recording was processed; the file is discarded
+            raise LookupError(f"Word not found: {word_text}")
+
+        previous = word.get_recording(year, month, day)
+        transaction.add_recording(
+            child_name, word_text, year, month, day, result["filename"], metadata
+        )
+    # Released once committed, so a failed write leaves the data's file in place
+    if previous:
+        audio_service.delete_audio_file(child_name, word_text, previous.filename)
+    _store_features(audio_service, payload, result)
+
+
+def discard_recording(payload: dict, result: dict) -> None:
+    """Release a processed recording's new file, unless the data took it before failing"""
+    if result["filename"] == payload["filename"]:
+        # Analysis kept the recording's own file, which belongs to the data
+        return
+    child = DataService().get_child(payload["child"])
+    word = child.get_word(payload["word"]) if child else None
+    recording = (
+        word.get_recording(payload["year"], payload["month"], payload["day"]) if word else None
+    )
+    if recording is None or recording.filename != result["filename"]:
+        AudioService(payload["audio_dir"]).delete_audio_file(
+            payload["child"], payload["word"], result["filename"]
+        )
+
+
+def summarize_recording(result: dict) -> dict:
+    """Show a processed recording without its feature vector"""
+    return {**result, "features": result.get("features") is not None}
+
+
+@job_type(
+    "trim_recording",
+    complete=complete_recording,
+    cleanup=remove_staged,
+    discard=discard_recording,
+    summarize=summarize_recording,
+)
+def trim_recording(payload: dict) -> dict:
+    """Trim and save an uploaded recording, between given times or around its sound"""
+    audio_service = AudioService(payload["audio_dir"])
+    file = _staged_file(payload)
+    where = (payload["child"], payload["word"], payload["year"], payload["month"], payload["day"])
+    with file.stream:
+        if payload.get("auto_trim"):
+            filename = audio_service.save_audio_file_with_auto_trim(file, *where)
+        else:
+            filename = audio_service.save_audio_file_with_trim(
+                file, *where, payload["start"], payload["end"]
+            )
+    if not filename:
+        raise RuntimeError("Failed to save audio")
+    # The worker is already busy with this recording: level, probe, draw and describe it
+    try:
+        filename, metadata, features = normalize_new_recording(
+            audio_service, payload["child"], payload["word"], filename
+        )
+    except BaseException:
+        # Release the saved file, so a retry doesn't leave a second reference behind
+        audio_service.delete_audio_file(payload["child"], payload["word"], filename)
+        raise
+    return {
+        "year": payload["year"],
+        "month": payload["month"],
+        "day": payload["day"],
+        "filename": filename,
+        "metadata": metadata.to_dict() if metadata else None,
+        "features": _feature_list(features),
+    }
+
+
+def complete_analysis(payload: dict, result: dict) -> None:
+    """Store a recording's metadata, normalized file and features, unless it was replaced"""
+    metadata = AudioMetadata.from_dict(result["metadata"])
+    date = (payload["year"], payload["month"], payload["day"])
+    audio_service = AudioService(payload["audio_dir"])
+    if result.get("filename", payload["filename"]) == payload["filename"]:
+        stored = DataService().set_recording_metadata(
+            payload["child"], payload["word"], *date, payload["filename"], metadata
+        )
+    else:
+        recording = Recording(*date, payload["filename"])
+        switched = switch_recording_files(
+            DataService(),
+            audio_service,
+            [(payload["child"], payload["word"], recording, result["filename"], metadata)],
+        )
+        stored = switched > 0
+    if stored:
+        _store_features(audio_service, payload, result)
+
+
+@job_type(
+    "analyze_recording",
+    complete=complete_analysis,
+    discard=discard_recording,
+    summarize=summarize_recording,
+)
+def analyze_saved_recording(payload: dict) -> dict:
+    """Normalize and transcode a saved recording, probe it and compute its peaks and features
+
+    Files this host can't decode are still probed, and left for the library-wide
+    normalization.
+    """
+    audio_service = AudioService(payload["audio_dir"])
+    audio_path = audio_service.get_audio_file_path(
+        payload["child"], payload["word"], payload["filename"]
+    )
+    if audio_path is None:
+        raise ValueError("Audio file not found")
+    try:
+        pcm = read_pcm(audio_path)
+        name, metadata = normalize_recording(audio_service, audio_path, convert=True, pcm=pcm)
+    except ValueError:
+        return {
+            "filename": payload["filename"],
+            "metadata": analyze_recording(audio_path).to_dict(),
+            "features": None,
+        }
+    return {
+        "filename": name or payload["filename"],
+        "metadata": metadata.to_dict(),
+        "features": _feature_list(pcm_features(*pcm)),
+    }
+
+
+@job_type("build_montage")
+def build_word_montage(payload: dict) -> dict:
+    """Join a word's recordings into its montage, unless an earlier job already did"""
+    directory = montage_dir(payload["audio_dir"], payload["child"], payload["word"])
+    path = find_montage(directory, payload["key"])
+    if path is None:
+        audio_service = AudioService(payload["audio_dir"])
+        paths = [
+            audio_service.get_audio_file_path(payload["child"], payload["word"], filename)
+            for filename in payload["filenames"]
+        ]
+        opus = Config.AUDIO_STORAGE_CODEC == CANONICAL_CODEC and shutil.which("ffmpeg")
+        path = build_montage(
+            [path for path in paths if path],
+            directory,
+            payload["key"],
+            payload["gap"],
+            Config.AUDIO_OPUS_BITRATE if opus else None,
+        )
+    return {"filename": os.path.basename(path)}
+
+
+def complete_image(payload: dict, result: dict) -> None:
+    """Set a processed image as the word's image, releasing the previous one"""
+    child_name, word_text = payload["child"], payload["word"]
+    image_service = ImageService(payload.get("images_dir"))
+
+    with DataService().transaction() as transaction:
+        child = transaction.get_child(child_name)
+        word = child.get_word(word_text) if child else None
+        if word is None:
+            # The word was deleted while the image was processed; the file is discarded
+            raise LookupError(f"Word not found: {word_text}")
+
+        previous = word.image_filename
+        transaction.set_word_image(child_name, word_text, result["filename"])
+    # Released once committed, so a failed write leaves the data's file in place
+    if previous:
+        image_service.delete_image_file(word_text, previous)
+
+
+def discard_image(payload: dict, result: dict) -> None:
+    """Release a processed image, unless the data took it before failing"""
+    child = DataService().get_child(payload["child"])
+    word = child.get_word(payload["word"]) if child else None
+    if word is None or word.image_filename != result["filename"]:
+        ImageService(payload.get("images_dir")).delete_image_file(
+            payload["word"], result["filename"]
+        )
+
+
+@job_type("process_image", complete=complete_image, cleanup=remove_staged, discard=discard_image)
+def process_image(payload: dict) -> dict:
+    """Resize, sharpen and save an uploaded image"""
+    file = _staged_file(payload)
+    with file.stream:
+        filename = ImageService(payload["images_dir"]).save_image_file(file, payload["word"])
+    return {"filename": filename}
+
+
+@job_type("download_image", complete=complete_image, discard=discard_image)
+def download_image(payload: dict) -> dict:
+    """Download, resize and save an image from a URL"""
+    filename = ImageSearchService().download_image(payload["image_url"], payload["word"])
+    if not filename:
+        # Usually a network error, worth another attempt
+        raise RuntimeError("Failed to download image")
+    return {"filename": filename}
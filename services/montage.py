@@ -0,0 +1,91 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from typing import List, Optional
+
+from pydub import AudioSegment
+
+from models.word import Word
+
+
+def montage_key(word: Word, gap: float) -> str:
+    """Identify a montage by the word's recordings in date order
+
+    Recordings are named after their content, so any added, removed or replaced
+    recording gives a new key, and a cached montage can never be stale.
+    """
+    digest = hashlib.sha256(f"gap={gap}\n".encode())
+    for recording in word.recordings:
+        digest.update(f"{recording.year}-{recording.month}-{recording.day} ".encode())
+        digest.update(f"{recording.filename}\n".encode())
+    return digest.hexdigest()[:16]
+
+
+def montage_dir(audio_dir: str, child_name: str, word_text: str) -> str:
+    """Get the directory holding a word's montage
+
+    Named after a hash of the raw child name and word text, so words that differ
+    only in accents or non-ASCII characters never share a directory.
+    """
+    digest = hashlib.sha256(f"{child_name}\0{word_text}".encode()).hexdigest()[:32]
+    return os.path.join(audio_dir, ".montages", digest)
+
+
+def find_montage(directory: str, key: str) -> Optional[str]:
+    """Get the path of a built montage, if there is one"""
+    if not os.path.isdir(directory):
+        return None
+    for name in os.listdir(directory):
+        if name.split(".", 1)[0] == key:
+            return os.path.join(directory, name)
+    return None
+
+
+def remove_montages(audio_dir: str, child_name: str, word_text: str) -> None:
+    """Delete a word's cached montages"""
+    shutil.rmtree(montage_dir(audio_dir, child_name, word_text), ignore_errors=True)
+
+
+def build_montage(
+    paths: List[str], directory: str, key: str, gap: float, bitrate: Optional[str] = None
+) -> str:
+    """Join recordings with `gap` seconds of silence between them and cache the result
+
+    Recordings are mixed down to mono at the highest sample rate among them. The
+    montage is Opus in Ogg when a bitrate is given, else WAV. Montages of the word's
+    earlier recording lists are deleted. Returns the montage's path.
+    """
+    segments = [AudioSegment.from_file(path) for path in paths]
+    if not segments:
+        raise ValueError("No recordings to join")
+    rate = max(segment.frame_rate for segment in segments)
+
+    # Join raw samples once instead of growing a segment per recording
+    silence = AudioSegment.silent(int(gap * 1000), frame_rate=rate)
+    pieces = []
+    for index, segment in enumerate(segments):
+        if index:
+            pieces.append(silence.raw_data)
+        pieces.append(segment.set_channels(1).set_frame_rate(rate).set_sample_width(2).raw_data)
+    montage = AudioSegment(data=b"".join(pieces), sample_width=2, frame_rate=rate, channels=1)
+
+    extension = "ogg" if bitrate else "wav"
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".incoming.", suffix=f".{extension}")
+    os.close(fd)
+    try:
+        if bitrate:
+            montage.export(temp_path, format="ogg", codec="libopus", bitrate=bitrate)
+        else:
+            montage.export(temp_path, format="wav")
+        path = os.path.join(directory, f"{key}.{extension}")
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+
+    for name in os.listdir(directory):
+        if not name.startswith((key, ".incoming.")):
+            os.remove(os.path.join(directory, name))
+    return path
@@ -0,0 +1,161 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from models.child import Child
+from models.recording import AudioMetadata
+from models.word import Word
+
+PUT_CHILD = "put_child"
+DELETE_CHILD = "delete_child"
+ADD_WORD = "add_word"
+REMOVE_WORD = "remove_word"
+SET_IMAGE = "set_image"
+ADD_RECORDING = "add_recording"
+REMOVE_RECORDING = "remove_recording"
+SET_RECORDING_METADATA = "set_recording_metadata"
+
+
+@dataclass
+class Mutation:
+    """A single idempotent change to the data set, as recorded in the journal"""
+
+    op: str
+    child: str
+    args: Dict[str, Any] = field(default_factory=dict)
+
+    def to_dict(self) -> dict:
+        """Convert to dictionary for JSON serialization"""
+        return {"op": self.op, "child": self.child, "args": self.args}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Mutation":
+        """Create Mutation instance from dictionary"""
+        return cls(op=data["op"], child=data["child"], args=data.get("args", {}))
+
+
+def apply_mutation(children: List[Child], mutation: Mutation) -> bool:
+    """Apply a mutation to a list of children in place
+
+    Returns False when the targeted child or word doesn't exist, in which case nothing
+    is changed. Applying the same mutation twice has the same effect as applying it once.
+    """
+    args = mutation.args
+    if mutation.op == PUT_CHILD:
+        children[:] = [c for c in children if c.name != mutation.child]
+        children.append(Child.from_dict(args["child"], trusted=True))
+        return True
+
+    child = next((c for c in children if c.name == mutation.child), None)
+    if child is None:
+        return False
+
+    if mutation.op == DELETE_CHILD:
+        children.remove(child)
+        return True
+    if mutation.op == ADD_WORD:
+        child.add_word(Word.from_dict(args["word"], trusted=True))
+        return True
+    if mutation.op == REMOVE_WORD:
+        return child.remove_word(args["text"])
+
+    word = child.get_word(args["text"])
+    if word is None:
+        return False
+
+    if mutation.op == SET_IMAGE:
+        word.image_filename = args["filename"]
+        return True
+    if mutation.op == ADD_RECORDING:
+        metadata = AudioMetadata.from_dict(args["metadata"]) if args.get("metadata") else None
+        word.add_recording(args["year"], args["month"], args["day"], args["filename"], metadata)
+        return True
+    if mutation.op == REMOVE_RECORDING:
+        return word.remove_recording(args["year"], args["month"], args["day"])
+    if mutation.op == SET_RECORDING_METADATA:
+        recording = word.get_recording(args["year"], args["month"], args["day"])
+        # The recording may have been replaced by another file since it was probed
+        if recording is None or recording.filename != args["filename"]:
+            return False
+        recording.metadata = AudioMetadata.from_dict(args["metadata"])
+        return True
+
+    raise ValueError(f"Unknown mutation: {mutation.op}")
+
+
+class MutationMethods(ABC):
+    """Named helpers that build mutations and hand them to _submit
+
+    Shared by repositories, which persist each mutation right away, and transactions,
+    which collect them until commit.
+    """
+
+    @abstractmethod
+    def _submit(self, mutation: Mutation) -> bool:
+        """Apply or record a mutation, returning False if its target doesn't exist"""
+
+    def save_child(self, child: Child) -> None:
+        """Save or update a child"""
+        self._submit(Mutation(PUT_CHILD, child.name, {"child": child.to_dict()}))
+
+    def delete_child(self, name: str) -> bool:
+        """Delete a child"""
+        return self._submit(Mutation(DELETE_CHILD, name))
+
+    def add_word(self, child_name: str, word: Word) -> bool:
+        """Add a word to a child's vocabulary"""
+        return self._submit(Mutation(ADD_WORD, child_name, {"word": word.to_dict()}))
+
+    def remove_word(self, child_name: str, word_text: str) -> bool:
+        """Remove a word from a child's vocabulary"""
+        return self._submit(Mutation(REMOVE_WORD, child_name, {"text": word_text}))
+
+    def set_word_image(self, child_name: str, word_text: str, filename: Optional[str]) -> bool:
+        """Set or clear the image of a word"""
+        return self._submit(
+            Mutation(SET_IMAGE, child_name, {"text": word_text, "filename": filename})
+        )
+
+    def add_recording(
+        self,
+        child_name: str,
+        word_text: str,
+        year: int,
+        month: int,
+        day: int,
+        filename: str,
+        metadata: Optional[AudioMetadata] = None,
+    ) -> bool:
+        """Add or replace the recording of a word for a specific date"""
+        args = {"text": word_text, "year": year, "month": month, "day": day, "filename": filename}
+        if metadata is not None:
+            args["metadata"] = metadata.to_dict()
+        return self._submit(Mutation(ADD_RECORDING, child_name, args))
+
+    def remove_recording(
+        self, child_name: str, word_text: str, year: int, month: int, day: int
+    ) -> bool:
+        """Remove the recording of a word for a specific date"""
+        args = {"text": word_text, "year": year, "month": month, "day": day}
+        return self._submit(Mutation(REMOVE_RECORDING, child_name, args))
+
+    def set_recording_metadata(
+        self,
+        child_name: str,
+        word_text: str,
+        year: int,
+        month: int,
+        day: int,
+        filename: str,
+        metadata: AudioMetadata,
+    ) -> bool:
+        """Store the probed metadata of a recording, unless its file was replaced since"""
+        args = {
+            "text": word_text,
+            "year": year,
+            "month": month,
+            "day": day,
+            "filename": filename,
+            "metadata": metadata.to_dict(),
+        }
+        return self._submit(Mutation(SET_RECORDING_METADATA, child_name, args))
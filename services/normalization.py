@@ -0,0 +1,179 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, replace
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+from config import Config
+from models.recording import AudioMetadata, Recording
+from services.audio_conversion import switch_recording_files
+from services.audio_metadata import analyze_recording
+from services.audio_service import AudioService
+from services.data_service import DataService
+from services.features import pcm_features
+from services.library import library_files, recordings_by_file
+from services.loudness import normalization_gain
+from services.waveform import read_pcm
+
+# Gains smaller than this (dB) are inaudible and not worth re-encoding a file for
+GAIN_TOLERANCE = 1.0
+
+
+def normalize_recording(
+    audio_service: AudioService,
+    path: str,
+    convert: bool = False,
+    pcm: Optional[Tuple[np.ndarray, int]] = None,
+) -> Tuple[Optional[str], AudioMetadata]:
+    """Bring a stored recording to the target loudness, decoding it once
+
+    Returns the name of the new file, holding one reference, or None when the file is
+    close enough to the target as it is, and the metadata of the file to use with the
+    applied gain. With convert, a file kept at its level still moves to the storage
+    codec. Callers that already decoded the file pass its frames and rate as pcm.
+    Raises ValueError for files that can't be decoded.
+    """
+    frames, rate = pcm or read_pcm(path)
+    gain = normalization_gain(
+        frames, rate, Config.LOUDNESS_TARGET, Config.LOUDNESS_PEAK_CEILING, Config.LOUDNESS_MAX_GAIN
+    )
+    if abs(gain) < GAIN_TOLERANCE:
+        name = audio_service.store_transcoded(path) if convert else None
+        stored_path = audio_service.blobs.path(name) if name else path
+        try:
+            metadata = analyze_recording(stored_path, (frames, rate))
+        except BaseException:
+            if name:
+                audio_service.blobs.release(name)
+            raise
+        return name, replace(metadata, gain=0.0)
+
+    frames = frames * np.float32(10 ** (gain / 20))
+    extension = os.path.splitext(path)[1].lstrip(".").lower()
+    name = audio_service.store_pcm(frames, rate, extension)
+    try:
+        metadata = analyze_recording(audio_service.blobs.path(name), (frames, rate))
+    except BaseException:
+        audio_service.blobs.release(name)
+        raise
+    return name, replace(metadata, gain=round(gain, 2))
+
+
+def normalize_new_recording(
+    audio_service: AudioService,
+    child_name: str,
+    word_text: str,
+    filename: str,
+    convert: bool = False,
+) -> Tuple[str, Optional[AudioMetadata], Optional[np.ndarray]]:
+    """Normalize a recording saved but not yet registered, releasing the file it replaces
+
+    Returns the file to register with its metadata and features, all from one decode.
+    Files this host can't decode are kept as they are, without metadata or features,
+    for the library-wide runs to pick up.
+    """
+    path = audio_service.get_audio_file_path(child_name, word_text, filename)
+    if path is None:
+        return filename, None, None
+    try:
+        pcm = read_pcm(path)
+        name, metadata = normalize_recording(audio_service, path, convert, pcm)
+    except ValueError:
+        return filename, None, None
+    features = pcm_features(*pcm)
+    if name is None:
+        return filename, metadata, features
+    audio_service.delete_audio_file(child_name, word_text, filename)
+    return name, metadata, features
+
+
+@dataclass
+class NormalizationReport:
+    """Outcome of normalizing the loudness of existing recordings"""
+
+    normalized: int = 0
+    unchanged: int = 0
+    failed: List[Tuple[str, str]] = field(default_factory=list)
+
+
+def _normalize(task: Tuple[str, str]) -> Tuple[Optional[str], Optional[dict], Optional[str]]:
+    """Normalize one file in a worker process: the new name, metadata, or an error"""
+    audio_dir, path = task
+    try:
+        name, metadata = normalize_recording(AudioService(audio_dir), path)
+    except ValueError as e:
+        return None, None, str(e)
+    return name, metadata.to_dict(), None
+
+
+def normalize_library(
+    data_service: Optional[DataService] = None,
+    audio_service: Optional[AudioService] = None,
+    workers: Optional[int] = None,
+    batch_size: int = 50,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> NormalizationReport:
+    """Normalize the loudness of every recording that has no recorded gain, on a process pool
+
+    Results are stored after every batch of files, and recordings with a gain are
+    skipped, so an interrupted run picks up where it stopped. Files shared by several
+    recordings are processed once. `progress` is called with the files done and total.
+    """
+    data_service = data_service or DataService()
+    audio_service = audio_service or AudioService()
+    report = NormalizationReport()
+
+    users = recordings_by_file(
+        library_files(
+            data_service,
+            audio_service,
+            report.failed,
+            skip=lambda child, word, recording: recording.gain is not None,
+        )
+    )
+    if not users:
+        return report
+
+    paths = list(users)
+    with ProcessPoolExecutor(workers) as pool:
+        for start in range(0, len(paths), batch_size):
+            batch = paths[start : start + batch_size]
+            tasks = [(audio_service.audio_dir, path) for path in batch]
+            switches: List[Tuple[str, str, Recording, str, Optional[AudioMetadata]]] = []
+            unchanged: List[Tuple[str, str, Recording, AudioMetadata]] = []
+            for path, (name, result, error) in zip(batch, pool.map(_normalize, tasks)):
+                if result is None:
+                    report.failed.extend((r.filename, str(error)) for *_, r in users[path])
+                    continue
+                metadata = AudioMetadata.from_dict(result)
+                if name is None:
+                    unchanged.extend((*user, metadata) for user in users[path])
+                    continue
+                audio_service.blobs.retain(name, len(users[path]) - 1)
+                switches.extend((*user, name, metadata) for user in users[path])
+
+            report.normalized += switch_recording_files(data_service, audio_service, switches)
+            report.unchanged += _store_metadata(data_service, unchanged)
+            if progress:
+                progress(start + len(batch), len(paths))
+    return report
+
+
+def _store_metadata(
+    data_service: DataService, results: List[Tuple[str, str, Recording, AudioMetadata]]
+) -> int:
+    """Store the metadata of recordings whose file was kept, with one write"""
+    stored = 0
+    with data_service.transaction() as transaction:
+        for child_name, word_text, recording, metadata in results:
+            stored += transaction.set_recording_metadata(
+                child_name,
+                word_text,
+                recording.year,
+                recording.month,
+                recording.day,
+                recording.filename,
+                metadata,
+            )
+    return stored
@@ -0,0 +1,188 @@
+import base64
+import binascii
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from models.child import Child
+from models.recording import Recording
+from models.word import Word
+
+CHILD_FIELDS = ("name", "words", "word_count", "recording_count")
+WORD_FIELDS = ("text", "image_filename", "recordings", "recording_count")
+# Kept below SQLite's historical limit of 999 bound parameters per statement
+MAX_PAGE_SIZE = 500
+
+QUERY_ARGS = ("limit", "cursor", "fields", "word_prefix", "recorded_since")
+
+
+def encode_cursor(offset: int) -> str:
+    """Encode a result offset as an opaque cursor"""
+    return base64.urlsafe_b64encode(f"o:{offset}".encode("ascii")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> int:
+    """Decode a cursor produced by encode_cursor"""
+    try:
+        prefix, offset = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("ascii").split(":")
+        if prefix != "o" or int(offset) < 0:
+            raise ValueError
+        return int(offset)
+    except (binascii.Error, UnicodeError, ValueError):
+        raise ValueError("Invalid cursor") from None
+
+
+@dataclass(frozen=True)
+class ChildQuery:
+    """Page, projection and filters for listing children
+
+    Filters narrow the words of each child: word_prefix keeps words starting with the
+    prefix, recorded_since keeps words (and recordings) recorded on or after the date.
+    Children left without words are skipped. Field tuples of None mean every field.
+    """
+
+    limit: Optional[int] = None
+    offset: int = 0
+    fields: Optional[Tuple[str, ...]] = None
+    word_fields: Optional[Tuple[str, ...]] = None
+    word_prefix: Optional[str] = None
+    recorded_since: Optional[date] = None
+
+    @property
+    def filters_words(self) -> bool:
+        """Check if the query narrows down words"""
+        return self.word_prefix is not None or self.recorded_since is not None
+
+    @classmethod
+    def from_args(cls, args: Mapping[str, str]) -> "ChildQuery":
+        """Parse a query from request arguments, raising ValueError on bad input"""
+        limit = None
+        if args.get("limit"):
+            try:
+                limit = int(args["limit"])
+            except ValueError:
+                raise ValueError("limit must be an integer") from None
+            if not 1 <= limit <= MAX_PAGE_SIZE:
+                raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+
+        offset = decode_cursor(args["cursor"]) if args.get("cursor") else 0
+
+        fields = word_fields = None
+        if args.get("fields"):
+            fields, word_fields = cls._parse_fields(args["fields"])
+
+        recorded_since = None
+        if args.get("recorded_since"):
+            try:
+                recorded_since = date.fromisoformat(args["recorded_since"])
+            except ValueError:
+                raise ValueError("recorded_since must be a YYYY-MM-DD date") from None
+
+        return cls(
+            limit=limit,
+            offset=offset,
+            fields=fields,
+            word_fields=word_fields,
+            word_prefix=args.get("word_prefix") or None,
+            recorded_since=recorded_since,
+        )
+
+    @staticmethod
+    def _parse_fields(value: str) -> Tuple[Tuple[str, ...], Optional[Tuple[str, ...]]]:
+        """Split a comma separated field list into child fields and words.* fields"""
+        fields: List[str] = []
+        word_fields: List[str] = []
+        for name in (part.strip() for part in value.split(",")):
+            if not name:
+                continue
+            if name.startswith("words."):
+                if name[len("words.") :] not in WORD_FIELDS:
+                    raise ValueError(f"Unknown field: {name}")
+                word_fields.append(name[len("words.") :])
+                name = "words"
+            elif name not in CHILD_FIELDS:
+                raise ValueError(f"Unknown field: {name}")
+            if name not in fields:
+                fields.append(name)
+        return tuple(fields), tuple(word_fields) or None
+
+
+@dataclass
+class ChildPage:
+    """One page of projected children"""
+
+    children: List[dict]
+    next_cursor: Optional[str] = None
+
+
+def matching_words(child: Child, query: ChildQuery) -> List[Tuple[Word, List[Recording]]]:
+    """Get the words of a child passing the query filters, with their kept recordings"""
+    matches = []
+    for word in child.words:
+        if query.word_prefix is not None and not word.text.startswith(query.word_prefix):
+            continue
+        if query.recorded_since is None:
+            matches.append((word, word.recordings))
+            continue
+        recordings = word.get_recordings_between(query.recorded_since, date.max)
+        if recordings:
+            matches.append((word, recordings))
+    return matches
+
+
+def project_word(word: Word, recordings: List[Recording], fields: Tuple[str, ...]) -> dict:
+    """Build the requested fields of a word"""
+    values: Dict[str, Any] = {}
+    for field in fields:
+        if field == "text":
+            values["text"] = word.text
+        elif field == "image_filename":
+            values["image_filename"] = word.image_filename
+        elif field == "recordings":
+            values["recordings"] = [recording.to_dict() for recording in recordings]
+        elif field == "recording_count":
+            values["recording_count"] = len(recordings)
+    return values
+
+
+def project_child(
+    child: Child, words: List[Tuple[Word, List[Recording]]], query: ChildQuery
+) -> dict:
+    """Build the requested fields of a child from its matching words"""
+    word_fields = query.word_fields or ("text", "image_filename", "recordings")
+    values: Dict[str, Any] = {}
+    for field in query.fields or ("name", "words"):
+        if field == "name":
+            values["name"] = child.name
+        elif field == "words":
+            values["words"] = [project_word(w, recs, word_fields) for w, recs in words]
+        elif field == "word_count":
+            values["word_count"] = len(words)
+        elif field == "recording_count":
+            values["recording_count"] = sum(len(recs) for _, recs in words)
+    return values
+
+
+def run_query(children: Iterable[Child], query: ChildQuery) -> ChildPage:
+    """Evaluate a query over children in storage order
+
+    Children are consumed lazily and only the page is projected, so iteration stops
+    as soon as the page is full.
+    """
+    page: List[dict] = []
+    skipped = 0
+    for child in children:
+        words = None
+        if query.filters_words:
+            words = matching_words(child, query)
+            if not words:
+                continue
+        if skipped < query.offset:
+            skipped += 1
+            continue
+        if query.limit is not None and len(page) == query.limit:
+            return ChildPage(page, encode_cursor(query.offset + query.limit))
+        if words is None:
+            words = matching_words(child, query)
+        page.append(project_child(child, words, query))
+    return ChildPage(page)
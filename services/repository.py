@@ -0,0 +1,78 @@
+from abc import abstractmethod
+from dataclasses import dataclass
+from typing import List, Optional
+
+from models.child import Child
+from services.mutations import Mutation, MutationMethods
+from services.query import ChildPage, ChildQuery, run_query
+
+
+@dataclass(frozen=True)
+class DataVersion:
+    """Opaque version of stored data, used to build HTTP cache validators"""
+
+    tag: str
+    modified: float  # POSIX timestamp of the last change
+
+
+class CorruptDataError(Exception):
+    """Stored data exists but can't be parsed, and must not be overwritten
+
+    Not a ValueError, so routes report it as a server error rather than a bad request.
+    """
+
+
+class ChildRepository(MutationMethods):
+    """Storage backend interface used by DataService
+
+    Every change is expressed as a Mutation. Backends persist a batch of mutations in
+    apply_mutations with a single write (or database transaction), and the named
+    helpers such as add_recording submit a batch of one.
+    """
+
+    @abstractmethod
+    def initialize(self) -> None:
+        """Create the underlying storage if it doesn't exist"""
+
+    @abstractmethod
+    def export_data(self) -> dict:
+        """Get the full data set in the data.json document format"""
+
+    @abstractmethod
+    def import_data(self, data: dict) -> None:
+        """Replace the full data set with a data.json formatted document"""
+
+    @abstractmethod
+    def get_children(self) -> List[Child]:
+        """Get all children"""
+
+    @abstractmethod
+    def get_child(self, name: str) -> Optional[Child]:
+        """Get a specific child by name"""
+
+    @abstractmethod
+    def apply_mutations(self, mutations: List[Mutation]) -> List[bool]:
+        """Persist mutations in order with a single write
+
+        Returns one flag per mutation, False where its target didn't exist.
+        """
+
+    def get_version(self, child_name: Optional[str] = None) -> Optional[DataVersion]:
+        """Get the version of all data, or of one child's data
+
+        The version changes whenever the corresponding data changes. Backends that
+        can't tell return None.
+        """
+        return None
+
+    def query_children(self, query: ChildQuery) -> ChildPage:
+        """Get one page of children, filtered and projected as the query asks"""
+        return run_query(self.get_children(), query)
+
+    def count_children(self) -> int:
+        """Count children"""
+        return len(self.get_children())
+
+    def _submit(self, mutation: Mutation) -> bool:
+        """Persist a single mutation"""
+        return self.apply_mutations([mutation])[0]
@@ -0,0 +1,230 @@
+import hashlib
+import json
+import os
+import threading
+from contextlib import ExitStack
+from typing import Any, Dict, List, Optional, Tuple
+
+from models.child import Child
+from services.file_lock import FileLock, atomic_write_json
+from services.json_repository import FileVersion, JsonRepository
+from services.mutations import DELETE_CHILD, PUT_CHILD, Mutation, apply_mutation
+from services.query import ChildPage, ChildQuery, run_query
+from services.repository import ChildRepository, CorruptDataError, DataVersion
+
+# Process-wide cache of hydrated children, keyed by shard file path
+_child_cache: Dict[str, Tuple[FileVersion, Child]] = {}
+_child_cache_lock = threading.Lock()
+
+
+def _load_json(path: str) -> Any:
+    """Read a manifest or shard, refusing to treat a corrupt one as missing"""
+    with open(path, "r", encoding="utf-8") as f:
+        try:
+            return json.load(f)
+        except json.JSONDecodeError as e:
+            raise CorruptDataError(f"Data file {path} is corrupt: {e}") from e
+
+
+def child_id(name: str) -> str:
+    """Get the stable shard id for a child name"""
+    return hashlib.sha256(name.encode("utf-8")).hexdigest()[:16]
+
+
+class ShardedJsonRepository(ChildRepository):
+    """Repository storing each child in its own JSON file plus a small manifest
+
+    Shard files are named after a hash of the child name, so reading or changing one
+    child never touches the others. The manifest only lists names and ids, keeping
+    the insertion order of children.
+    """
+
+    def __init__(self, shard_dir: str):
+        self.shard_dir = shard_dir
+        self.manifest_file = os.path.join(shard_dir, "manifest.json")
+        self.manifest_lock = FileLock(f"{self.manifest_file}.lock")
+
+    def _shard_path(self, name: str) -> str:
+        """Get the file path of a child's shard"""
+        return os.path.join(self.shard_dir, f"{child_id(name)}.json")
+
+    def _shard_lock(self, name: str) -> FileLock:
+        """Get the lock guarding a child's shard"""
+        return FileLock(f"{self._shard_path(name)}.lock")
+
+    def initialize(self) -> None:
+        """Create the shard directory and manifest if they don't exist"""
+        os.makedirs(self.shard_dir, exist_ok=True)
+        if not os.path.exists(self.manifest_file):
+            with self.manifest_lock.exclusive():
+                if not os.path.exists(self.manifest_file):
+                    atomic_write_json(self.manifest_file, {"children": []}, indent=2)
+
+    def load_manifest(self) -> List[dict]:
+        """Get the manifest entries in child order"""
+        try:
+            entries: List[dict] = _load_json(self.manifest_file).get("children", [])
+            return entries
+        except FileNotFoundError:
+            return []
+
+    def _save_manifest(self, entries: List[dict]) -> None:
+        """Replace the manifest"""
+        atomic_write_json(self.manifest_file, {"children": entries}, indent=2)
+
+    def _read_shard(self, name: str) -> Optional[Child]:
+        """Load a child from its shard, reusing the cached model while unchanged"""
+        path = self._shard_path(name)
+        version = JsonRepository._stat_version(path)
+        if version is None:
+            return None
+        with _child_cache_lock:
+            cached = _child_cache.get(path)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        try:
+            child = Child.from_dict(_load_json(path), trusted=True)
+        except FileNotFoundError:
+            return None
+        with _child_cache_lock:
+            _child_cache[path] = (version, child)
+        return child
+
+    def _write_shard(self, child_data: dict) -> None:
+        """Replace a child's shard"""
+        path = self._shard_path(child_data["name"])
+        try:
+            atomic_write_json(path, child_data, indent=2)
+        finally:
+            with _child_cache_lock:
+                _child_cache.pop(path, None)
+
+    def export_data(self) -> dict:
+        """Get the full data set in the data.json document format"""
+        return {"children": [child.to_dict() for child in self.get_children()]}
+
+    def import_data(self, data: dict) -> None:
+        """Replace the full data set with a data.json formatted document"""
+        os.makedirs(self.shard_dir, exist_ok=True)
+        with self.manifest_lock.exclusive():
+            for entry in self.load_manifest():
+                self._remove_shard(entry["name"])
+            entries = []
+            for child_data in data.get("children", []):
+                self._write_shard(child_data)
+                entries.append({"id": child_id(child_data["name"]), "name": child_data["name"]})
+            self._save_manifest(entries)
+
+    def _remove_shard(self, name: str) -> None:
+        """Delete a child's shard file if present"""
+        path = self._shard_path(name)
+        if os.path.exists(path):
+            os.remove(path)
+        with _child_cache_lock:
+            _child_cache.pop(path, None)
+
+    def get_version(self, child_name: Optional[str] = None) -> Optional[DataVersion]:
+        """Get the version of one child's shard, or of the manifest and every shard"""
+        if child_name is not None:
+            paths = [self._shard_path(child_name)]
+        else:
+            paths = [self.manifest_file]
+            paths += [self._shard_path(entry["name"]) for entry in self.load_manifest()]
+
+        stamps = [JsonRepository._stat_version(path) for path in paths]
+        known = [stamp for stamp in stamps if stamp is not None]
+        if len(known) < len(stamps):
+            return None
+        tag = hashlib.sha256(repr(stamps).encode("ascii")).hexdigest()[:32]
+        return DataVersion(tag=tag, modified=max(stamp[2] for stamp in known) / 1e9)
+
+    def count_children(self) -> int:
+        """Count children from the manifest alone"""
+        return len(self.load_manifest())
+
+    def get_children(self) -> List[Child]:
+        """Get all children"""
+        children = (self._read_shard(entry["name"]) for entry in self.load_manifest())
+        return [child for child in children if child is not None]
+
+    def query_children(self, query: ChildQuery) -> ChildPage:
+        """Get one page of children, reading shards only until the page is full"""
+        children = (self._read_shard(entry["name"]) for entry in self.load_manifest())
+        return run_query((child for child in children if child is not None), query)
+
+    def get_child(self, name: str) -> Optional[Child]:
+        """Get a specific child by name, reading only its shard"""
+        # Shards are replaced atomically, so readers don't need the lock
+        return self._read_shard(name)
+
+    def _load_shard_for_update(self, name: str) -> Optional[Child]:
+        """Load a private copy of a child's shard for modification"""
+        try:
+            return Child.from_dict(_load_json(self._shard_path(name)), trusted=True)
+        except FileNotFoundError:
+            return None
+
+    def apply_mutations(self, mutations: List[Mutation]) -> List[bool]:
+        """Apply mutations, writing each touched shard once
+
+        Only the shards of the targeted children are locked, read and written. The
+        manifest is locked and rewritten only when children are added or removed.
+        """
+        names = sorted({m.child for m in mutations})
+        touches_manifest = any(m.op in (PUT_CHILD, DELETE_CHILD) for m in mutations)
+
+        with ExitStack() as stack:
+            if touches_manifest:
+                stack.enter_context(self.manifest_lock.exclusive())
+            # Lock shards in a fixed order so concurrent batches can't deadlock
+            for name in names:
+                stack.enter_context(self._shard_lock(name).exclusive())
+
+            children = {name: self._load_shard_for_update(name) for name in names}
+            results = []
+            for mutation in mutations:
+                target = children[mutation.child]
+                if mutation.op == PUT_CHILD:
+                    children[mutation.child] = Child.from_dict(mutation.args["child"], trusted=True)
+                    results.append(True)
+                elif target is None:
+                    results.append(False)
+                elif mutation.op == DELETE_CHILD:
+                    children[mutation.child] = None
+                    results.append(True)
+                else:
+                    results.append(apply_mutation([target], mutation))
+
+            changed = {m.child for m, ok in zip(mutations, results) if ok}
+            for name in sorted(changed):
+                child = children[name]
+                if child is None:
+                    self._remove_shard(name)
+                else:
+                    self._write_shard(child.to_dict())
+
+            manifest_changes = [
+                m for m, ok in zip(mutations, results) if ok and m.op in (PUT_CHILD, DELETE_CHILD)
+            ]
+            if manifest_changes:
+                entries = self.load_manifest()
+                for mutation in manifest_changes:
+                    # A re-saved child moves to the end, like in data.json
+                    entries = [e for e in entries if e["name"] != mutation.child]
+                    if mutation.op == PUT_CHILD:
+                        entries.append({"id": child_id(mutation.child), "name": mutation.child})
+                self._save_manifest(entries)
+            return results
+
+
+def split_data_file(data_file: str, shard_dir: str) -> int:
+    """Split a data.json file into per-child shards
+
+    Returns the number of migrated children. Existing shards are replaced.
+    """
+    data = JsonRepository(data_file).export_data()
+    repository = ShardedJsonRepository(shard_dir)
+    repository.initialize()
+    repository.import_data(data)
+    return len(data.get("children", []))
@@ -0,0 +1,42 @@
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+def window_levels(samples: np.ndarray, rate: int, window: float) -> Tuple[np.ndarray, int]:
+    """Get the RMS level in dB of each `window`-second slice of mono samples, and its size
+
+    The last slice is padded with silence. Slices of digital silence are -inf.
+    """
+    size = max(1, int(rate * window))
+    whole = len(samples) // size * size
+    grid = samples[:whole].reshape(-1, size)
+    # Sums of squares without materializing the squared samples
+    energy = np.einsum("ij,ij->i", grid, grid)
+    if whole < len(samples):
+        rest = samples[whole:]
+        energy = np.append(energy, np.dot(rest, rest))
+    with np.errstate(divide="ignore"):
+        return 10 * np.log10(energy / size), size
+
+
+def find_sound(
+    samples: np.ndarray, rate: int, threshold: float, window: float, padding: float
+) -> Optional[Tuple[float, float]]:
+    """Find the span, in seconds, between the leading and trailing silence of mono samples
+
+    Windows more than `threshold` dB below the loudest one count as silence, so the
+    level of the microphone doesn't matter. The span is widened by `padding` seconds on
+    both sides to keep soft onsets and decays. Returns None for digital silence.
+    """
+    if len(samples) == 0 or not rate:
+        return None
+    levels, size = window_levels(samples, rate, window)
+    loudest = levels.max()
+    if not np.isfinite(loudest):
+        return None
+
+    sound = np.flatnonzero(levels >= loudest - threshold)
+    start = max(sound[0] * size / rate - padding, 0.0)
+    end = min((sound[-1] + 1) * size / rate + padding, len(samples) / rate)
+    return start, end
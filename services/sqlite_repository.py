@@ -0,0 +1,360 @@
+import json
+import sqlite3
+import time
+from contextlib import closing
+from dataclasses import replace
+from typing import Dict, List, Optional, Sequence, Union
+
+from models.child import Child
+from models.recording import AudioMetadata, Recording
+from models.word import Word
+from services.json_repository import JsonRepository
+from services.mutations import (
+    ADD_RECORDING,
+    ADD_WORD,
+    DELETE_CHILD,
+    PUT_CHILD,
+    REMOVE_RECORDING,
+    REMOVE_WORD,
+    SET_IMAGE,
+    SET_RECORDING_METADATA,
+    Mutation,
+)
+from services.query import ChildPage, ChildQuery, encode_cursor, run_query
+from services.repository import ChildRepository, DataVersion
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS children (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_children_name ON children (name);
+
+CREATE TABLE IF NOT EXISTS words (
+    id INTEGER PRIMARY KEY,
+    child_id INTEGER NOT NULL REFERENCES children (id) ON DELETE CASCADE,
+    text TEXT NOT NULL,
+    image_filename TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_words_child_text ON words (child_id, text);
+
+CREATE TABLE IF NOT EXISTS recordings (
+    id INTEGER PRIMARY KEY,
+    word_id INTEGER NOT NULL REFERENCES words (id) ON DELETE CASCADE,
+    year INTEGER NOT NULL,
+    month INTEGER NOT NULL,
+    day INTEGER NOT NULL,
+    filename TEXT NOT NULL,
+    metadata TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_recordings_word_date
+    ON recordings (word_id, year, month, day);
+
+CREATE TABLE IF NOT EXISTS meta (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    version INTEGER NOT NULL,
+    modified REAL NOT NULL
+);
+INSERT OR IGNORE INTO meta (id, version, modified) VALUES (1, 0, 0);
+"""
+
+RECORDED_SINCE_CONDITION = """
+EXISTS (SELECT 1 FROM recordings WHERE recordings.word_id = words.id
+    AND recordings.year * 10000 + recordings.month * 100 + recordings.day >= ?)
+"""
+
+WORD_ID_QUERY = """
+SELECT words.id FROM words
+JOIN children ON children.id = words.child_id
+WHERE children.name = ? AND words.text = ?
+"""
+
+
+class SqliteRepository(ChildRepository):
+    """Repository storing children, words and recordings in normalized SQLite tables"""
+
+    def __init__(self, database_path: str):
+        self.database_path = database_path
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection with foreign keys enforced"""
+        conn = sqlite3.connect(self.database_path, timeout=30)
+        conn.execute("PRAGMA foreign_keys = ON")
+        return conn
+
+    def initialize(self) -> None:
+        """Create the database schema if it doesn't exist"""
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.executescript(SCHEMA)
+            # Databases created before recordings had metadata
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(recordings)")}
+            if "metadata" not in columns:
+                conn.execute("ALTER TABLE recordings ADD COLUMN metadata TEXT")
+
+    def export_data(self) -> dict:
+        """Get the full data set in the data.json document format"""
+        return {"children": [child.to_dict() for child in self.get_children()]}
+
+    def import_data(self, data: dict) -> None:
+        """Replace the full data set with a data.json formatted document"""
+        children = [Child.from_dict(child_data) for child_data in data.get("children", [])]
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM children")
+            for child in children:
+                self._insert_child(conn, child)
+            self._bump_version(conn)
+
+    def _load_children(
+        self, conn: sqlite3.Connection, child_filter: str = "", params: Sequence = ()
+    ) -> List[Child]:
+        """Hydrate children (optionally filtered by a WHERE clause) with three indexed queries"""
+        children: Dict[int, Child] = {}
+        for child_id, child_name in conn.execute(
+            f"SELECT id, name FROM children{child_filter} ORDER BY id", params
+        ):
+            children[child_id] = Child(child_name)
+
+        words: Dict[int, Word] = {}
+        for word_id, child_id, text, image_filename in conn.execute(
+            "SELECT words.id, words.child_id, words.text, words.image_filename FROM words "
+            f"JOIN children ON children.id = words.child_id{child_filter} ORDER BY words.id",
+            params,
+        ):
+            word = Word(text, image_filename=image_filename)
+            words[word_id] = word
+            children[child_id].add_word(word)
+
+        for word_id, year, month, day, filename, metadata in conn.execute(
+            "SELECT recordings.word_id, recordings.year, recordings.month, recordings.day, "
+            "recordings.filename, recordings.metadata FROM recordings "
+            "JOIN words ON words.id = recordings.word_id "
+            f"JOIN children ON children.id = words.child_id{child_filter} "
+            "ORDER BY recordings.year, recordings.month, recordings.day",
+            params,
+        ):
+            data = {"year": year, "month": month, "day": day, "filename": filename}
+            if metadata:
+                data["metadata"] = json.loads(metadata)
+            words[word_id].recordings.append(Recording.from_dict(data, trusted=True))
+
+        return list(children.values())
+
+    def _insert_child(self, conn: sqlite3.Connection, child: Child) -> None:
+        """Insert a child with all its words and recordings"""
+        child_id = _inserted_id(
+            conn.execute("INSERT INTO children (name) VALUES (?)", (child.name,))
+        )
+        for word in child.words:
+            word_id = _inserted_id(
+                conn.execute(
+                    "INSERT INTO words (child_id, text, image_filename) VALUES (?, ?, ?)",
+                    (child_id, word.text, word.image_filename),
+                )
+            )
+            self._insert_recordings(conn, word_id, word.recordings)
+
+    def _insert_recordings(
+        self, conn: sqlite3.Connection, word_id: int, recordings: List[Recording]
+    ) -> None:
+        """Insert the recordings of a word"""
+        conn.executemany(
+            "INSERT INTO recordings (word_id, year, month, day, filename, metadata) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (word_id, r.year, r.month, r.day, r.filename, _metadata_json(r.metadata))
+                for r in recordings
+            ],
+        )
+
+    def get_children(self) -> List[Child]:
+        """Get all children"""
+        with closing(self._connect()) as conn:
+            return self._load_children(conn)
+
+    def get_child(self, name: str) -> Optional[Child]:
+        """Get a specific child by name"""
+        with closing(self._connect()) as conn:
+            children = self._load_children(conn, " WHERE children.name = ?", (name,))
+        return children[0] if children else None
+
+    def query_children(self, query: ChildQuery) -> ChildPage:
+        """Get one page of children, selecting the page in SQL and hydrating only it"""
+        conditions: List[str] = []
+        params: List[object] = []
+        if query.word_prefix is not None:
+            conditions.append("substr(words.text, 1, ?) = ?")
+            params += [len(query.word_prefix), query.word_prefix]
+        if query.recorded_since is not None:
+            since = query.recorded_since
+            conditions.append(RECORDED_SINCE_CONDITION)
+            params.append(since.year * 10000 + since.month * 100 + since.day)
+        where = ""
+        if conditions:
+            where = (
+                " WHERE EXISTS (SELECT 1 FROM words WHERE words.child_id = children.id AND "
+                + " AND ".join(conditions)
+                + ")"
+            )
+
+        # Fetch one extra id to learn whether another page follows
+        limit = -1 if query.limit is None else query.limit + 1
+        with closing(self._connect()) as conn:
+            ids = [
+                row[0]
+                for row in conn.execute(
+                    f"SELECT id FROM children{where} ORDER BY id LIMIT ? OFFSET ?",
+                    (*params, limit, query.offset),
+                )
+            ]
+            has_more = query.limit is not None and len(ids) > query.limit
+            ids = ids[: query.limit]
+            children = []
+            if ids:
+                placeholders = ", ".join("?" * len(ids))
+                children = self._load_children(conn, f" WHERE children.id IN ({placeholders})", ids)
+
+        page = run_query(children, replace(query, limit=None, offset=0))
+        if has_more:
+            page.next_cursor = encode_cursor(query.offset + len(ids))
+        return page
+
+    def count_children(self) -> int:
+        """Count children"""
+        with closing(self._connect()) as conn:
+            return int(conn.execute("SELECT COUNT(*) FROM children").fetchone()[0])
+
+    def apply_mutations(self, mutations: List[Mutation]) -> List[bool]:
+        """Apply mutations as row-level statements inside one database transaction"""
+        with closing(self._connect()) as conn, conn:
+            results = [self._apply(conn, mutation) for mutation in mutations]
+            if any(results):
+                self._bump_version(conn)
+            return results
+
+    def _bump_version(self, conn: sqlite3.Connection) -> None:
+        """Record that the data changed"""
+        conn.execute("UPDATE meta SET version = version + 1, modified = ?", (time.time(),))
+
+    def get_version(self, child_name: Optional[str] = None) -> Optional[DataVersion]:
+        """Get the version counter of the database, shared by every child"""
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT version, modified FROM meta").fetchone()
+        return DataVersion(tag=f"sqlite-{row[0]:x}", modified=row[1]) if row else None
+
+    def _apply(self, conn: sqlite3.Connection, mutation: Mutation) -> bool:
+        """Translate a single mutation into SQL"""
+        args = mutation.args
+
+        if mutation.op == PUT_CHILD:
+            conn.execute("DELETE FROM children WHERE name = ?", (mutation.child,))
+            self._insert_child(conn, Child.from_dict(args["child"], trusted=True))
+            return True
+
+        if mutation.op == DELETE_CHILD:
+            cursor = conn.execute("DELETE FROM children WHERE name = ?", (mutation.child,))
+            return cursor.rowcount > 0
+
+        if mutation.op == ADD_WORD:
+            row = conn.execute(
+                "SELECT id FROM children WHERE name = ?", (mutation.child,)
+            ).fetchone()
+            if not row:
+                return False
+            word = Word.from_dict(args["word"], trusted=True)
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO words (child_id, text, image_filename) VALUES (?, ?, ?)",
+                (row[0], word.text, word.image_filename),
+            )
+            if cursor.rowcount:
+                self._insert_recordings(conn, _inserted_id(cursor), word.recordings)
+            return True
+
+        if mutation.op == REMOVE_WORD:
+            cursor = conn.execute(
+                f"DELETE FROM words WHERE id IN ({WORD_ID_QUERY})", (mutation.child, args["text"])
+            )
+            return cursor.rowcount > 0
+
+        if mutation.op == SET_IMAGE:
+            cursor = conn.execute(
+                f"UPDATE words SET image_filename = ? WHERE id IN ({WORD_ID_QUERY})",
+                (args["filename"], mutation.child, args["text"]),
+            )
+            return cursor.rowcount > 0
+
+        if mutation.op == ADD_RECORDING:
+            # Validate the date the same way the model does
+            Recording(args["year"], args["month"], args["day"], args["filename"])
+            row = conn.execute(WORD_ID_QUERY, (mutation.child, args["text"])).fetchone()
+            if not row:
+                return False
+            conn.execute(
+                "INSERT INTO recordings (word_id, year, month, day, filename, metadata) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (word_id, year, month, day) DO UPDATE SET "
+                "filename = excluded.filename, metadata = excluded.metadata",
+                (
+                    row[0],
+                    args["year"],
+                    args["month"],
+                    args["day"],
+                    args["filename"],
+                    _metadata_json(args.get("metadata")),
+                ),
+            )
+            return True
+
+        if mutation.op == REMOVE_RECORDING:
+            cursor = conn.execute(
+                f"DELETE FROM recordings WHERE word_id IN ({WORD_ID_QUERY}) "
+                "AND year = ? AND month = ? AND day = ?",
+                (mutation.child, args["text"], args["year"], args["month"], args["day"]),
+            )
+            return cursor.rowcount > 0
+
+        if mutation.op == SET_RECORDING_METADATA:
+            cursor = conn.execute(
+                f"UPDATE recordings SET metadata = ? WHERE word_id IN ({WORD_ID_QUERY}) "
+                "AND year = ? AND month = ? AND day = ? AND filename = ?",
+                (
+                    _metadata_json(args["metadata"]),
+                    mutation.child,
+                    args["text"],
+                    args["year"],
+                    args["month"],
+                    args["day"],
+                    args["filename"],
+                ),
+            )
+            return cursor.rowcount > 0
+
+        raise ValueError(f"Unknown mutation: {mutation.op}")
+
+
+def _inserted_id(cursor: sqlite3.Cursor) -> int:
+    """Get the id of the row an INSERT statement added"""
+    if cursor.lastrowid is None:
+        raise sqlite3.DatabaseError("No row was inserted")
+    return cursor.lastrowid
+
+
+def _metadata_json(metadata: Union[AudioMetadata, dict, None]) -> Optional[str]:
+    """Serialize recording metadata, given as a model or a dictionary, for its column"""
+    if metadata is None:
+        return None
+    if isinstance(metadata, AudioMetadata):
+        metadata = metadata.to_dict()
+    return json.dumps(metadata, sort_keys=True)
+
+
+def migrate_json_to_sqlite(data_file: str, database_path: str) -> int:
+    """Copy the contents of a data.json file into an SQLite database
+
+    Returns the number of migrated children. Existing rows in the database are replaced.
+    """
+    data = JsonRepository(data_file).load_data()
+    repository = SqliteRepository(database_path)
+    repository.initialize()
+    repository.import_data(data)
+    return len(data.get("children", []))
@@ -0,0 +1,143 @@
+import json
+import wave
+from typing import Optional, Tuple
+
+import numpy as np
+from pydub import AudioSegment
+
+from services.file_lock import atomic_write_json
+
+# Bucket counts of the stored zoom levels, from a phone-width overview to a zoomed-in editor
+PEAK_LEVELS = (256, 1024, 4096)
+
+# Sidecar files sit next to the audio file they describe, named after it plus this suffix
+PEAKS_SUFFIX = "peaks.json"
+
+
+def peaks_path(audio_path: str) -> str:
+    """Get the path of the peaks sidecar of an audio file"""
+    return f"{audio_path}.{PEAKS_SUFFIX}"
+
+
+def _scale(samples: np.ndarray, width: int, channels: int) -> np.ndarray:
+    """Turn interleaved integer samples into float frames in [-1, 1]"""
+    frames = samples.astype(np.float32).reshape(-1, channels)
+    frames *= 1 / float(2 ** (8 * width - 1))
+    return frames
+
+
+def read_wav(audio_path: str) -> Optional[Tuple[np.ndarray, int]]:
+    """Read a plain PCM WAV file without ffmpeg, or None for any other file"""
+    try:
+        with wave.open(audio_path, "rb") as f:
+            width, channels, rate = f.getsampwidth(), f.getnchannels(), f.getframerate()
+            raw = f.readframes(f.getnframes())
+    except (wave.Error, EOFError):
+        return None
+    if width == 1:
+        samples = np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128
+    elif width in (2, 4):
+        samples = np.frombuffer(raw, dtype=f"<i{width}")
+    else:
+        return None
+    return _scale(samples, width, channels), rate
+
+
+def segment_pcm(audio: AudioSegment) -> Tuple[np.ndarray, int]:
+    """Get the float frames and sample rate of audio already decoded by pydub"""
+    if audio.sample_width in (2, 4):
+        samples = np.frombuffer(audio.raw_data, dtype=f"<i{audio.sample_width}")
+    else:
+        samples = np.array(audio.get_array_of_samples())
+    return _scale(samples, audio.sample_width, audio.channels), audio.frame_rate
+
+
+def read_pcm(audio_path: str) -> Tuple[np.ndarray, int]:
+    """Decode an audio file to float frames in [-1, 1] (one column per channel) and its rate"""
+    pcm = read_wav(audio_path)
+    if pcm is not None:
+        return pcm
+    try:
+        audio = AudioSegment.from_file(audio_path)
+    except Exception as e:
+        raise ValueError(f"Unsupported audio file: {e}") from None
+    return segment_pcm(audio)
+
+
+def to_mono(frames: np.ndarray) -> np.ndarray:
+    """Mix float frames down to one channel"""
+    return frames[:, 0] if frames.shape[1] == 1 else frames.mean(axis=1)
+
+
+def decode_pcm(audio_path: str) -> Tuple[np.ndarray, int]:
+    """Decode an audio file to mono float samples in [-1, 1] and its sample rate"""
+    frames, rate = read_pcm(audio_path)
+    return to_mono(frames), rate
+
+
+def compute_peaks(samples: np.ndarray, buckets: int) -> np.ndarray:
+    """Get the min and max of each of `buckets` equal slices of the samples, as int8 pairs"""
+    buckets = max(1, min(buckets, len(samples)))
+    if len(samples) == 0:
+        return np.zeros((1, 2), dtype=np.int8)
+
+    # Pad with the last sample so every bucket has the same width
+    width = -(-len(samples) // buckets)
+    padded = np.pad(samples, (0, width * buckets - len(samples)), mode="edge")
+    grid = padded.reshape(buckets, width)
+    pairs = np.stack([grid.min(axis=1), grid.max(axis=1)], axis=1)
+    return np.clip(np.round(pairs * 127), -127, 127).astype(np.int8)
+
+
+def build_peaks(samples: np.ndarray, rate: int) -> dict:
+    """Compute the waveform peaks of mono samples at every zoom level"""
+    return {
+        "duration": len(samples) / rate if rate else 0.0,
+        "sample_rate": rate,
+        "levels": {
+            str(buckets): compute_peaks(samples, buckets).ravel().tolist()
+            for buckets in PEAK_LEVELS
+        },
+    }
+
+
+def write_peaks(
+    audio_path: str, samples: Optional[np.ndarray] = None, rate: Optional[int] = None
+) -> dict:
+    """Compute an audio file's peaks, from already decoded samples if given, and store them"""
+    if samples is None or rate is None:
+        samples, rate = decode_pcm(audio_path)
+    peaks = build_peaks(samples, rate)
+    atomic_write_json(peaks_path(audio_path), peaks, separators=(",", ":"))
+    return peaks
+
+
+def load_peaks(audio_path: str) -> Optional[dict]:
+    """Load an audio file's stored peaks, if they were computed"""
+    try:
+        with open(peaks_path(audio_path), "r", encoding="utf-8") as f:
+            peaks: dict = json.load(f)
+            return peaks
+    except FileNotFoundError:
+        return None
+
+
+def peaks_level(peaks: dict, buckets: Optional[int] = None) -> dict:
+    """Pick the stored zoom level for a display width: the smallest with enough buckets"""
+    levels = sorted(int(level) for level in peaks["levels"])
+    chosen = next((level for level in levels if level >= (buckets or 0)), levels[-1])
+    data = peaks["levels"][str(chosen)]
+    return {
+        "duration": peaks["duration"],
+        "sample_rate": peaks["sample_rate"],
+        "buckets": len(data) // 2,
+        "peaks": data,
+    }
+
+
+def ensure_peaks(audio_path: str) -> dict:
+    """Load an audio file's peaks, computing them first for files saved without"""
+    peaks = load_peaks(audio_path)
+    if peaks is None:
+        peaks = write_peaks(audio_path)
+    return peaks
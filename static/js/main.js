@@ -64,6 +64,27 @@ async function apiRequest(url, options = {}) {
     }
 }
 
+// Wait for the background job behind a 202 response, returning its result
+async function waitForJob(response) {
+    if (response.status !== 202) {
+        return await response.json();
+    }
+
+    const { status_url: statusUrl } = await response.json();
+    let delay = 250;
+    while (true) {
+        await new Promise(resolve => setTimeout(resolve, delay));
+        const job = await apiRequest(statusUrl);
+        if (job.status === 'succeeded') {
+            return job.result;
+        }
+        if (job.status === 'failed') {
+            throw new Error(job.error || 'Processing failed');
+        }
+        delay = Math.min(delay * 2, 2000);
+    }
+}
+
 // Child management
 async function addChild() {
     const nameInput = document.getElementById('childName');
@@ -175,6 +196,7 @@ async function addImage(childName) {
             const error = await response.json();
             throw new Error(error.error || 'Upload failed');
         }
+        await waitForJob(response);
 
         showAlert(`Image for "${currentWord}" has been uploaded successfully!`, 'success');
 
@@ -195,7 +217,40 @@ async function addImage(childName) {
 // Audio playback
 function playAudio(childName, wordText, year, month, day, filename) {
     const button = event.target.closest('.play-btn');
+    playSource(button, `/api/audio/${encodeURIComponent(childName)}/${encodeURIComponent(wordText)}/${encodeURIComponent(filename)}`);
+}
+
+// Play every recording of a word in date order, joined into one file by the server
+async function playMontage(button) {
+    const url = `/api/children/${encodeURIComponent(button.dataset.child)}/words/${encodeURIComponent(button.dataset.word)}/montage`;
+
+    // Clicking while playing stops
+    if (button.classList.contains('playing')) {
+        playSource(button, url);
+        return;
+    }
 
+    button.disabled = true;
+    try {
+        let response = await fetch(url);
+        if (response.status === 202) {
+            // Not built for these recordings yet
+            await waitForJob(response);
+            response = await fetch(url);
+        }
+        if (!response.ok) {
+            const error = await response.json();
+            throw new Error(error.error || 'Montage failed');
+        }
+        playSource(button, URL.createObjectURL(await response.blob()));
+    } catch (error) {
+        showAlert(`Failed to play all recordings: ${error.message}`, 'danger');
+    } finally {
+        button.disabled = false;
+    }
+}
+
+function playSource(button, url) {
     // Stop current audio if playing
     if (currentAudio && !currentAudio.paused) {
         currentAudio.pause();
@@ -218,7 +273,7 @@ function playAudio(childName, wordText, year, month, day, filename) {
     }
 
     // Set up new audio
-    currentAudio = new Audio(`/api/audio/${encodeURIComponent(childName)}/${encodeURIComponent(wordText)}/${encodeURIComponent(filename)}`);
+    currentAudio = new Audio(url);
     currentPlayButton = button;
 
     // Update button state
@@ -275,6 +330,8 @@ document.addEventListener('DOMContentLoaded', function() {
             const filename = button.dataset.filename;
 
             playAudio(childName, wordText, year, month, day, filename);
+        } else if (event.target.closest('.montage-btn')) {
+            playMontage(event.target.closest('.montage-btn'));
         }
     });
 
@@ -341,6 +398,7 @@ class AudioTrimmer {
         this.selectionInfo = document.getElementById(selectionInfoId);
 
         this.audioBuffer = null;
+        this.peaks = null;
         this.audioContext = null;
         this.startTime = 0;
         this.endTime = 0;
@@ -357,18 +415,28 @@ class AudioTrimmer {
             // Create audio context
             this.audioContext = new (window.AudioContext || window.webkitAudioContext)();
 
-            // Load audio data
-            let audioData;
-            if (audioSrc instanceof Blob) {
-                audioData = await audioSrc.arrayBuffer();
-            } else {
-                const response = await fetch(audioSrc);
-                audioData = await response.arrayBuffer();
+            // Stored recordings have precomputed peaks, so skip downloading and decoding
+            this.peaks = null;
+            if (!(audioSrc instanceof Blob)) {
+                this.peaks = await this.loadPeaks(audioSrc);
             }
 
-            // Decode audio data
-            this.audioBuffer = await this.audioContext.decodeAudioData(audioData);
-            this.duration = this.audioBuffer.duration;
+            if (this.peaks) {
+                this.duration = this.peaks.duration;
+            } else {
+                // Load audio data
+                let audioData;
+                if (audioSrc instanceof Blob) {
+                    audioData = await audioSrc.arrayBuffer();
+                } else {
+                    const response = await fetch(audioSrc);
+                    audioData = await response.arrayBuffer();
+                }
+
+                // Decode audio data
+                this.audioBuffer = await this.audioContext.decodeAudioData(audioData);
+                this.duration = this.audioBuffer.duration;
+            }
 
             // Reset selection to full audio
             this.startTime = 0;
@@ -388,17 +456,54 @@ class AudioTrimmer {
         }
     }
 
+    async loadPeaks(audioSrc) {
+        // Ask for about one min/max pair per canvas pixel
+        const buckets = this.canvas.offsetWidth || 256;
+        try {
+            const response = await fetch(`${audioSrc.split('?')[0]}/peaks?buckets=${buckets}`);
+            return response.ok ? await response.json() : null;
+        } catch (error) {
+            return null;
+        }
+    }
+
+    // Get the min and max sample of pixel column i out of width
+    columnRange(i, width) {
+        if (this.peaks) {
+            const { peaks, buckets } = this.peaks;
+            const first = Math.floor(i * buckets / width);
+            const last = Math.max(first + 1, Math.floor((i + 1) * buckets / width));
+            let min = 127;
+            let max = -127;
+            for (let b = first; b < last && b < buckets; b++) {
+                if (peaks[2 * b] < min) min = peaks[2 * b];
+                if (peaks[2 * b + 1] > max) max = peaks[2 * b + 1];
+            }
+            return [min / 127, max / 127];
+        }
+
+        // Get audio data (use first channel)
+        const data = this.audioBuffer.getChannelData(0);
+        const step = Math.ceil(data.length / width);
+        let min = 1.0;
+        let max = -1.0;
+
+        for (let j = 0; j < step; j++) {
+            const datum = data[(i * step) + j];
+            if (datum < min) min = datum;
+            if (datum > max) max = datum;
+        }
+        return [min, max];
+    }
+
     drawWaveform() {
-        if (!this.audioBuffer) return;
+        if (!this.audioBuffer && !this.peaks) return;
 
         const width = this.canvas.width = this.canvas.offsetWidth;
         const height = this.canvas.height = this.canvas.offsetHeight;
 
         this.ctx.clearRect(0, 0, width, height);
 
-        // Get audio data (use first channel)
-        const data = this.audioBuffer.getChannelData(0);
-        const step = Math.ceil(data.length / width);
         const amp = height / 2;
 
         // Draw waveform
@@ -406,14 +511,7 @@ class AudioTrimmer {
         this.ctx.globalAlpha = 0.6;
 
         for (let i = 0; i < width; i++) {
-            let min = 1.0;
-            let max = -1.0;
-
-            for (let j = 0; j < step; j++) {
-                const datum = data[(i * step) + j];
-                if (datum < min) min = datum;
-                if (datum > max) max = datum;
-            }
+            const [min, max] = this.columnRange(i, width);
 
             const yMin = (1 + min) * amp;
             const yMax = (1 + max) * amp;
@@ -597,6 +695,7 @@ class AudioTrimmer {
             this.audioContext.close();
         }
         this.audioBuffer = null;
+        this.peaks = null;
         this.audioContext = null;
     }
 }
@@ -1235,6 +1334,8 @@ async function saveRecordedAudio(childName, dateValue, audioBlob) {
     if (selectionInfo) {
         formData.append('trimStart', selectionInfo.startTime);
         formData.append('trimEnd', selectionInfo.endTime);
+    } else if (document.getElementById('autoTrimSilence').checked) {
+        formData.append('autoTrim', 'true');
     }
 
     const response = await fetch(`/api/children/${encodeURIComponent(childName)}/words/${encodeURIComponent(currentWord)}/recordings`, {
@@ -1246,6 +1347,7 @@ async function saveRecordedAudio(childName, dateValue, audioBlob) {
         const error = await response.json();
         throw new Error(error.error || 'Upload failed');
     }
+    await waitForJob(response);
 
     // Format date for display
     const date = new Date(dateValue);
@@ -1295,6 +1397,8 @@ async function saveUploadedAudio(childName, dateValue) {
     if (selectionInfo) {
         formData.append('trimStart', selectionInfo.startTime);
         formData.append('trimEnd', selectionInfo.endTime);
+    } else if (document.getElementById('autoTrimSilence').checked) {
+        formData.append('autoTrim', 'true');
     }
 
     const response = await fetch(`/api/children/${encodeURIComponent(childName)}/words/${encodeURIComponent(currentWord)}/recordings`, {
@@ -1306,6 +1410,7 @@ async function saveUploadedAudio(childName, dateValue) {
         const error = await response.json();
         throw new Error(error.error || 'Upload failed');
     }
+    await waitForJob(response);
 
     // Format date for display
     const date = new Date(dateValue);
@@ -1541,6 +1646,7 @@ async function downloadSelectedImage() {
             const error = await response.json();
             throw new Error(error.error || 'Download failed');
         }
+        await waitForJob(response);
 
         showAlert(`Image for "${currentWord}" has been added successfully!`, 'success');
 
@@ -17,6 +17,11 @@ class TestConfig(Config):
     AUDIO_DIR = None  # Will be set in init_app
     IMAGES_DIR = None  # Will be set in init_app
     DATA_FILE = None  # Will be set in init_app
+    SQLITE_DATABASE = None  # Will be set in init_app
+    SHARD_DIR = None  # Will be set in init_app
+    JOB_DATABASE = None  # Will be set in init_app
+    JOB_STAGING_DIR = None  # Will be set in init_app
+    JOB_WORKERS = 0  # Run jobs inline
 
     @staticmethod
     def init_app(app):
@@ -25,12 +30,20 @@ class TestConfig(Config):
         TestConfig.AUDIO_DIR = os.path.join(TestConfig.DATA_DIR, "audio")
         TestConfig.IMAGES_DIR = os.path.join(TestConfig.DATA_DIR, "images")
         TestConfig.DATA_FILE = os.path.join(TestConfig.DATA_DIR, "data.json")
+        TestConfig.SQLITE_DATABASE = os.path.join(TestConfig.DATA_DIR, "paraulins.db")
+        TestConfig.SHARD_DIR = os.path.join(TestConfig.DATA_DIR, "children")
+        TestConfig.JOB_DATABASE = os.path.join(TestConfig.DATA_DIR, "jobs.db")
+        TestConfig.JOB_STAGING_DIR = os.path.join(TestConfig.DATA_DIR, "jobs")
 
         # Update app config with the new paths
         app.config["DATA_DIR"] = TestConfig.DATA_DIR
         app.config["AUDIO_DIR"] = TestConfig.AUDIO_DIR
         app.config["IMAGES_DIR"] = TestConfig.IMAGES_DIR
         app.config["DATA_FILE"] = TestConfig.DATA_FILE
+        app.config["SQLITE_DATABASE"] = TestConfig.SQLITE_DATABASE
+        app.config["SHARD_DIR"] = TestConfig.SHARD_DIR
+        app.config["JOB_DATABASE"] = TestConfig.JOB_DATABASE
+        app.config["JOB_STAGING_DIR"] = TestConfig.JOB_STAGING_DIR
 
         # Create directories
         os.makedirs(TestConfig.DATA_DIR, exist_ok=True)
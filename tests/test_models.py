@@ -1,5 +1,9 @@
+from datetime import date
+
+import pytest
+
 from models.child import Child
-from models.recording import Recording
+from models.recording import AudioMetadata, Recording
 from models.word import Word
 
 
@@ -63,6 +67,47 @@ class TestChild:
         not_removed = child.remove_word("book")
         assert not_removed is False
 
+    def test_remove_word_leaves_lazy_words_unhydrated(self):
+        recordings = [{"year": 2023, "month": 6, "day": 15, "filename": "a.mp3"}]
+        child = Child.from_dict(
+            {"name": "Kai", "words": [{"text": t, "recordings": recordings} for t in "abc"]},
+            trusted=True,
+        )
+
+        assert child.remove_word("c") is True
+        assert [w.text for w in child.words] == ["a", "b"]
+        assert all(w._raw_recordings is not None for w in child.words)
+
+    def test_word_index_keeps_insertion_order(self):
+        child = Child("Ivy", [Word("b"), Word("a"), Word("b")])
+        child.add_word(Word("c"))
+        child.remove_word("a")
+        child.add_word(Word("a"))
+
+        assert [w.text for w in child.words] == ["b", "c", "a"]
+        assert child.get_word("a") is child.words[2]
+
+    def test_word_index_follows_direct_list_changes(self):
+        child = Child("Jack")
+        child.words.append(Word("sun"))
+
+        assert child.get_word("sun") is child.words[0]
+
+        child.words.clear()
+        assert child.get_word("sun") is None
+
+    def test_word_index_follows_same_length_list_changes(self):
+        child = Child.from_dict({"name": "Lia", "words": [{"text": "sun"}]}, trusted=True)
+        assert child.get_word("sun") is child.words[0]
+
+        child.words[0] = Word("moon")
+        assert child.get_word("sun") is None
+        assert child.get_word("moon") is child.words[0]
+
+        child.words = [Word("star")]
+        assert child.get_word("moon") is None
+        assert child.get_word("star") is child.words[0]
+
     def test_to_dict(self):
         child = Child("Grace")
         word = Word("cat")
@@ -180,6 +225,25 @@ class TestWord:
         years = word.get_years()
         assert years == [2021, 2022, 2023]
 
+    def test_get_recordings_between(self):
+        word = Word("ball")
+        for day in [20, 1, 10, 31]:
+            word.add_recording(2023, 5, day, f"ball_{day}.mp3")
+        word.add_recording(2023, 6, 1, "ball_june.mp3")
+
+        between = word.get_recordings_between(date(2023, 5, 10), date(2023, 5, 31))
+        assert [r.day for r in between] == [10, 20, 31]
+        assert word.get_recordings_between(date(2024, 1, 1), date(2024, 12, 31)) == []
+        assert word.get_recording_legacy(2023, 5).day == 1
+
+    def test_recordings_stay_sorted_after_direct_changes(self):
+        word = Word("sky", recordings=[Recording(2023, 6, 15, "b.mp3")])
+        word.recordings.append(Recording(2022, 1, 1, "a.mp3"))
+
+        assert word.get_recording(2022, 1, 1).filename == "a.mp3"
+        assert [r.year for r in word.recordings] == [2022, 2023]
+        assert word.get_recording(2023, 2, 30) is None
+
     def test_set_image(self):
         word = Word("bird")
         word.set_image("bird.png")
@@ -243,3 +307,76 @@ class TestRecording:
 
         assert recording.year == 2021
         assert recording.filename == "test_2021.ogg"
+
+    def test_from_dict_validates_untrusted_data(self):
+        with pytest.raises(ValueError):
+            Recording.from_dict({"year": 2023, "month": 2, "day": 30, "filename": "x.mp3"})
+
+    def test_trusted_from_dict(self):
+        data = {"year": 2023, "month": 6, "day": 15, "filename": "hello.mp3"}
+        recording = Recording.from_dict(data, trusted=True)
+
+        assert recording == Recording.from_dict(data)
+        assert recording.to_dict() == data
+
+    def test_metadata_round_trip(self):
+        metadata = AudioMetadata(1.5, "opus", 48000, 1, loudness=-23.4)
+        recording = Recording(2023, 6, 15, "a.webm", metadata)
+        data = recording.to_dict()
+
+        assert data["metadata"] == {
+            "duration": 1.5,
+            "codec": "opus",
+            "sample_rate": 48000,
+            "channels": 1,
+            "loudness": -23.4,
+        }
+        assert recording.duration == 1.5
+        assert Recording.from_dict(data) == recording
+        assert Recording.from_dict(data, trusted=True) == recording
+
+        # Recordings that were never probed keep the old document shape
+        assert "metadata" not in Recording(2023, 6, 15, "a.webm").to_dict()
+        assert Recording(2023, 6, 15, "a.webm").duration is None
+
+
+class TestModelLayout:
+    """Test the memory layout and trusted hydration of the model graph"""
+
+    def test_models_have_no_instance_dict(self):
+        word = Word("cat")
+        word.add_recording(2023, 6, 15, "cat.mp3")
+        for obj in (Child("Alice", [word]), word, word.recordings[0]):
+            assert not hasattr(obj, "__dict__")
+
+    def test_trusted_word_hydrates_recordings_on_access(self):
+        raw = [{"year": 2023, "month": 6, "day": 15, "filename": "a.mp3"}]
+        word = Word.from_dict({"text": "sun", "recordings": raw}, trusted=True)
+        raw.append({"year": 2024, "month": 1, "day": 1, "filename": "b.mp3"})
+
+        assert [r.year for r in word.recordings] == [2023, 2024]
+
+        raw.clear()
+        assert len(word.recordings) == 2
+
+    def test_trusted_child_round_trip(self):
+        data = {
+            "name": "Maya",
+            "words": [
+                {
+                    "text": "sun",
+                    "image_filename": None,
+                    "recordings": [
+                        {"year": 2022, "month": 1, "day": 2, "filename": "a.mp3"},
+                        {"year": 2023, "month": 6, "day": 15, "filename": "b.mp3"},
+                    ],
+                },
+                {"text": "moon", "image_filename": "moon.png", "recordings": []},
+            ],
+        }
+
+        child = Child.from_dict(data, trusted=True)
+
+        assert child == Child.from_dict(data)
+        assert child.to_dict() == data
+        assert child.get_word("sun").get_recording(2023, 6, 15).filename == "b.mp3"
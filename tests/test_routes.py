@@ -1,6 +1,15 @@
 import io
 import json
-from unittest.mock import MagicMock, patch
+import os
+import wave
+import zipfile
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from services.audio_service import AudioService
 
 
 class TestAPI:
@@ -80,6 +89,84 @@ class TestAPI:
         data = json.loads(response.data)
         assert "error" in data
 
+    def test_get_children_sets_etag(self, client, clean_data_service):
+        """Test that child listings carry cache validators"""
+        client.post("/api/children", json={"name": "Cleo"}, content_type="application/json")
+
+        response = client.get("/api/children")
+        assert response.status_code == 200
+        assert response.headers["ETag"]
+        assert response.headers["Last-Modified"]
+        assert "no-cache" in response.headers["Cache-Control"]
+
+    def test_get_children_not_modified(self, client, clean_data_service):
+        """Test that a matching If-None-Match skips serialization"""
+        client.post("/api/children", json={"name": "Cleo"}, content_type="application/json")
+        etag = client.get("/api/children").headers["ETag"]
+
+        with patch("models.child.Child.to_dict") as mock_to_dict:
+            response = client.get("/api/children", headers={"If-None-Match": etag})
+
+            assert response.status_code == 304
+            assert response.data == b""
+            assert response.headers["ETag"] == etag
+            mock_to_dict.assert_not_called()
+
+    def test_get_child_etag_changes_after_write(self, client, clean_data_service):
+        """Test that a mutation invalidates the cached child"""
+        client.post("/api/children", json={"name": "Cleo"}, content_type="application/json")
+        etag = client.get("/api/children/Cleo").headers["ETag"]
+
+        client.post(
+            "/api/children/Cleo/words", json={"text": "sun"}, content_type="application/json"
+        )
+
+        response = client.get("/api/children/Cleo", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+        assert json.loads(response.data)["words"][0]["text"] == "sun"
+
+    def test_get_child_if_modified_since(self, client, clean_data_service):
+        """Test revalidation by date when no ETag is sent"""
+        client.post("/api/children", json={"name": "Cleo"}, content_type="application/json")
+        last_modified = client.get("/api/children/Cleo").headers["Last-Modified"]
+
+        response = client.get("/api/children/Cleo", headers={"If-Modified-Since": last_modified})
+        assert response.status_code == 304
+
+    def test_get_children_page(self, client, clean_data_service):
+        """Test paging a projected child list through the Link header"""
+        for name in ["Ada", "Ben", "Cy"]:
+            client.post("/api/children", json={"name": name}, content_type="application/json")
+
+        response = client.get("/api/children?limit=2&fields=name,word_count")
+        assert response.status_code == 200
+        assert json.loads(response.data) == [
+            {"name": "Ada", "word_count": 0},
+            {"name": "Ben", "word_count": 0},
+        ]
+
+        next_url = response.headers["Link"].split(">")[0].lstrip("<")
+        response = client.get(next_url)
+        assert json.loads(response.data) == [{"name": "Cy", "word_count": 0}]
+        assert "Link" not in response.headers
+
+    def test_get_children_invalid_query(self, client, clean_data_service):
+        """Test that malformed paging arguments are a client error"""
+        response = client.get("/api/children?limit=-1")
+        assert response.status_code == 400
+        assert "error" in json.loads(response.data)
+
+    def test_get_children_corrupt_data(self, client, clean_data_service):
+        """Test that an unreadable data file is a server error, not a client one"""
+        with open(clean_data_service.data_file, "w", encoding="utf-8") as f:
+            f.write('{"children": [')
+
+        for url in ("/api/children", "/api/children?limit=1"):
+            response = client.get(url)
+            assert response.status_code == 500
+            assert "corrupt" in json.loads(response.data)["error"]
+
     def test_add_word_to_child(self, client, clean_data_service):
         """Test adding a word to a child"""
         # Create a child first
@@ -129,6 +216,82 @@ class TestAPI:
 
         assert response.status_code == 409
 
+    def test_add_words_batch(self, client, clean_data_service):
+        """Test adding many words with one write and per-item statuses"""
+        client.post("/api/children", json={"name": "Gina"}, content_type="application/json")
+        client.post(
+            "/api/children/Gina/words", json={"text": "mama"}, content_type="application/json"
+        )
+
+        with patch("services.json_repository.JsonRepository.save_data", autospec=True) as mock_save:
+            response = client.post(
+                "/api/children/Gina/words:batch",
+                json=["papa", {"text": " mama "}, {"text": ""}, "papa", 7, {"text": "sun"}],
+            )
+
+            assert response.status_code == 200
+            assert mock_save.call_count == 1
+
+        data = json.loads(response.data)
+        assert [r["status"] for r in data["results"]] == [
+            "created",
+            "duplicate",
+            "invalid",
+            "duplicate",
+            "invalid",
+            "created",
+        ]
+        assert (data["created"], data["duplicate"], data["invalid"]) == (2, 2, 2)
+
+    def test_add_words_batch_with_images(self, client, clean_data_service):
+        """Test that image URLs are downloaded by jobs queued once the words are created"""
+        client.post("/api/children", json={"name": "Gina"}, content_type="application/json")
+
+        with patch(
+            "services.image_search_service.ImageSearchService.download_image"
+        ) as mock_download:
+
+            def download(url, word):
+                if "missing" in url:
+                    return None
+                return f"{word}.jpg"
+
+            mock_download.side_effect = download
+            response = client.post(
+                "/api/children/Gina/words:batch",
+                json={
+                    "words": [
+                        {"text": "cat", "imageUrl": "https://example.com/ok.jpg"},
+                        {"text": "dog", "imageUrl": "https://example.com/missing.jpg"},
+                        {"text": "owl", "imageUrl": "ftp://example.com/owl.jpg"},
+                        {"text": "cow"},
+                    ]
+                },
+            )
+
+        results = json.loads(response.data)["results"]
+        assert results[2]["status"] == "invalid"
+        assert "image_job" not in results[3]
+        jobs = [json.loads(client.get(r["image_job"]["status_url"]).data) for r in results[:2]]
+        assert jobs[0]["status"] == "succeeded"
+        assert (jobs[1]["status"], jobs[1]["error"]) == ("queued", "Failed to download image")
+
+        words = json.loads(client.get("/api/children/Gina").data)["words"]
+        assert [(w["text"], w["image_filename"]) for w in words] == [
+            ("cat", "cat.jpg"),
+            ("dog", None),
+            ("cow", None),
+        ]
+
+    def test_add_words_batch_errors(self, client, clean_data_service):
+        """Test batch requests for unknown children or without words"""
+        response = client.post("/api/children/Nobody/words:batch", json=["hello"])
+        assert response.status_code == 404
+
+        client.post("/api/children", json={"name": "Gina"}, content_type="application/json")
+        response = client.post("/api/children/Gina/words:batch", json={"words": []})
+        assert response.status_code == 400
+
     def test_upload_word_image(self, client, clean_data_service):
         """Test uploading an image for a word"""
         # Create child and word
@@ -148,10 +311,300 @@ class TestAPI:
                 "/api/children/Grace/words/cat/image", data=data, content_type="multipart/form-data"
             )
 
-            assert response.status_code == 200
+            assert response.status_code == 202
+            job = json.loads(response.data)
+            assert response.headers["Location"] == job["status_url"]
+
+            data = json.loads(client.get(job["status_url"]).data)
+            assert data["status"] == "succeeded"
+            assert data["result"]["filename"] == "cat.jpg"
+
+            child = json.loads(client.get("/api/children/Grace").data)
+            assert child["words"][0]["image_filename"] == "cat.jpg"
+
+    def test_trimmed_recording_is_saved_by_a_job(self, client, clean_data_service):
+        """Test that trimmed uploads return 202 and register the recording on completion"""
+        client.post("/api/children", json={"name": "Grace"}, content_type="application/json")
+        client.post("/api/children/Grace/words", json={"text": "cat"})
+
+        with patch("services.audio_service.AudioService.save_audio_file_with_trim") as mock_trim:
+            mock_trim.return_value = "0123456789abcdef.wav"
+            response = client.post(
+                "/api/children/Grace/words/cat/recordings",
+                data={
+                    "audio": (io.BytesIO(b"RIFF audio"), "take.wav"),
+                    "date": "2023-06-15",
+                    "trimStart": "0.5",
+                    "trimEnd": "1.5",
+                },
+                content_type="multipart/form-data",
+            )
+
+        assert response.status_code == 202
+        assert mock_trim.call_args.args[-2:] == (0.5, 1.5)
+        job = json.loads(client.get(response.headers["Location"]).data)
+        assert job["status"] == "succeeded"
+        assert job["result"]["filename"] == "0123456789abcdef.wav"
+
+        child = json.loads(client.get("/api/children/Grace").data)
+        recordings = child["words"][0]["recordings"]
+        assert [r["filename"] for r in recordings] == ["0123456789abcdef.wav"]
+
+    def test_auto_trimmed_recording(self, app, client, clean_data_service):
+        """Test that autoTrim uploads are saved without their leading and trailing silence"""
+        samples = np.zeros(8000 * 4, dtype="<i2")
+        samples[8000:12000] = 16000
+        audio = io.BytesIO()
+        with wave.open(audio, "wb") as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(8000)
+            f.writeframes(samples.tobytes())
+        client.post("/api/children", json={"name": "Kai"}, content_type="application/json")
+        client.post("/api/children/Kai/words", json={"text": "sun"})
+
+        with patch("services.audio_service.Config.AUDIO_DIR", app.config["AUDIO_DIR"]):
+            response = client.post(
+                "/api/children/Kai/words/sun/recordings",
+                data={
+                    "audio": (io.BytesIO(audio.getvalue()), "take.wav"),
+                    "date": "2023-06-15",
+                    "autoTrim": "true",
+                },
+                content_type="multipart/form-data",
+            )
+
+        assert response.status_code == 202
+        job = json.loads(client.get(response.headers["Location"]).data)
+        assert job["status"] == "succeeded"
+        assert job["result"]["metadata"]["duration"] == pytest.approx(0.5 + 2 * 0.15)
+        # The status shows whether features were extracted, not the vector
+        assert job["result"]["features"] is True
+
+    def test_job_errors(self, client, clean_data_service):
+        """Test unknown jobs, refused uploads and retried downloads"""
+        assert client.get("/api/jobs/missing").status_code == 404
 
+        client.post("/api/children", json={"name": "Grace"}, content_type="application/json")
+        client.post("/api/children/Grace/words", json={"text": "cat"})
+        response = client.post(
+            "/api/children/Grace/words/cat/image",
+            data={"image": (io.BytesIO(b"text"), "notes.txt")},
+            content_type="multipart/form-data",
+        )
+        assert response.status_code == 400
+
+        with patch(
+            "services.image_search_service.ImageSearchService.download_image",
+            return_value=None,
+        ):
+            response = client.post(
+                "/api/children/Grace/words/cat/image/download",
+                json={"imageUrl": "https://example.com/cat.jpg"},
+            )
+
+        assert response.status_code == 202
+        job = json.loads(client.get(response.headers["Location"]).data)
+        assert job["status"] == "queued"
+        assert job["attempts"] == 1
+        assert job["error"] == "Failed to download image"
+
+    def test_waveform_peaks(self, app, client, clean_data_service):
+        """Test that uploads are probed and get peaks served at several zoom levels"""
+        audio = io.BytesIO()
+        with wave.open(audio, "wb") as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(8000)
+            f.writeframes(b"\x00\x40" * 16000)
+        client.post("/api/children", json={"name": "Kai"}, content_type="application/json")
+        client.post("/api/children/Kai/words", json={"text": "sun"})
+
+        with patch("services.audio_service.Config.AUDIO_DIR", app.config["AUDIO_DIR"]):
+            response = client.post(
+                "/api/children/Kai/words/sun/recordings",
+                data={"audio": (io.BytesIO(audio.getvalue()), "take.wav"), "date": "2023-06-15"},
+                content_type="multipart/form-data",
+            )
+            uploaded = json.loads(response.data)["filename"]
+
+            # Raised to the target loudness as far as the peak ceiling allows
+            child = json.loads(client.get("/api/children/Kai").data)
+            recording = child["words"][0]["recordings"][0]
+            filename, metadata = recording["filename"], recording["metadata"]
+            assert filename != uploaded
+            assert AudioService().get_audio_file_path("Kai", "sun", uploaded) is None
+            assert metadata["duration"] == 2.0
+            assert metadata["codec"] == "pcm_s16le"
+            assert metadata["gain"] == pytest.approx(5.02)
+            path = AudioService().get_audio_file_path("Kai", "sun", filename)
+            assert os.path.exists(f"{path}.peaks.json")
+
+            response = client.get(f"/api/audio/Kai/sun/{filename}/peaks")
+            assert response.status_code == 200
+            assert response.cache_control.immutable
             data = json.loads(response.data)
-            assert data["filename"] == "cat.jpg"
+            assert data["duration"] == pytest.approx(2.0)
+            assert data["buckets"] == 256
+            assert data["peaks"][:2] == [113, 113]
+
+            response = client.get(f"/api/audio/Kai/sun/{filename}/peaks?buckets=600")
+            assert json.loads(response.data)["buckets"] == 1024
+
+            assert client.get("/api/audio/Kai/sun/missing.wav/peaks").status_code == 404
+
+    def test_word_montage(self, app, client, clean_data_service):
+        """Test that montages are built by a job, then served from the cache until changed"""
+        client.post("/api/children", json={"name": "Kai"}, content_type="application/json")
+        client.post("/api/children/Kai/words", json={"text": "sun"})
+        url = "/api/children/Kai/words/sun/montage"
+        assert client.get(url).status_code == 404
+
+        with patch("services.audio_service.Config.AUDIO_DIR", app.config["AUDIO_DIR"]):
+            for day, seconds in ((15, 1), (16, 2)):
+                audio = io.BytesIO()
+                with wave.open(audio, "wb") as f:
+                    f.setnchannels(1)
+                    f.setsampwidth(2)
+                    f.setframerate(8000)
+                    f.writeframes(b"\x00\x10" * 8000 * seconds)
+                client.post(
+                    "/api/children/Kai/words/sun/recordings",
+                    data={
+                        "audio": (io.BytesIO(audio.getvalue()), "take.wav"),
+                        "date": f"2023-06-{day}",
+                    },
+                    content_type="multipart/form-data",
+                )
+
+            response = client.get(url)
+            assert response.status_code == 202
+            job = json.loads(client.get(response.headers["Location"]).data)
+            assert job["status"] == "succeeded"
+
+            response = client.get(url)
+            assert response.status_code == 200
+            with wave.open(io.BytesIO(response.data), "rb") as f:
+                gap = app.config["MONTAGE_GAP"]
+                assert f.getnframes() / f.getframerate() == pytest.approx(3 + gap)
+
+            client.delete("/api/children/Kai/words/sun/recordings/2023/6/16")
+            assert client.get(url).status_code == 202
+
+    def test_similar_recordings(self, app, client, clean_data_service):
+        """Test ranking recordings by sound, from features extracted when they are saved"""
+        client.post("/api/children", json={"name": "Kai"}, content_type="application/json")
+        client.post("/api/children", json={"name": "Mia"}, content_type="application/json")
+        for name in ("Kai", "Mia"):
+            client.post(f"/api/children/{name}/words", json={"text": "sun"})
+        client.post("/api/children/Kai/words", json={"text": "moon"})
+        url = "/api/children/Kai/words/sun/similar"
+        assert client.get(url).status_code == 404
+
+        def upload(child, word, date, frequency, amplitude=0.3):
+            samples = np.sin(np.arange(8000) * 2 * np.pi * frequency / 8000) * amplitude
+            audio = io.BytesIO()
+            with wave.open(audio, "wb") as f:
+                f.setnchannels(1)
+                f.setsampwidth(2)
+                f.setframerate(8000)
+                f.writeframes((samples * 32767).astype("<i2").tobytes())
+            client.post(
+                f"/api/children/{child}/words/{word}/recordings",
+                data={"audio": (io.BytesIO(audio.getvalue()), "take.wav"), "date": date},
+                content_type="multipart/form-data",
+            )
+
+        with patch("services.audio_service.Config.AUDIO_DIR", app.config["AUDIO_DIR"]):
+            # Features come from the frames decoded for normalization, not a second decode
+            with patch("services.features.decode_pcm", side_effect=AssertionError):
+                upload("Kai", "sun", "2023-06-15", 1500)
+                upload("Kai", "sun", "2023-06-16", 440, amplitude=0.1)
+                upload("Kai", "sun", "2023-06-20", 440)
+                upload("Mia", "sun", "2023-06-15", 450)
+                upload("Kai", "moon", "2023-06-15", 440)
+
+            # The latest recording, compared with the word's other recordings
+            data = json.loads(client.get(url).data)
+            assert (data["date"], data["scope"]) == ("2023-06-20", "word")
+            matches = [(match["child"], match["date"]) for match in data["matches"]]
+            assert matches[0] == ("Kai", "2023-06-16")
+            assert set(matches[1:]) == {("Mia", "2023-06-15"), ("Kai", "2023-06-15")}
+            assert matches[-1] == ("Kai", "2023-06-15")
+            child = json.loads(client.get("/api/children/Kai").data)
+            sun = next(word for word in child["words"] if word["text"] == "sun")
+            assert data["matches"][0]["filename"] == sun["recordings"][1]["filename"]
+
+            data = json.loads(client.get(f"{url}?date=2023-06-15&scope=all&limit=2").data)
+            assert data["date"] == "2023-06-15"
+            assert len(data["matches"]) == 2
+            assert client.get(f"{url}?date=2023-07-01").status_code == 404
+            assert client.get(f"{url}?scope=nearby").status_code == 400
+
+            # Deleted recordings are no longer ranked
+            client.delete("/api/children/Kai/words/sun/recordings/2023/6/16")
+            data = json.loads(client.get(url).data)
+            assert ("Kai", "2023-06-16") not in [(m["child"], m["date"]) for m in data["matches"]]
+
+            # Recordings saved without features get them on first request
+            AudioService().features.remove([("Kai", "moon", None)])
+            data = json.loads(client.get("/api/children/Kai/words/moon/similar?scope=all").data)
+            assert data["matches"][0]["date"] == "2023-06-20"
+
+            # Vectors freed again before they could be ranked
+            AudioService().features.remove([("Kai", "moon", None)])
+            with patch("services.feature_store.FeatureStore.put"):
+                response = client.get("/api/children/Kai/words/moon/similar")
+            assert response.status_code == 503
+
+    def test_identical_images_are_stored_once(self, app, client, clean_data_service):
+        """Test that images are content-addressed, shared and released on delete"""
+        image = io.BytesIO()
+        Image.new("RGB", (8, 8), "red").save(image, "PNG")
+        client.post("/api/children", json={"name": "Kai"}, content_type="application/json")
+        client.post("/api/children/Kai/words:batch", json=["apple", "cherry"])
+
+        with patch("services.image_service.Config.IMAGES_DIR", app.config["IMAGES_DIR"]):
+            filenames = []
+            for word in ["apple", "cherry"]:
+                response = client.post(
+                    f"/api/children/Kai/words/{word}/image",
+                    data={"image": (io.BytesIO(image.getvalue()), "red.png")},
+                    content_type="multipart/form-data",
+                )
+                job = json.loads(client.get(response.headers["Location"]).data)
+                filenames.append(job["result"]["filename"])
+
+            assert filenames[0] == filenames[1]
+            response = client.get(f"/api/images/{filenames[0]}")
+            assert response.status_code == 200
+            assert response.cache_control.immutable
+
+            client.delete("/api/children/Kai/words/apple")
+            assert client.get(f"/api/images/{filenames[0]}").status_code == 200
+
+            client.delete("/api/children/Kai/words/cherry")
+            assert client.get(f"/api/images/{filenames[0]}").status_code == 404
+
+    def test_replacing_recording_releases_previous_file(self, app, client, clean_data_service):
+        """Test that re-recording a date drops the old content-addressed file"""
+        client.post("/api/children", json={"name": "Kai"}, content_type="application/json")
+        client.post("/api/children/Kai/words", json={"text": "sun"})
+
+        with patch("services.audio_service.Config.AUDIO_DIR", app.config["AUDIO_DIR"]):
+            filenames = []
+            for content in [b"first take", b"second take"]:
+                response = client.post(
+                    "/api/children/Kai/words/sun/recordings",
+                    data={"audio": (io.BytesIO(content), "take.mp3"), "date": "2023-06-15"},
+                    content_type="multipart/form-data",
+                )
+                filenames.append(json.loads(response.data)["filename"])
+
+            assert filenames[0] != filenames[1]
+            assert client.get(f"/api/audio/Kai/sun/{filenames[0]}").status_code == 404
+            response = client.get(f"/api/audio/Kai/sun/{filenames[1]}")
+            assert response.data == b"second take"
 
     def test_upload_recording(self, client, clean_data_service):
         """Test uploading an audio recording"""
@@ -220,18 +673,114 @@ class TestAPI:
 
         assert response.status_code == 400
 
-    def test_serve_audio_file(self, client, clean_data_service):
-        """Test serving an audio file"""
+    def test_import_recordings(self, app, client, clean_data_service):
+        """Test importing an uploaded archive of recordings"""
+        client.post("/api/children", json={"name": "Iris"}, content_type="application/json")
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, "w") as zf:
+            zf.writestr("moon/2023-06-15.wav", b"RIFF")
+            zf.writestr("moon/june.wav", b"RIFF")
+        archive.seek(0)
+
+        with patch("services.audio_service.Config.AUDIO_DIR", app.config["AUDIO_DIR"]):
+            response = client.post(
+                "/api/children/Iris/recordings:import",
+                data={"archive": (archive, "export.zip")},
+                content_type="multipart/form-data",
+            )
+
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert [r["word"] for r in data["imported"]] == ["moon"]
+        assert data["imported"][0]["filename"].endswith(".wav")
+        assert [f["name"] for f in data["failed"]] == ["moon/june.wav"]
+        assert data["words_created"] == ["moon"]
+
+    def test_import_recordings_errors(self, client, clean_data_service):
+        """Test archive imports without a file or for unknown children"""
+        response = client.post("/api/children/Nobody/recordings:import", data={})
+        assert response.status_code == 400
+
+        response = client.post(
+            "/api/children/Nobody/recordings:import",
+            data={"archive": (io.BytesIO(b"PK"), "export.zip")},
+            content_type="multipart/form-data",
+        )
+        assert response.status_code == 404
+
+    def _media_file(self, app, name: str, size: int = 4096) -> str:
+        """Write a media file with known content"""
+        path = os.path.join(app.config["AUDIO_DIR"], name)
+        with open(path, "wb") as f:
+            f.write(bytes(range(256)) * (size // 256))
+        return path
+
+    def test_serve_audio_file(self, app, client, clean_data_service):
+        """Test serving an audio file with validators and a revalidate policy"""
+        path = self._media_file(app, "test.mp3")
         with patch("services.audio_service.AudioService.get_audio_file_path") as mock_get_path:
-            mock_get_path.return_value = "/fake/path/to/audio.mp3"
+            mock_get_path.return_value = path
+
+            response = client.get("/api/audio/TestChild/testword/test.mp3")
 
-            with patch("routes.api.send_file") as mock_send_file:
-                mock_send_file.return_value = MagicMock()
+            mock_get_path.assert_called_once_with("TestChild", "testword", "test.mp3")
+            assert response.status_code == 200
+            assert response.data == open(path, "rb").read()
+            assert response.headers["ETag"]
+            assert response.headers["Accept-Ranges"] == "bytes"
+            assert response.cache_control.no_cache
+
+    def test_serve_audio_not_modified_skips_file(self, app, client, clean_data_service):
+        """Test that a matching If-None-Match is answered without opening the file"""
+        path = self._media_file(app, "test.mp3")
+        with patch("services.audio_service.AudioService.get_audio_file_path") as mock_get_path:
+            mock_get_path.return_value = path
+            etag = client.get("/api/audio/TestChild/testword/test.mp3").headers["ETag"]
 
-                client.get("/api/audio/TestChild/testword/test.mp3")
+            with patch("routes.conditional.send_file") as mock_send_file:
+                response = client.get(
+                    "/api/audio/TestChild/testword/test.mp3", headers={"If-None-Match": etag}
+                )
 
-                mock_get_path.assert_called_once_with("TestChild", "testword", "test.mp3")
-                mock_send_file.assert_called_once_with("/fake/path/to/audio.mp3")
+                assert response.status_code == 304
+                assert response.headers["ETag"] == etag
+                mock_send_file.assert_not_called()
+
+    def test_serve_audio_range_reads_only_range(self, app, client, clean_data_service):
+        """Test that a Range request returns 206 and reads just the requested bytes"""
+        path = self._media_file(app, "test.mp3", size=256 * 1024)
+        reads = []
+
+        class CountingFile(io.FileIO):
+            def read(self, size=-1):
+                data = super().read(size)
+                reads.append(len(data))
+                return data
+
+        with patch("services.audio_service.AudioService.get_audio_file_path") as mock_get_path:
+            mock_get_path.return_value = path
+            with patch("werkzeug.utils.open", create=True, side_effect=CountingFile):
+                response = client.get(
+                    "/api/audio/TestChild/testword/test.mp3", headers={"Range": "bytes=1000-1099"}
+                )
+                body = response.data
+
+        assert response.status_code == 206
+        assert response.headers["Content-Range"] == f"bytes 1000-1099/{256 * 1024}"
+        assert body == open(path, "rb").read()[1000:1100]
+        # One buffered block around the range, never the whole file
+        assert sum(reads) <= 8192
+
+    def test_serve_legacy_media_is_revalidated(self, app, client, clean_data_service):
+        """Test that files that can be overwritten are never cached as immutable"""
+        path = self._media_file(app, "test.jpg")
+        with patch("services.image_service.ImageService.get_image_file_path") as mock_get_path:
+            mock_get_path.return_value = path
+
+            response = client.get("/api/images/test.jpg?v=abc")
+
+        assert response.cache_control.no_cache
+        assert not response.cache_control.immutable
 
     def test_serve_nonexistent_audio_file(self, client, clean_data_service):
         """Test serving a non-existent audio file"""
@@ -241,18 +790,18 @@ class TestAPI:
             response = client.get("/api/audio/TestChild/testword/nonexistent.mp3")
             assert response.status_code == 404
 
-    def test_serve_image_file(self, client, clean_data_service):
+    def test_serve_image_file(self, app, client, clean_data_service):
         """Test serving an image file"""
+        path = self._media_file(app, "test.jpg")
         with patch("services.image_service.ImageService.get_image_file_path") as mock_get_path:
-            mock_get_path.return_value = "/fake/path/to/image.jpg"
+            mock_get_path.return_value = path
 
-            with patch("routes.api.send_file") as mock_send_file:
-                mock_send_file.return_value = MagicMock()
+            response = client.get("/api/images/test.jpg")
 
-                client.get("/api/images/test.jpg")
-
-                mock_get_path.assert_called_once_with("test.jpg")
-                mock_send_file.assert_called_once_with("/fake/path/to/image.jpg")
+            mock_get_path.assert_called_once_with("test.jpg")
+            assert response.status_code == 200
+            assert response.mimetype == "image/jpeg"
+            assert response.data == open(path, "rb").read()
 
     def test_serve_nonexistent_image_file(self, client, clean_data_service):
         """Test serving a non-existent image file"""
@@ -283,10 +832,17 @@ class TestAPI:
                 content_type="multipart/form-data",
             )
 
-        # Now delete the recording
+        # Now delete the recording; its file is kept while the write fails
         with patch("services.audio_service.AudioService.delete_audio_file") as mock_delete:
             mock_delete.return_value = True
 
+            with patch(
+                "services.data_service.Transaction.commit", side_effect=OSError("disk full")
+            ):
+                response = client.delete("/api/children/Luna/words/moon/recordings/2023/6/15")
+            assert response.status_code == 500
+            mock_delete.assert_not_called()
+
             response = client.delete("/api/children/Luna/words/moon/recordings/2023/6/15")
             assert response.status_code == 200
 
@@ -403,7 +959,7 @@ class TestAPI:
             mock_delete_audio.assert_any_call("Saturn", "ring", "2023-07-20.mp3")
 
             # Verify image was deleted
-            mock_delete_image.assert_called_once_with("ring")
+            mock_delete_image.assert_called_once_with("ring", "ring.jpg")
 
         # Verify word no longer exists
         response = client.get("/api/children/Saturn")
@@ -453,7 +1009,7 @@ class TestAPI:
             mock_delete_audio.assert_not_called()
 
             # Should still call image delete to clean up any potential files
-            mock_delete_image.assert_called_once_with("dwarf")
+            mock_delete_image.assert_called_once_with("dwarf", None)
 
         # Verify word no longer exists
         response = client.get("/api/children/Pluto")
@@ -513,3 +1069,16 @@ class TestWebRoutes:
         response = client.get("/child/NonexistentChild")
         assert response.status_code == 404
         assert b"Child not found" in response.data
+
+    def test_child_page_not_modified(self, client, clean_data_service):
+        """Test that an unchanged child page is answered with 304"""
+        client.post("/api/children", json={"name": "TestChild"}, content_type="application/json")
+        response = client.get("/child/TestChild")
+        etag = response.headers["ETag"]
+        assert etag != client.get("/api/children/TestChild").headers["ETag"]
+
+        with patch("routes.web.render_template") as mock_render:
+            response = client.get("/child/TestChild", headers={"If-None-Match": etag})
+
+            assert response.status_code == 304
+            mock_render.assert_not_called()
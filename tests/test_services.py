@@ -1,7 +1,71 @@
+import io
+import json
+import multiprocessing
 import os
+import sqlite3
+import tarfile
+import wave
+import zipfile
+from contextlib import closing
+from datetime import date
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+from werkzeug.datastructures import FileStorage
 
 from models.child import Child
+from models.recording import AudioMetadata
 from models.word import Word
+from services.archive_import import import_archive, parse_entry_name
+from services.audio_codec import transcode_to_canonical
+from services.audio_conversion import convert_library
+from services.audio_metadata import analyze_recording, backfill_metadata
+from services.audio_service import AudioService
+from services.audio_trim import TrimPlan, plan_trim, trim_copy
+from services.blob_store import BlobStore, is_blob_name
+from services.data_service import DataService
+from services.feature_store import FEATURE_SIZE, FeatureStore
+from services.features import backfill_features, recording_features
+from services.file_lock import atomic_write_json
+from services.job_queue import (
+    FAILED,
+    JOB_TYPES,
+    QUEUED,
+    RUNNING,
+    SUCCEEDED,
+    JobQueue,
+    JobRunner,
+    JobType,
+)
+from services.journal_repository import JournaledJsonRepository
+from services.json_repository import JsonRepository
+from services.loudness import integrated_loudness, normalization_gain
+from services.media_jobs import complete_recording, discard_recording
+from services.montage import build_montage, find_montage, montage_dir, montage_key
+from services.mutations import Mutation
+from services.normalization import normalize_library, normalize_recording
+from services.query import ChildQuery, encode_cursor
+from services.repository import CorruptDataError
+from services.sharded_repository import ShardedJsonRepository, child_id, split_data_file
+from services.silence import find_sound
+from services.sqlite_repository import SqliteRepository, migrate_json_to_sqlite
+from services.waveform import (
+    compute_peaks,
+    decode_pcm,
+    load_peaks,
+    peaks_path,
+    read_pcm,
+    write_peaks,
+)
+
+
+def _concurrent_writer(repository, writer: int, words: int) -> None:
+    """Add words and recordings from a separate process"""
+    for i in range(words):
+        text = f"w{writer}-{i}"
+        repository.add_word("Shared", Word(text))
+        repository.add_recording("Shared", text, 2023, 6, 15, f"{text}.mp3")
 
 
 class TestDataService:
@@ -133,3 +197,1525 @@ class TestDataService:
         # Try with non-existent word
         failure = clean_data_service.add_recording_to_word("Maya", "juice", 2023, 6, 15, "test.mp3")
         assert failure is False
+
+
+class TestTransactions:
+    """Test batching several changes into a single write"""
+
+    def test_transaction_writes_once(self, clean_data_service):
+        """Test that a transaction with several mutations persists them with one write"""
+        clean_data_service.save_child(Child("Maya"))
+
+        with patch(
+            "services.json_repository.atomic_write_json", wraps=atomic_write_json
+        ) as mock_write:
+            with clean_data_service.transaction() as transaction:
+                for text in ["sun", "moon", "star"]:
+                    assert transaction.add_word("Maya", Word(text))
+                assert transaction.add_recording("Maya", "moon", 2023, 6, 15, "moon.mp3")
+                assert not transaction.add_recording("Maya", "sky", 2023, 6, 15, "sky.mp3")
+                # Reads within the transaction see earlier changes
+                assert transaction.get_child("Maya").get_word("star") is not None
+
+            assert mock_write.call_count == 1
+
+        child = clean_data_service.get_child("Maya")
+        assert [w.text for w in child.words] == ["sun", "moon", "star"]
+        assert len(child.get_word("moon").recordings) == 1
+
+    def test_transaction_rolls_back_on_error(self, sample_child, clean_data_service):
+        """Test that an exception discards every change in the transaction"""
+        before = clean_data_service.load_data()
+
+        with pytest.raises(RuntimeError):
+            with clean_data_service.transaction() as transaction:
+                transaction.add_word("TestChild", Word("lost"))
+                transaction.remove_word("TestChild", "hello")
+                raise RuntimeError("boom")
+
+        assert clean_data_service.load_data() == before
+        assert clean_data_service.get_child("TestChild").get_word("hello") is not None
+        assert clean_data_service.get_child("TestChild").get_word("lost") is None
+
+    def test_transaction_without_changes_does_not_write(self, sample_child, clean_data_service):
+        """Test that read-only transactions never touch the store"""
+        with patch("services.json_repository.atomic_write_json") as mock_write:
+            with clean_data_service.transaction() as transaction:
+                assert transaction.get_child("TestChild") is not None
+                assert not transaction.remove_word("TestChild", "missing")
+
+            mock_write.assert_not_called()
+
+    def test_sqlite_transaction(self, app):
+        """Test that the SQLite backend applies a batch in one database transaction"""
+        data_service = DataService(SqliteRepository(app.config["SQLITE_DATABASE"]))
+        with data_service.transaction() as transaction:
+            transaction.save_child(Child("Luna"))
+            transaction.add_word("Luna", Word("sun"))
+            transaction.add_recording("Luna", "sun", 2023, 6, 15, "sun.mp3")
+
+        word = data_service.get_child("Luna").get_word("sun")
+        assert [r.filename for r in word.recordings] == ["sun.mp3"]
+
+
+class TestDataSnapshotCache:
+    """Test the process-wide snapshot cache behind DataService"""
+
+    def test_repeated_reads_reuse_snapshot(self, sample_child, clean_data_service):
+        """Test that unchanged data is parsed only once"""
+        first = clean_data_service.get_child("TestChild")
+
+        with patch("services.json_repository.json.load") as mock_load:
+            second = DataService().get_child("TestChild")
+            mock_load.assert_not_called()
+
+        assert second is first
+
+    def test_get_child_hydrates_only_that_child(self, clean_data_service):
+        """Test that words are hydrated for the requested child only, on access"""
+        for name in ["Alice", "Bob", "Carol"]:
+            clean_data_service.save_child(Child(name, [Word("cat"), Word("dog")]))
+
+        with patch("models.child.Word.from_dict", wraps=Word.from_dict) as mock_from_dict:
+            child = clean_data_service.get_child("Bob")
+            mock_from_dict.assert_not_called()
+
+            assert [w.text for w in child.words] == ["cat", "dog"]
+            assert mock_from_dict.call_count == 2
+
+    def test_external_change_reloads_snapshot(self, sample_child, clean_data_service):
+        """Test that a change made by another writer is picked up"""
+        assert clean_data_service.get_child("TestChild") is not None
+
+        with open(clean_data_service.data_file, "w", encoding="utf-8") as f:
+            json.dump({"children": [{"name": "Other", "words": []}]}, f)
+
+        assert clean_data_service.get_child("TestChild") is None
+        assert clean_data_service.get_child("Other") is not None
+
+    def test_save_invalidates_snapshot(self, clean_data_service):
+        """Test that saving through the service is visible immediately"""
+        assert clean_data_service.get_children() == []
+
+        clean_data_service.save_child(Child("Zoe"))
+
+        assert [c.name for c in clean_data_service.get_children()] == ["Zoe"]
+
+
+class TestSqliteRepository:
+    """Test the SQLite storage backend"""
+
+    @pytest.fixture
+    def sqlite_data_service(self, app):
+        """A data service backed by an empty SQLite database"""
+        repository = SqliteRepository(app.config["SQLITE_DATABASE"])
+        return DataService(repository)
+
+    def test_save_and_get_child(self, sqlite_data_service):
+        """Test that a child round-trips with words and recordings"""
+        child = Child("Alice")
+        word = Word("hello", image_filename="hello.jpg")
+        word.add_recording(2023, 6, 15, "2023-06-15.mp3")
+        word.add_recording(2023, 1, 2, "2023-01-02.mp3")
+        child.add_word(word)
+        child.add_word(Word("world"))
+        sqlite_data_service.save_child(child)
+
+        retrieved = sqlite_data_service.get_child("Alice")
+        assert retrieved.to_dict() == child.to_dict()
+        assert sqlite_data_service.get_child("Bob") is None
+
+    def test_single_row_mutations(self, sqlite_data_service):
+        """Test word and recording mutations against the database"""
+        sqlite_data_service.save_child(Child("Maya"))
+
+        assert sqlite_data_service.add_word_to_child("Maya", Word("water")) is True
+        assert sqlite_data_service.add_word_to_child("Noah", Word("water")) is False
+        assert sqlite_data_service.add_recording_to_word("Maya", "water", 2023, 6, 15, "a.mp3")
+        assert sqlite_data_service.add_recording_to_word("Maya", "water", 2023, 6, 15, "b.mp3")
+        assert not sqlite_data_service.add_recording_to_word("Maya", "juice", 2023, 6, 15, "c.mp3")
+        assert sqlite_data_service.set_word_image("Maya", "water", "water.png")
+
+        word = sqlite_data_service.get_child("Maya").get_word("water")
+        assert [r.filename for r in word.recordings] == ["b.mp3"]
+        assert word.image_filename == "water.png"
+
+        assert sqlite_data_service.delete_recording("Maya", "water", 2023, 6, 15) is True
+        assert sqlite_data_service.delete_recording("Maya", "water", 2023, 6, 15) is False
+        assert sqlite_data_service.remove_word_from_child("Maya", "water") is True
+        assert sqlite_data_service.get_child("Maya").words == []
+
+        assert sqlite_data_service.delete_child("Maya") is True
+        assert sqlite_data_service.get_children() == []
+
+    def test_version_counts_effective_writes(self, sqlite_data_service):
+        """Test that the data version only moves when rows change"""
+        sqlite_data_service.save_child(Child("Maya"))
+        version = sqlite_data_service.get_version()
+
+        assert not sqlite_data_service.remove_word_from_child("Maya", "water")
+        assert sqlite_data_service.get_version() == version
+
+        sqlite_data_service.add_word_to_child("Maya", Word("water"))
+        assert sqlite_data_service.get_version().tag != version.tag
+
+    def test_invalid_recording_date(self, sqlite_data_service):
+        """Test that recording dates are validated like the model does"""
+        child = Child("Eve")
+        child.add_word(Word("cat"))
+        sqlite_data_service.save_child(child)
+
+        with pytest.raises(ValueError):
+            sqlite_data_service.add_recording_to_word("Eve", "cat", 2023, 2, 30, "x.mp3")
+
+    def test_migrate_from_json(self, sample_child, clean_data_service, app):
+        """Test the one-shot data.json migrator"""
+        database = app.config["SQLITE_DATABASE"]
+        count = migrate_json_to_sqlite(clean_data_service.data_file, database)
+
+        assert count == 1
+        migrated = SqliteRepository(database).export_data()
+        assert migrated == clean_data_service.load_data()
+
+    def test_migrate_command(self, sample_child, runner, app):
+        """Test the migrate-sqlite CLI command"""
+        result = runner.invoke(args=["storage", "migrate-sqlite"])
+
+        assert result.exit_code == 0
+        assert "Migrated 1 children" in result.output
+        assert SqliteRepository(app.config["SQLITE_DATABASE"]).get_child("TestChild")
+
+
+class TestJournaledJsonRepository:
+    """Test the journaled JSON storage backend"""
+
+    @pytest.fixture
+    def journal_repository(self, app):
+        """An empty journaled repository that compacts inline"""
+        repository = JournaledJsonRepository(
+            app.config["DATA_FILE"], compact_entries=1000, background_compaction=False
+        )
+        repository.initialize()
+        return repository
+
+    def test_mutations_append_without_rewriting_data_file(self, journal_repository):
+        """Test that mutations only touch the journal"""
+        data_service = DataService(journal_repository)
+        data_service.save_child(Child("Maya"))
+        data_size = os.path.getsize(journal_repository.data_file)
+
+        assert data_service.add_word_to_child("Maya", Word("water"))
+        assert data_service.add_recording_to_word("Maya", "water", 2023, 6, 15, "a.mp3")
+        assert data_service.set_word_image("Maya", "water", "water.png")
+        assert not data_service.add_recording_to_word("Maya", "juice", 2023, 6, 15, "b.mp3")
+
+        assert os.path.getsize(journal_repository.data_file) == data_size
+        assert [m.op for m in journal_repository.read_journal()] == [
+            "put_child",
+            "add_word",
+            "add_recording",
+            "set_image",
+        ]
+
+        word = data_service.get_child("Maya").get_word("water")
+        assert word.image_filename == "water.png"
+        assert [r.filename for r in word.recordings] == ["a.mp3"]
+
+    def test_failed_batches_leave_the_snapshot_alone(self, journal_repository):
+        """Test that a mutation raising partway through a batch changes nothing readers see"""
+        data_service = DataService(journal_repository)
+        data_service.save_child(Child("Maya", [Word("water")]))
+        snapshot = journal_repository.get_snapshot()
+
+        bad_recording = Mutation("add_recording", "Maya", {"text": "water", "year": 2023})
+        with pytest.raises(KeyError):
+            journal_repository.apply_mutations(
+                [
+                    Mutation("set_image", "Maya", {"text": "water", "filename": "w.png"}),
+                    bad_recording,
+                ]
+            )
+
+        assert snapshot.children[0].get_word("water").image_filename is None
+        assert data_service.get_child("Maya").get_word("water").image_filename is None
+        assert len(journal_repository.read_journal()) == 1
+
+    def test_replay_ignores_torn_last_line(self, journal_repository):
+        """Test that an interrupted append doesn't break loading"""
+        journal_repository.save_child(Child("Eve"))
+        with open(journal_repository.journal_file, "a", encoding="utf-8") as f:
+            f.write('{"op": "delete_child", "chi')
+
+        assert journal_repository.get_child("Eve") is not None
+
+    def test_append_after_torn_line(self, journal_repository):
+        """Test that an entry appended after an interrupted append isn't lost"""
+        journal_repository.save_child(Child("Eve"))
+        with open(journal_repository.journal_file, "a", encoding="utf-8") as f:
+            f.write('{"op": "delete_child", "chi')
+
+        assert journal_repository.add_word("Eve", Word("sun"))
+        reloaded = JournaledJsonRepository(
+            journal_repository.data_file, journal_repository.journal_file
+        )
+        assert reloaded.get_child("Eve").get_word("sun") is not None
+        assert len(reloaded.read_journal()) == 2
+
+        # Lines that are valid JSON but not entries are skipped too
+        with open(journal_repository.journal_file, "a", encoding="utf-8") as f:
+            f.write("42\n")
+        assert len(reloaded.read_journal()) == 2
+
+    def test_compaction_folds_journal(self, journal_repository):
+        """Test that compaction writes the replayed state and empties the journal"""
+        journal_repository.save_child(Child("Noah"))
+        journal_repository.add_word("Noah", Word("moon"))
+        journal_repository.remove_word("Noah", "moon")
+        journal_repository.add_word("Noah", Word("star"))
+        expected = journal_repository.export_data()
+
+        assert journal_repository.compact() == (4, 1)
+        assert journal_repository.read_journal() == []
+        assert journal_repository.load_data() == expected
+
+        # Replaying already folded entries is harmless
+        journal_repository.save_child(Child("Noah", [Word("star")]))
+        assert journal_repository.export_data() == expected
+
+    def test_compaction_threshold(self, app):
+        """Test that the journal is compacted once it passes the entry threshold"""
+        repository = JournaledJsonRepository(
+            app.config["DATA_FILE"], compact_entries=3, background_compaction=False
+        )
+        repository.initialize()
+        repository.save_child(Child("Luna"))
+        repository.add_word("Luna", Word("sun"))
+        assert len(repository.read_journal()) == 2
+
+        repository.add_word("Luna", Word("sky"))
+        assert repository.read_journal() == []
+        assert [w.text for w in repository.get_child("Luna").words] == ["sun", "sky"]
+
+
+class TestShardedJsonRepository:
+    """Test the per-child sharded storage backend"""
+
+    @pytest.fixture
+    def sharded_data_service(self, app):
+        """A data service backed by an empty shard directory"""
+        return DataService(ShardedJsonRepository(app.config["SHARD_DIR"]))
+
+    def test_writes_only_touch_one_shard(self, sharded_data_service, app):
+        """Test that changing one child leaves the other shards alone"""
+        sharded_data_service.save_child(Child("Alice", [Word("cat")]))
+        sharded_data_service.save_child(Child("Bob", [Word("dog")]))
+        bob_shard = os.path.join(app.config["SHARD_DIR"], f"{child_id('Bob')}.json")
+        bob_mtime = os.stat(bob_shard).st_mtime_ns
+
+        assert sharded_data_service.add_recording_to_word("Alice", "cat", 2023, 6, 15, "a.mp3")
+        assert not sharded_data_service.add_recording_to_word("Alice", "dog", 2023, 6, 15, "b.mp3")
+
+        assert os.stat(bob_shard).st_mtime_ns == bob_mtime
+        cat = sharded_data_service.get_child("Alice").get_word("cat")
+        assert [r.filename for r in cat.recordings] == ["a.mp3"]
+
+    def test_child_version_ignores_other_shards(self, sharded_data_service):
+        """Test that a child's version only follows its own shard"""
+        sharded_data_service.save_child(Child("Alice"))
+        sharded_data_service.save_child(Child("Bob"))
+        alice = sharded_data_service.get_version("Alice")
+        listing = sharded_data_service.get_version()
+
+        sharded_data_service.add_word_to_child("Bob", Word("dog"))
+
+        assert sharded_data_service.get_version("Alice") == alice
+        assert sharded_data_service.get_version().tag != listing.tag
+
+    def test_manifest_keeps_order_and_count(self, sharded_data_service):
+        """Test listing, counting and deleting children"""
+        for name in ["Noah", "Luna", "Maya"]:
+            sharded_data_service.save_child(Child(name))
+
+        assert sharded_data_service.count_children() == 3
+        assert [c.name for c in sharded_data_service.get_children()] == ["Noah", "Luna", "Maya"]
+
+        assert sharded_data_service.delete_child("Luna") is True
+        assert sharded_data_service.delete_child("Luna") is False
+        assert sharded_data_service.get_child("Luna") is None
+        assert [c.name for c in sharded_data_service.get_children()] == ["Noah", "Maya"]
+
+    def test_split_data_file(self, sample_child, clean_data_service, app):
+        """Test migrating data.json into shards"""
+        count = split_data_file(clean_data_service.data_file, app.config["SHARD_DIR"])
+
+        assert count == 1
+        repository = ShardedJsonRepository(app.config["SHARD_DIR"])
+        assert repository.export_data() == clean_data_service.load_data()
+
+    def test_migrate_command(self, sample_child, runner, app):
+        """Test the migrate-sharded CLI command"""
+        result = runner.invoke(args=["storage", "migrate-sharded"])
+
+        assert result.exit_code == 0
+        assert "Split 1 children" in result.output
+        assert ShardedJsonRepository(app.config["SHARD_DIR"]).get_child("TestChild")
+
+
+class TestChildQuery:
+    """Test paging, projection and filtering of children in every backend"""
+
+    @pytest.fixture(params=["json", "sharded", "sqlite"])
+    def repository(self, request, app):
+        """A repository holding three children with dated recordings"""
+        repository = {
+            "json": lambda: JsonRepository(app.config["DATA_FILE"]),
+            "sharded": lambda: ShardedJsonRepository(app.config["SHARD_DIR"]),
+            "sqlite": lambda: SqliteRepository(app.config["SQLITE_DATABASE"]),
+        }[request.param]()
+        repository.initialize()
+        for name, words in [("Alice", ["mama", "cat"]), ("Bob", ["dog"]), ("Cleo", ["moon"])]:
+            child = Child(name)
+            for text in words:
+                word = Word(text)
+                word.add_recording(2022, 1, 1, f"{text}-old.mp3")
+                if text != "dog":
+                    word.add_recording(2023, 6, 15, f"{text}-new.mp3")
+                child.add_word(word)
+            repository.save_child(child)
+        return repository
+
+    def test_pages_follow_cursor(self, repository):
+        """Test walking every page with the returned cursor"""
+        first = repository.query_children(ChildQuery.from_args({"limit": "2"}))
+        assert [c["name"] for c in first.children] == ["Alice", "Bob"]
+        assert first.children[0] == repository.get_child("Alice").to_dict()
+
+        last = repository.query_children(
+            ChildQuery.from_args({"limit": "2", "cursor": first.next_cursor})
+        )
+        assert [c["name"] for c in last.children] == ["Cleo"]
+        assert last.next_cursor is None
+
+    def test_projection(self, repository):
+        """Test returning counts and word texts without recordings"""
+        page = repository.query_children(
+            ChildQuery.from_args({"fields": "name,word_count,recording_count,words.text"})
+        )
+
+        assert page.children[0] == {
+            "name": "Alice",
+            "word_count": 2,
+            "recording_count": 4,
+            "words": [{"text": "mama"}, {"text": "cat"}],
+        }
+
+    def test_filters(self, repository):
+        """Test narrowing words by prefix and recording date"""
+        query = ChildQuery.from_args({"word_prefix": "m", "fields": "name,words.text"})
+        assert repository.query_children(query).children == [
+            {"name": "Alice", "words": [{"text": "mama"}]},
+            {"name": "Cleo", "words": [{"text": "moon"}]},
+        ]
+
+        query = ChildQuery.from_args(
+            {"recorded_since": "2023-01-01", "limit": "1", "cursor": encode_cursor(1)}
+        )
+        page = repository.query_children(query)
+        assert [c["name"] for c in page.children] == ["Cleo"]
+        assert page.children[0]["words"][0]["recordings"] == [
+            {"year": 2023, "month": 6, "day": 15, "filename": "moon-new.mp3"}
+        ]
+        assert page.next_cursor is None
+
+    def test_invalid_arguments(self):
+        """Test that malformed arguments are rejected"""
+        for args in [
+            {"limit": "0"},
+            {"limit": "x"},
+            {"cursor": "bogus"},
+            {"fields": "name,secret"},
+            {"recorded_since": "2023-13-01"},
+        ]:
+            with pytest.raises(ValueError):
+                ChildQuery.from_args(args)
+
+
+class TestArchiveImport:
+    """Test importing archives of recordings"""
+
+    ENTRIES = {
+        "export/mama/2023-06-15.wav": b"RIFF-mama-1",
+        "export/mama/2024-01-02.mp3": b"ID3-mama-2",
+        "export/papa/2023-07-01.wav": b"RIFF-papa",
+        "export/papa/notes.txt": b"not a recording",
+        "export/papa/2023-07-01.mp3": b"ID3-duplicate",
+        "export/sun/2023-08-01.xyz": b"undecodable",
+        "__MACOSX/export/._mama": b"resource fork",
+    }
+
+    @staticmethod
+    def _zip(entries: dict) -> io.BytesIO:
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w") as zf:
+            for name, content in entries.items():
+                zf.writestr(name, content)
+        buffer.seek(0)
+        return buffer
+
+    @staticmethod
+    def _tar(entries: dict) -> io.BytesIO:
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode="w:gz") as tf:
+            for name, content in entries.items():
+                info = tarfile.TarInfo(name)
+                info.size = len(content)
+                tf.addfile(info, io.BytesIO(content))
+        buffer.seek(0)
+        return buffer
+
+    def test_parse_entry_name(self):
+        """Test reading the word and date from entry names"""
+        decomposed = "cafe\u0301/2023-06-15.WAV"
+        assert parse_entry_name(decomposed) == ("caf\u00e9", date(2023, 6, 15), "wav")
+        for name in ["2023-06-15.wav", "mama/15-06-2023.wav", "mama/2023-06-15"]:
+            with pytest.raises(ValueError):
+                parse_entry_name(name)
+
+    @pytest.mark.parametrize("pack", ["_zip", "_tar"])
+    def test_import_registers_recordings_in_one_write(self, pack, app, clean_data_service):
+        """Test that saved files are registered with a single data store write"""
+        clean_data_service.save_child(Child("Alice", [Word("mama")]))
+        archive = getattr(self, pack)(self.ENTRIES)
+
+        with patch.object(
+            JsonRepository, "save_data", autospec=True, side_effect=JsonRepository.save_data
+        ) as mock_save:
+            report = import_archive(
+                archive, "Alice", clean_data_service, app.config["AUDIO_DIR"], workers=2
+            )
+            assert mock_save.call_count == 1
+
+        assert sorted(r["name"] for r in report.imported) == [
+            "export/mama/2023-06-15.wav",
+            "export/mama/2024-01-02.mp3",
+            "export/papa/2023-07-01.wav",
+        ]
+        assert sorted(f["name"] for f in report.failed) == [
+            "export/papa/2023-07-01.mp3",
+            "export/papa/notes.txt",
+            "export/sun/2023-08-01.xyz",
+        ]
+        assert report.words_created == ["papa"]
+
+        child = clean_data_service.get_child("Alice")
+        mama = child.get_word("mama")
+        assert [(r.year, r.month, r.day) for r in mama.recordings] == [(2023, 6, 15), (2024, 1, 2)]
+        audio_service = AudioService(app.config["AUDIO_DIR"])
+        papa = child.get_word("papa").recordings[0].filename
+        assert is_blob_name(papa) and papa.endswith(".wav")
+        with open(audio_service.get_audio_file_path("Alice", "papa", papa), "rb") as f:
+            assert f.read() == b"RIFF-papa"
+
+    def test_import_rejects_unknown_child_and_bad_archive(self, app, clean_data_service):
+        """Test the errors raised before anything is saved"""
+        with pytest.raises(LookupError):
+            import_archive(self._zip({}), "Nobody", clean_data_service)
+
+        clean_data_service.save_child(Child("Alice"))
+        with pytest.raises(ValueError):
+            import_archive(io.BytesIO(b"plain bytes"), "Alice", clean_data_service)
+
+    def test_import_releases_files_when_registering_fails(self, app, clean_data_service):
+        """Test that saved files are released if the child was deleted during the import"""
+        archive = self._zip({"mama/2023-06-15.wav": b"RIFF-mama"})
+        with (
+            patch.object(clean_data_service, "get_child", return_value=Child("Alice")),
+            pytest.raises(LookupError),
+        ):
+            import_archive(archive, "Alice", clean_data_service, app.config["AUDIO_DIR"])
+
+        assert AudioService(app.config["AUDIO_DIR"]).blobs.load_refs() == {}
+
+    def test_import_command(self, app, runner, clean_data_service, tmp_path):
+        """Test the recordings import CLI command"""
+        clean_data_service.save_child(Child("Alice"))
+        archive_path = tmp_path / "recordings.zip"
+        archive_path.write_bytes(self._zip({"mama/2023-06-15.wav": b"RIFF"}).getvalue())
+
+        with patch("services.audio_service.Config.AUDIO_DIR", app.config["AUDIO_DIR"]):
+            result = runner.invoke(args=["recordings", "import", "Alice", str(archive_path)])
+
+        assert result.exit_code == 0
+        assert "Imported 1 recordings (1 new words, 0 skipped)" in result.output
+        assert clean_data_service.get_child("Alice").get_word("mama")
+
+    def test_import_normalizes_loudness(self, app, clean_data_service):
+        """Test that imported recordings are brought to the target loudness"""
+        clean_data_service.save_child(Child("Alice"))
+        tone = 0.05 * np.sin(np.arange(32000) * 2 * np.pi * 1000 / 16000)
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(16000)
+            f.writeframes((tone * 32767).astype("<i2").tobytes())
+
+        archive = self._zip({"mama/2023-06-15.wav": buffer.getvalue()})
+        report = import_archive(archive, "Alice", clean_data_service, app.config["AUDIO_DIR"])
+
+        assert len(report.imported) == 1
+        recording = clean_data_service.get_child("Alice").get_word("mama").recordings[0]
+        assert recording.metadata.gain == pytest.approx(11.0, abs=0.2)
+        audio_service = AudioService(app.config["AUDIO_DIR"])
+        assert audio_service.blobs.load_refs() == {recording.filename: 1}
+        frames, _ = read_pcm(audio_service.blobs.path(recording.filename))
+        assert integrated_loudness(frames, 16000) == pytest.approx(-18.0, abs=0.1)
+
+
+class TestBlobStore:
+    """Test the content-addressed, reference-counted media store"""
+
+    @staticmethod
+    def _put(store: BlobStore, content: bytes, extension: str = "mp3") -> str:
+        path = store.temp_path(extension)
+        with open(path, "wb") as f:
+            f.write(content)
+        return store.put_file(path, extension)
+
+    def test_identical_content_is_stored_once(self, tmp_path):
+        """Test deduplication and reference counting"""
+        store = BlobStore(str(tmp_path / "blobs"))
+        first = self._put(store, b"same audio")
+        second = self._put(store, b"same audio")
+        other = self._put(store, b"other audio")
+
+        assert first == second != other
+        assert is_blob_name(first) and first.endswith(".mp3")
+        assert store.load_refs() == {first: 2, other: 1}
+
+        assert store.release(first) is True
+        assert store.exists(first)
+        assert store.release(first) is True
+        assert not store.exists(first)
+        assert store.release(first) is False
+        assert store.release("2023-06-15.mp3") is False
+
+    def test_sweep_collects_unreferenced_blobs(self, tmp_path):
+        """Test garbage collection against the live references"""
+        store = BlobStore(str(tmp_path / "blobs"))
+        kept = self._put(store, b"kept")
+        dropped = self._put(store, b"dropped")
+
+        assert store.sweep({kept: 3, "2023-06-15.mp3": 1}) == [dropped]
+        assert store.load_refs() == {kept: 3}
+        assert store.exists(kept) and not store.exists(dropped)
+
+    def test_legacy_refs_are_migrated(self, tmp_path):
+        """Test that counts of the former refs.json move into the database once"""
+        store = BlobStore(str(tmp_path / "blobs"))
+        name = self._put(store, b"audio")
+        store.release(name)
+        os.makedirs(store.root, exist_ok=True)
+        with open(os.path.join(store.root, "refs.json"), "w", encoding="utf-8") as f:
+            json.dump({name: 2}, f)
+
+        store = BlobStore(store.root)
+        assert store.load_refs() == {name: 2}
+        assert not os.path.exists(os.path.join(store.root, "refs.json"))
+        assert store.retain(name) and store.load_refs() == {name: 3}
+        assert store.retain(name, 2) and store.load_refs() == {name: 5}
+        assert store.retain("0123456789abcdef.mp3") is False
+
+    def test_gc_command(self, app, runner, clean_data_service):
+        """Test the media gc CLI command"""
+        audio_service = AudioService(app.config["AUDIO_DIR"])
+        kept = self._put(audio_service.blobs, b"kept")
+        orphan = self._put(audio_service.blobs, b"orphan")
+        word = Word("sun")
+        word.add_recording(2023, 6, 15, kept)
+        clean_data_service.save_child(Child("Alice", [word]))
+
+        with (
+            patch("services.audio_service.Config.AUDIO_DIR", app.config["AUDIO_DIR"]),
+            patch("services.image_service.Config.IMAGES_DIR", app.config["IMAGES_DIR"]),
+        ):
+            result = runner.invoke(args=["media", "gc"])
+
+        assert result.exit_code == 0
+        assert f"Removed {orphan}" in result.output
+        assert audio_service.blobs.exists(kept)
+        assert not audio_service.blobs.exists(orphan)
+
+
+class TestWaveform:
+    """Test precomputed waveform peaks"""
+
+    def test_peaks_match_a_per_bucket_scan(self):
+        """Test the vectorized min/max against a plain loop, including a ragged end"""
+        samples = np.sin(np.linspace(0, 40, 10_001, dtype=np.float32)) * 0.5
+        peaks = compute_peaks(samples, 100)
+
+        width = 101
+        for i in (0, 42, 99):
+            bucket = samples[i * width : (i + 1) * width]
+            assert tuple(peaks[i]) == (round(bucket.min() * 127), round(bucket.max() * 127))
+        assert compute_peaks(samples[:10], 100).shape == (10, 2)
+
+    def test_stereo_wav_is_mixed_down(self, tmp_path):
+        """Test decoding PCM WAV without ffmpeg"""
+        path = str(tmp_path / "stereo.wav")
+        with wave.open(path, "wb") as f:
+            f.setnchannels(2)
+            f.setsampwidth(2)
+            f.setframerate(8000)
+            f.writeframes(np.array([16384, 0] * 800, dtype="<i2").tobytes())
+
+        samples, rate = decode_pcm(path)
+        assert rate == 8000
+        assert samples.shape == (800,)
+        assert samples[0] == pytest.approx(0.25)
+
+    def test_sidecar_follows_the_blob(self, tmp_path):
+        """Test that peaks are stored next to a blob and deleted with it"""
+        store = BlobStore(str(tmp_path / "blobs"))
+        source = store.temp_path("wav")
+        with wave.open(source, "wb") as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(8000)
+            f.writeframes(np.zeros(8000, dtype="<i2").tobytes())
+        name = store.put_file(source, "wav")
+
+        peaks = write_peaks(store.path(name))
+        assert peaks["duration"] == pytest.approx(1.0)
+        assert len(peaks["levels"]["256"]) == 512
+        assert load_peaks(store.path(name)) == peaks
+
+        store.release(name)
+        assert not os.path.exists(peaks_path(store.path(name)))
+
+    def test_sweep_removes_orphaned_sidecars(self, tmp_path):
+        """Test that garbage collection drops sidecars of collected blobs only"""
+        store = BlobStore(str(tmp_path / "blobs"))
+        kept = TestBlobStore._put(store, b"kept")
+        dropped = TestBlobStore._put(store, b"dropped")
+        for name in (kept, dropped):
+            with open(peaks_path(store.path(name)), "w") as f:
+                f.write("{}")
+
+        store.sweep({kept: 1})
+        assert os.path.exists(peaks_path(store.path(kept)))
+        assert not os.path.exists(peaks_path(store.path(dropped)))
+
+
+class TestAudioMetadata:
+    """Test probing and storing recording metadata"""
+
+    METADATA = AudioMetadata(2.0, "opus", 48000, 1, loudness=-20.0)
+
+    @staticmethod
+    def _write_wav(path: str, seconds: float = 1.0, amplitude: int = 8192) -> None:
+        with wave.open(path, "wb") as f:
+            f.setnchannels(2)
+            f.setsampwidth(2)
+            f.setframerate(8000)
+            frames = np.full(int(seconds * 8000) * 2, amplitude, dtype="<i2")
+            f.writeframes(frames.tobytes())
+
+    def test_analyze_wav(self, tmp_path):
+        """Test header probing, loudness and peaks of a PCM WAV file"""
+        path = str(tmp_path / "take.wav")
+        self._write_wav(path, seconds=1.5)
+
+        metadata = analyze_recording(path)
+        assert metadata == AudioMetadata(1.5, "pcm_s16le", 8000, 2, loudness=-12.04)
+        assert os.path.exists(peaks_path(path))
+
+        with open(tmp_path / "noise.mp3", "wb") as f:
+            f.write(b"not audio")
+        with (
+            patch("services.audio_metadata.shutil.which", return_value=None),
+            patch("services.waveform.AudioSegment.from_file", side_effect=OSError),
+        ):
+            with pytest.raises(ValueError):
+                analyze_recording(str(tmp_path / "noise.mp3"))
+
+    @pytest.mark.parametrize("backend", ["json", "sqlite"])
+    def test_metadata_is_stored(self, app, backend):
+        """Test that metadata persists and is not applied to replaced recordings"""
+        if backend == "sqlite":
+            data_service = DataService(SqliteRepository(app.config["SQLITE_DATABASE"]))
+        else:
+            data_service = DataService(JsonRepository(app.config["DATA_FILE"]))
+        data_service.save_child(Child("Maya", [Word("sun")]))
+
+        with data_service.transaction() as transaction:
+            transaction.add_recording("Maya", "sun", 2023, 6, 15, "a.webm", self.METADATA)
+            transaction.add_recording("Maya", "sun", 2023, 6, 16, "b.webm")
+        assert data_service.set_recording_metadata(
+            "Maya", "sun", 2023, 6, 16, "b.webm", self.METADATA
+        )
+        assert not data_service.set_recording_metadata(
+            "Maya", "sun", 2023, 6, 16, "old.webm", self.METADATA
+        )
+
+        word = data_service.get_child("Maya").get_word("sun")
+        assert [r.metadata for r in word.recordings] == [self.METADATA, self.METADATA]
+
+        # Replacing the file drops the metadata of the old one
+        data_service.add_recording_to_word("Maya", "sun", 2023, 6, 15, "c.webm")
+        word = data_service.get_child("Maya").get_word("sun")
+        assert word.get_recording(2023, 6, 15).metadata is None
+
+    def test_sqlite_schema_gains_metadata_column(self, app):
+        """Test that databases created before metadata are upgraded in place"""
+        database = app.config["SQLITE_DATABASE"]
+        with closing(sqlite3.connect(database)) as conn:
+            conn.execute(
+                "CREATE TABLE recordings (id INTEGER PRIMARY KEY, word_id INTEGER NOT NULL, "
+                "year INTEGER NOT NULL, month INTEGER NOT NULL, day INTEGER NOT NULL, "
+                "filename TEXT NOT NULL)"
+            )
+
+        repository = SqliteRepository(database)
+        repository.initialize()
+        repository.save_child(Child("Maya", [Word("sun")]))
+        assert repository.add_recording("Maya", "sun", 2023, 6, 15, "a.webm", self.METADATA)
+        assert repository.get_child("Maya").get_word("sun").recordings[0].metadata == self.METADATA
+
+    def test_backfill(self, app, clean_data_service):
+        """Test probing existing recordings in parallel and storing the results at once"""
+        audio_service = AudioService(app.config["AUDIO_DIR"])
+        word = Word("sun")
+        for day in (15, 16):
+            source = audio_service.blobs.temp_path("wav")
+            self._write_wav(source, seconds=day / 10)
+            word.add_recording(2023, 6, day, audio_service.blobs.put_file(source, "wav"))
+        word.add_recording(2023, 6, 17, "0123456789abcdef.wav")
+        clean_data_service.save_child(Child("Maya", [word]))
+
+        report = backfill_metadata(clean_data_service, audio_service, workers=2)
+        assert report.updated == 2
+        assert report.failed == [("0123456789abcdef.wav", "Audio file not found")]
+
+        recordings = clean_data_service.get_child("Maya").get_word("sun").recordings
+        assert [r.duration for r in recordings] == [1.5, 1.6, None]
+        assert backfill_metadata(clean_data_service, audio_service, workers=2).updated == 0
+
+
+class TestAudioTrim:
+    """Test trimming audio without re-encoding"""
+
+    # 20 ms packets, like Opus
+    BOUNDARIES = [i * 0.02 for i in range(101)]
+
+    def test_cut_points_near_boundaries_are_copied(self):
+        """Test that cut points within tolerance snap onto packet boundaries"""
+        plan = plan_trim(self.BOUNDARIES, 0.505, 1.495, tolerance=0.01)
+        assert plan == TrimPlan(pytest.approx(0.5), pytest.approx(1.5))
+
+        # Past the end of the stream is clamped to the last packet
+        assert plan_trim(self.BOUNDARIES, 1.0, 9.0, 0.01).copy_end == pytest.approx(2.0)
+
+    def test_other_cut_points_get_reencoded_edges(self):
+        """Test that cut points off the packet grid re-encode only the edges"""
+        plan = plan_trim(self.BOUNDARIES, 0.51, 1.49, tolerance=0.001)
+        assert plan.copy_start == pytest.approx(0.52)
+        assert plan.copy_end == pytest.approx(1.48)
+        assert plan.head == (0.51, pytest.approx(0.52))
+        assert plan.tail == (pytest.approx(1.48), 1.49)
+
+        # Nothing to copy inside a single packet
+        assert plan_trim(self.BOUNDARIES, 0.501, 0.519, tolerance=0.001) is None
+
+    def test_wav_is_cut_sample_exactly(self, tmp_path):
+        """Test that WAV trims copy frames without decoding"""
+        source, target = tmp_path / "in.wav", tmp_path / "out.wav"
+        with wave.open(str(source), "wb") as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(8000)
+            f.writeframes(b"".join(i.to_bytes(2, "little") for i in range(16000)))
+
+        assert trim_copy(str(source), str(target), "wav", 0.5, 1.25, tolerance=0.03)
+        with wave.open(str(target), "rb") as f:
+            assert f.getnframes() == 6000
+            assert f.readframes(1) == (4000).to_bytes(2, "little")
+
+    def test_trim_uses_copy_path_and_falls_back(self, app, tmp_path):
+        """Test that the service skips pydub when a copy trim is possible"""
+        source = io.BytesIO()
+        with wave.open(source, "wb") as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(8000)
+            f.writeframes(b"\0\0" * 16000)
+        audio_service = AudioService(str(tmp_path))
+
+        with patch("services.audio_service.AudioSegment.from_file") as decode:
+            source.seek(0)
+            file = FileStorage(stream=source, filename="take.wav")
+            filename = audio_service.save_audio_file_with_trim(
+                file, "Kai", "sun", 2023, 6, 15, 0, 1
+            )
+            decode.assert_not_called()
+        with wave.open(audio_service.get_audio_file_path("Kai", "sun", filename), "rb") as f:
+            assert f.getnframes() == 8000
+
+        # Without ffmpeg, compressed formats are left to the decoding path
+        with patch("services.audio_trim.shutil.which", return_value=None):
+            assert not trim_copy(
+                str(tmp_path / "x.mp3"), str(tmp_path / "y.mp3"), "mp3", 0, 1, 0.03
+            )
+
+
+class TestAudioCodec:
+    """Test storing recordings as Opus in Ogg"""
+
+    @staticmethod
+    def _write_wav(path: str, seconds: float) -> None:
+        with wave.open(path, "wb") as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(8000)
+            f.writeframes(b"\x00\x10" * int(seconds * 8000))
+
+    @classmethod
+    def _fake_transcode(cls, source_path, extension, target_path, bitrate) -> bool:
+        """Stand in for ffmpeg: write half the file, as a WAV under the target name"""
+        with wave.open(source_path, "rb") as f:
+            seconds = f.getnframes() / f.getframerate()
+        cls._write_wav(target_path, seconds / 2)
+        return True
+
+    def test_transcode_decisions(self, tmp_path):
+        """Test that Opus is remuxed, canonical files kept, and larger results rejected"""
+        source, target = str(tmp_path / "take.webm"), str(tmp_path / "take.ogg")
+        with open(source, "wb") as f:
+            f.write(b"\0" * 1000)
+
+        def ffmpeg(size):
+            def run(args, **kwargs):
+                with open(args[-1], "wb") as f:
+                    f.write(b"\0" * size)
+
+            return run
+
+        with (
+            patch("services.audio_codec.shutil.which", return_value="/usr/bin/ffmpeg"),
+            patch("services.audio_codec.probe_codec", return_value="opus"),
+            patch("services.audio_codec.subprocess.run", side_effect=ffmpeg(400)) as run,
+        ):
+            assert transcode_to_canonical(source, "webm", target, "32k")
+            assert run.call_args.args[0][run.call_args.args[0].index("-c:a") + 1] == "copy"
+
+            run.reset_mock()
+            assert not transcode_to_canonical(source, "ogg", target, "32k")
+            run.assert_not_called()
+
+        with (
+            patch("services.audio_codec.shutil.which", return_value="/usr/bin/ffmpeg"),
+            patch("services.audio_codec.probe_codec", return_value="pcm_s16le"),
+            patch("services.audio_codec.subprocess.run", side_effect=ffmpeg(2000)) as run,
+        ):
+            assert not transcode_to_canonical(source, "wav", target, "24k")
+            assert "libopus" in run.call_args.args[0] and "24k" in run.call_args.args[0]
+
+        with patch("services.audio_codec.shutil.which", return_value=None):
+            assert not transcode_to_canonical(source, "webm", target, "32k")
+
+    def test_uploads_are_transcoded_after_saving(self, app, tmp_path):
+        """Test that uploads are saved as sent and transcoded when normalized, unless turned off"""
+        audio_service = AudioService(str(tmp_path))
+        source = tmp_path / "take.wav"
+        self._write_wav(str(source), 1.0)
+        with open(source, "rb") as f:
+            file = FileStorage(stream=io.BytesIO(f.read()), filename="take.wav")
+
+        with patch(
+            "services.audio_service.transcode_to_canonical", side_effect=self._fake_transcode
+        ) as transcode:
+            filename = audio_service.save_audio_file(file, "Kai", "sun", 2023, 6, 15)
+            assert filename.endswith(".wav")
+            transcode.assert_not_called()
+
+            path = audio_service.get_audio_file_path("Kai", "sun", filename)
+            with patch("services.normalization.normalization_gain", return_value=0.0):
+                with patch("services.audio_service.Config.AUDIO_STORAGE_CODEC", "original"):
+                    assert normalize_recording(audio_service, path, convert=True)[0] is None
+                name, metadata = normalize_recording(audio_service, path, convert=True)
+
+        assert name.endswith(".ogg") and metadata.gain == 0.0
+        assert os.path.getsize(audio_service.blobs.path(name)) < os.path.getsize(path)
+        assert audio_service.blobs.load_refs() == {filename: 1, name: 1}
+        assert not [name for name in os.listdir(audio_service.blobs.root) if "incoming" in name]
+
+    def test_convert_library(self, app, clean_data_service):
+        """Test converting stored recordings once per file and reporting the bytes saved"""
+        audio_service = AudioService(app.config["AUDIO_DIR"])
+        shared = audio_service.blobs.temp_path("wav")
+        self._write_wav(shared, 2.0)
+        shared = audio_service.blobs.put_file(shared, "wav")
+        audio_service.blobs.retain(shared)
+
+        word = Word("sun")
+        word.add_recording(2023, 6, 15, shared)
+        word.add_recording(2023, 6, 16, shared)
+        word.add_recording(2023, 6, 17, "0123456789abcdef.wav")
+        clean_data_service.save_child(Child("Maya", [word]))
+        size = os.path.getsize(audio_service.blobs.path(shared))
+
+        with patch(
+            "services.audio_conversion.transcode_to_canonical", side_effect=self._fake_transcode
+        ):
+            report = convert_library(clean_data_service, audio_service, workers=2)
+
+        assert (report.converted, report.kept) == (2, 0)
+        assert report.failed == [("0123456789abcdef.wav", "Audio file not found")]
+        recordings = clean_data_service.get_child("Maya").get_word("sun").recordings
+        converted = recordings[0].filename
+        assert converted.endswith(".ogg") and recordings[1].filename == converted
+        assert recordings[0].duration == 1.0
+        assert report.bytes_before == size
+        assert report.bytes_after == os.path.getsize(audio_service.blobs.path(converted))
+        assert report.bytes_saved > 0
+        assert audio_service.blobs.load_refs() == {converted: 2}
+        assert not audio_service.blobs.exists(shared)
+
+
+class TestLoudness:
+    """Test measuring and normalizing loudness"""
+
+    @staticmethod
+    def _tone(amplitude: float, seconds: float = 2.0, rate: int = 48000, channels: int = 1):
+        tone = amplitude * np.sin(np.arange(int(seconds * rate)) * 2 * np.pi * 1000 / rate)
+        return np.repeat(tone[:, None], channels, axis=1).astype(np.float32)
+
+    def test_integrated_loudness(self):
+        """Test BS.1770 reference levels and gating"""
+        # A full scale 1kHz sine reads -3.01 LUFS per channel
+        assert integrated_loudness(self._tone(1.0), 48000) == pytest.approx(-3.01, abs=0.05)
+        assert integrated_loudness(self._tone(1.0, channels=2), 48000) == pytest.approx(
+            0.0, abs=0.05
+        )
+
+        # Silence is gated out instead of dragging the level down
+        quiet = np.concatenate([self._tone(0.1), np.zeros((48000 * 4, 1), np.float32)])
+        assert integrated_loudness(quiet, 48000) == pytest.approx(-23.01, abs=0.5)
+        assert integrated_loudness(np.zeros((48000, 1), np.float32), 48000) is None
+
+    def test_gain_limits(self):
+        """Test that gains respect the peak ceiling and the maximum boost"""
+        assert normalization_gain(self._tone(0.1), 48000, -18, -1, 20) == pytest.approx(5, abs=0.1)
+        assert normalization_gain(self._tone(0.5), 48000, -3, -1, 20) == pytest.approx(
+            20 * np.log10(0.891 / 0.5), abs=0.01
+        )
+        assert normalization_gain(self._tone(0.001), 48000, -18, -1, 20) == 20
+        assert normalization_gain(np.zeros((100, 1), np.float32), 48000, -18, -1, 20) == 0
+
+    def test_normalize_library(self, app, clean_data_service):
+        """Test normalizing in resumable batches, once per file, and skipping reruns"""
+        audio_service = AudioService(app.config["AUDIO_DIR"])
+
+        def store(amplitude: float) -> str:
+            path = audio_service.blobs.temp_path("wav")
+            with wave.open(path, "wb") as f:
+                f.setnchannels(1)
+                f.setsampwidth(2)
+                f.setframerate(16000)
+                f.writeframes((self._tone(amplitude, rate=16000) * 32767).astype("<i2").tobytes())
+            return audio_service.blobs.put_file(path, "wav")
+
+        quiet, level = store(0.05), store(0.18)
+        audio_service.blobs.retain(quiet)
+        word = Word("sun")
+        word.add_recording(2023, 6, 15, quiet)
+        word.add_recording(2023, 6, 16, quiet)
+        word.add_recording(2023, 6, 17, level)
+        clean_data_service.save_child(Child("Maya", [word]))
+
+        progress = []
+        with patch("services.normalization.Config.LOUDNESS_TARGET", -18.0):
+            report = normalize_library(
+                clean_data_service,
+                audio_service,
+                workers=2,
+                batch_size=1,
+                progress=lambda *args: progress.append(args),
+            )
+        assert (report.normalized, report.unchanged, report.failed) == (2, 1, [])
+        assert progress == [(1, 2), (2, 2)]
+
+        recordings = clean_data_service.get_child("Maya").get_word("sun").recordings
+        assert recordings[0].filename == recordings[1].filename != quiet
+        assert recordings[0].metadata.gain == pytest.approx(11.0, abs=0.2)
+        assert recordings[2].filename == level and recordings[2].metadata.gain == 0.0
+        assert audio_service.blobs.load_refs() == {recordings[0].filename: 2, level: 1}
+        frames, _ = read_pcm(audio_service.blobs.path(recordings[0].filename))
+        assert integrated_loudness(frames, 16000) == pytest.approx(-18.0, abs=0.1)
+
+        rerun = normalize_library(clean_data_service, audio_service, workers=2)
+        assert (rerun.normalized, rerun.unchanged) == (0, 0)
+
+
+class TestFeatures:
+    """Test acoustic features and the memory-mapped store comparing them"""
+
+    @staticmethod
+    def _tone(frequency: float, amplitude: float = 0.3, seconds: float = 1.0, rate=16000):
+        samples = np.arange(int(seconds * rate)) * 2 * np.pi * frequency / rate
+        return (amplitude * np.sin(samples)).astype(np.float32)
+
+    @staticmethod
+    def _distance(a: np.ndarray, b: np.ndarray) -> float:
+        return float(np.sqrt(np.mean(np.square(a - b))))
+
+    def test_recording_features(self):
+        """Test that vectors ignore level and surrounding silence but not the sound"""
+        features = recording_features(self._tone(440), 16000)
+        assert features.shape == (FEATURE_SIZE,)
+        assert features.dtype == np.float32
+
+        quieter = recording_features(self._tone(440, amplitude=0.05), 16000)
+        silence = np.zeros(8000, dtype=np.float32)
+        padded = recording_features(np.concatenate([silence, self._tone(440), silence]), 16000)
+        other = recording_features(self._tone(1500), 16000)
+        assert self._distance(features, quieter) < 2
+        assert self._distance(features, padded) < 3
+        assert self._distance(features, other) > 10 * self._distance(features, padded)
+
+        # Shorter than a frame still gives a vector; silence gives none
+        assert recording_features(self._tone(440, seconds=0.01), 16000).shape == (FEATURE_SIZE,)
+        with pytest.raises(ValueError):
+            recording_features(np.zeros(16000, dtype=np.float32), 16000)
+
+    def test_store(self, tmp_path):
+        """Test storing, ranking, removing and reusing rows"""
+        store = FeatureStore(str(tmp_path / "features"))
+        base = np.zeros(FEATURE_SIZE, dtype=np.float32)
+        store.put(
+            {
+                ("Maya", "sun", "2023-06-15"): base,
+                ("Maya", "sun", "2023-06-16"): base + 1,
+                ("Kai", "sun", "2023-06-15"): base + 3,
+                ("Kai", "moon", "2023-06-15"): base + 2,
+            }
+        )
+        assert store.get(("Kai", "moon", "2023-06-15"))[0] == 2
+        assert store.nearest(("Maya", "sun", "2023-01-01")) is None
+
+        assert store.nearest(("Maya", "sun", "2023-06-15"), "sun") == [
+            (("Maya", "sun", "2023-06-16"), 1.0),
+            (("Kai", "sun", "2023-06-15"), 3.0),
+        ]
+        assert store.nearest(("Maya", "sun", "2023-06-15"), limit=2) == [
+            (("Maya", "sun", "2023-06-16"), 1.0),
+            (("Kai", "moon", "2023-06-15"), 2.0),
+        ]
+
+        # Replacing a vector keeps its row; freed rows are taken by new recordings
+        size = os.path.getsize(store.matrix_file)
+        store.put({("Maya", "sun", "2023-06-16"): base + 5})
+        assert store.remove([("Kai", "sun", None), ("Maya", "moon", "2023-06-15")]) == 1
+        store.put({("Kai", "moon", "2023-06-16"): base + 4})
+        assert os.path.getsize(store.matrix_file) == size
+        assert store.keys() == {
+            ("Maya", "sun", "2023-06-15"),
+            ("Maya", "sun", "2023-06-16"),
+            ("Kai", "moon", "2023-06-15"),
+            ("Kai", "moon", "2023-06-16"),
+        }
+        assert [key for key, _ in store.nearest(("Maya", "sun", "2023-06-15"))] == [
+            ("Kai", "moon", "2023-06-15"),
+            ("Kai", "moon", "2023-06-16"),
+            ("Maya", "sun", "2023-06-16"),
+        ]
+
+        # Vectors of another extractor are discarded
+        with closing(sqlite3.connect(store.index_database)) as conn:
+            conn.execute("PRAGMA user_version = 3")
+        assert FeatureStore(store.root).keys() == set()
+
+    def test_legacy_index_is_migrated(self, tmp_path):
+        """Test that rows of the former index.json move into the database once"""
+        store = FeatureStore(str(tmp_path / "features"))
+        os.makedirs(store.root)
+        base = np.zeros((3, FEATURE_SIZE), dtype=np.float32)
+        base[1:] += [[1], [2]]
+        base.tofile(store.matrix_file)
+        rows = [["Maya", "sun", "2023-06-15"], None, ["Maya", "sun", "2023-06-16"]]
+        atomic_write_json(store.legacy_index_file, {"size": FEATURE_SIZE, "rows": rows})
+
+        assert store.nearest(("Maya", "sun", "2023-06-15"), "sun") == [
+            (("Maya", "sun", "2023-06-16"), 2.0)
+        ]
+        assert not os.path.exists(store.legacy_index_file)
+        store.put({("Kai", "moon", "2023-06-15"): base[0] + 4})
+        assert store.get(("Kai", "moon", "2023-06-15"))[0] == 4
+        assert os.path.getsize(store.matrix_file) == 3 * FEATURE_SIZE * 4
+
+    def test_backfill(self, app, clean_data_service):
+        """Test extracting missing features and dropping those of deleted recordings"""
+        audio_service = AudioService(app.config["AUDIO_DIR"])
+        word = Word("sun")
+        for day, frequency in ((15, 440), (16, 1500)):
+            audio = io.BytesIO()
+            with wave.open(audio, "wb") as f:
+                f.setnchannels(1)
+                f.setsampwidth(2)
+                f.setframerate(16000)
+                f.writeframes((self._tone(frequency) * 32767).astype("<i2").tobytes())
+            audio.seek(0)
+            file = FileStorage(stream=audio, filename="take.wav")
+            word.add_recording(
+                2023, 6, day, audio_service.save_audio_file(file, "Maya", "sun", 2023, 6, day)
+            )
+        word.add_recording(2023, 6, 17, "missing.wav")
+        clean_data_service.save_child(Child("Maya", [word]))
+        audio_service.features.put({("Maya", "sun", "2023-06-01"): np.zeros(FEATURE_SIZE)})
+
+        report = backfill_features(clean_data_service, audio_service, workers=2)
+        assert (report.extracted, report.removed) == (2, 1)
+        assert report.failed == [("missing.wav", "Audio file not found")]
+        assert audio_service.features.keys() == {
+            ("Maya", "sun", "2023-06-15"),
+            ("Maya", "sun", "2023-06-16"),
+        }
+
+        rerun = backfill_features(clean_data_service, audio_service, workers=2)
+        assert (rerun.extracted, rerun.removed) == (0, 0)
+
+
+class TestMontage:
+    """Test joining a word's recordings"""
+
+    def test_key_follows_the_recordings(self):
+        """Test that montage keys change with the recording list and the gap"""
+        word = Word("sun")
+        word.add_recording(2023, 6, 15, "0123456789abcdef.wav")
+        key = montage_key(word, 0.5)
+        assert montage_key(word, 0.5) == key
+        assert montage_key(word, 1.0) != key
+
+        word.add_recording(2023, 6, 16, "fedcba9876543210.wav")
+        assert montage_key(word, 0.5) != key
+        word.remove_recording(2023, 6, 16)
+        assert montage_key(word, 0.5) == key
+
+    def test_directories_are_distinct_per_word(self, tmp_path):
+        """Test that words differing only in accents or script get their own directory"""
+        directories = {
+            montage_dir(str(tmp_path), child, word)
+            for child, word in [
+                ("Kai", "pa"),
+                ("Kai", "pà"),
+                ("Kai", "水"),
+                ("Kai", "日"),
+                ("Mia", "pa"),
+            ]
+        }
+        assert len(directories) == 5
+        assert all(os.path.dirname(d) == str(tmp_path / ".montages") for d in directories)
+
+    def test_build_joins_mixed_formats(self, tmp_path):
+        """Test that recordings of different rates and channels are joined in mono"""
+        paths = []
+        for index, (rate, channels) in enumerate(((8000, 1), (16000, 2))):
+            paths.append(str(tmp_path / f"{index}.wav"))
+            with wave.open(paths[-1], "wb") as f:
+                f.setnchannels(channels)
+                f.setsampwidth(2)
+                f.setframerate(rate)
+                f.writeframes(b"\x00\x10" * rate * channels)
+
+        directory = str(tmp_path / "montages")
+        stale = build_montage(paths[:1], directory, "0" * 16, gap=0.5)
+        path = build_montage(paths, directory, "1" * 16, gap=0.5)
+        assert find_montage(directory, "1" * 16) == path
+        assert not os.path.exists(stale)
+        with wave.open(path, "rb") as f:
+            assert (f.getframerate(), f.getnchannels()) == (16000, 1)
+            assert f.getnframes() == pytest.approx(16000 * 2.5, abs=2)
+
+
+class TestSilence:
+    """Test finding and trimming leading and trailing silence"""
+
+    RATE = 8000
+
+    def _take(self, before: float, sound: float, after: float) -> np.ndarray:
+        """Make a tone with quiet noise before and after it"""
+        rng = np.random.default_rng(0)
+        noise = lambda seconds: rng.normal(0, 0.001, int(seconds * self.RATE))
+        tone = 0.5 * np.sin(np.arange(int(sound * self.RATE)) * 2 * np.pi * 440 / self.RATE)
+        return np.concatenate([noise(before), tone, noise(after)]).astype(np.float32)
+
+    def test_sound_is_found_between_silences(self):
+        """Test that the span covers the sound plus padding, whatever the noise floor"""
+        start, end = find_sound(self._take(1.0, 0.5, 2.0), self.RATE, 35, 0.02, 0.1)
+        assert start == pytest.approx(0.9)
+        assert end == pytest.approx(1.6)
+
+        # Padding stops at the ends of the recording
+        start, end = find_sound(self._take(0.05, 0.5, 0.05), self.RATE, 35, 0.02, 0.1)
+        assert (start, end) == (0.0, pytest.approx(0.6))
+
+        assert find_sound(np.zeros(self.RATE, dtype=np.float32), self.RATE, 35, 0.02, 0.1) is None
+        assert find_sound(np.zeros(0, dtype=np.float32), self.RATE, 35, 0.02, 0.1) is None
+
+    def test_auto_trim_cuts_silence_and_keeps_the_rest(self, app, tmp_path):
+        """Test that auto-trimmed uploads are cut around the sound, and silent ones kept"""
+        audio_service = AudioService(str(tmp_path))
+
+        def upload(samples: np.ndarray) -> str:
+            source = io.BytesIO()
+            with wave.open(source, "wb") as f:
+                f.setnchannels(1)
+                f.setsampwidth(2)
+                f.setframerate(self.RATE)
+                f.writeframes((samples * 32767).astype("<i2").tobytes())
+            source.seek(0)
+            return audio_service.save_audio_file_with_auto_trim(
+                FileStorage(stream=source, filename="take.wav"), "Kai", "sun", 2023, 6, 15
+            )
+
+        with patch("services.audio_service.AudioSegment.from_file") as decode:
+            filename = upload(self._take(2.0, 0.5, 3.0))
+            decode.assert_not_called()
+        with wave.open(audio_service.get_audio_file_path("Kai", "sun", filename), "rb") as f:
+            assert f.getnframes() / self.RATE == pytest.approx(0.8)
+
+        silent = upload(np.zeros(self.RATE, dtype=np.float32))
+        with wave.open(audio_service.get_audio_file_path("Kai", "sun", silent), "rb") as f:
+            assert f.getnframes() == self.RATE
+
+
+class TestJobQueue:
+    """Test the persistent background job queue"""
+
+    def test_claim_leases_each_job_once(self, app):
+        """Test that a queued job is handed out once until its lease runs out"""
+        queue = JobQueue(app.config["JOB_DATABASE"], lease_seconds=60)
+        job = queue.submit("noop", {"n": 1})
+        assert job.status == QUEUED
+
+        claimed = queue.claim()
+        assert claimed.id == job.id
+        assert claimed.payload == {"n": 1}
+        assert claimed.attempts == 1
+        assert queue.claim() is None
+
+        # A job whose worker died is picked up again once its lease expires
+        queue.lease_seconds = -1
+        queue.submit("noop", {})
+        queue.claim()
+        assert queue.claim() is not None
+
+    def test_failures_are_retried_with_backoff(self, app):
+        """Test that failed attempts are re-queued until max_attempts"""
+        queue = JobQueue(app.config["JOB_DATABASE"], retry_delay=0)
+        job = queue.submit("flaky", {}, max_attempts=2)
+
+        assert queue.fail(queue.claim(), "boom")
+        assert queue.get(job.id).status == QUEUED
+        assert not queue.fail(queue.claim(), "boom again")
+
+        job = queue.get(job.id)
+        assert job.status == FAILED
+        assert job.attempts == 2
+        assert job.error == "boom again"
+
+    def test_runner_completes_and_cleans_up(self, app):
+        """Test that the runner applies results, and skips retries for invalid input"""
+        calls = []
+
+        def run(payload):
+            if payload["value"] < 0:
+                raise ValueError("negative")
+            return {"double": payload["value"] * 2}
+
+        job_type = JobType(
+            run,
+            complete=lambda payload, result: calls.append(("complete", result)),
+            cleanup=lambda payload: calls.append(("cleanup", payload["value"])),
+        )
+        queue = JobQueue(app.config["JOB_DATABASE"])
+        runner = JobRunner(queue, app, workers=0)
+
+        with patch.dict(JOB_TYPES, {"double": job_type}):
+            ok = queue.submit("double", {"value": 2})
+            bad = queue.submit("double", {"value": -1})
+            assert runner.run_pending() == 2
+
+        assert queue.get(ok.id).status == SUCCEEDED
+        assert queue.get(ok.id).result == {"double": 4}
+        assert queue.get(bad.id).status == FAILED
+        assert queue.get(bad.id).attempts == 1
+        assert calls == [("complete", {"double": 4}), ("cleanup", 2), ("cleanup", -1)]
+
+    def test_lapsed_claims_cannot_finish_the_job(self, app):
+        """Test that a process whose lease ran out doesn't complete a job claimed again"""
+        calls = []
+        job_type = JobType(
+            lambda payload: {"value": payload["value"]},
+            complete=lambda payload, result: calls.append("complete"),
+            discard=lambda payload, result: calls.append("discard"),
+            cleanup=lambda payload: calls.append("cleanup"),
+        )
+        queue = JobQueue(app.config["JOB_DATABASE"], lease_seconds=-1)
+        runner = JobRunner(queue, app, workers=0)
+
+        with patch.dict(JOB_TYPES, {"slow": job_type}):
+            job = queue.submit("slow", {"value": 1})
+            lapsed = queue.claim()
+            current = queue.claim()
+            assert lapsed.lease != current.lease
+
+            runner.run_job(lapsed)
+            assert calls == ["discard"]
+            assert not queue.succeed(lapsed, {"value": 1})
+            assert queue.fail(lapsed, "too late", retry=False)
+            assert queue.get(job.id).status == RUNNING
+
+            runner.run_job(current)
+        assert calls == ["discard", "complete", "cleanup"]
+        assert queue.get(job.id).status == SUCCEEDED
+
+    def test_runner_discards_results_of_failed_completion(self, app):
+        """Test that results complete couldn't apply are discarded and summarized otherwise"""
+        calls = []
+
+        def complete(payload, result):
+            if payload["value"] < 0:
+                raise LookupError("gone")
+
+        job_type = JobType(
+            lambda payload: {"value": payload["value"], "vector": [1.0, 2.0]},
+            complete=complete,
+            discard=lambda payload, result: calls.append(("discard", result["value"])),
+            summarize=lambda result: {"value": result["value"]},
+        )
+        queue = JobQueue(app.config["JOB_DATABASE"])
+        runner = JobRunner(queue, app, workers=0)
+
+        with patch.dict(JOB_TYPES, {"store": job_type}):
+            ok = queue.submit("store", {"value": 2})
+            gone = queue.submit("store", {"value": -1})
+            assert runner.run_pending() == 2
+
+        assert queue.get(ok.id).result == {"value": 2}
+        assert (queue.get(gone.id).status, queue.get(gone.id).error) == (FAILED, "gone")
+        assert calls == [("discard", -1)]
+
+    def test_discarded_recordings_release_their_file(self, app, clean_data_service):
+        """Test that a processed recording's file is released unless the data holds it"""
+        audio_service = AudioService(app.config["AUDIO_DIR"])
+        path = audio_service.blobs.temp_path("wav")
+        with open(path, "wb") as f:
+            f.write(b"audio")
+        name = audio_service.blobs.put_file(path, "wav")
+        audio_service.blobs.retain(name)
+        payload = {
+            "audio_dir": audio_service.audio_dir,
+            "child": "Maya",
+            "word": "sun",
+            "year": 2023,
+            "month": 6,
+            "day": 15,
+            "filename": "take.wav",
+        }
+
+        word = Word("sun")
+        word.add_recording(2023, 6, 15, name)
+        clean_data_service.save_child(Child("Maya", [word]))
+        discard_recording(payload, {"filename": name})
+        assert audio_service.blobs.load_refs() == {name: 2}
+
+        clean_data_service.remove_word_from_child("Maya", "sun")
+        discard_recording(payload, {"filename": name})
+        assert audio_service.blobs.load_refs() == {name: 1}
+
+    def test_replaced_recordings_keep_their_file_until_committed(self, app, clean_data_service):
+        """Test that a failed write doesn't release the file the data still points at"""
+        audio_service = AudioService(app.config["AUDIO_DIR"])
+        names = []
+        for content in (b"old take", b"new take"):
+            path = audio_service.blobs.temp_path("wav")
+            with open(path, "wb") as f:
+                f.write(content)
+            names.append(audio_service.blobs.put_file(path, "wav"))
+        old, new = names
+        word = Word("sun")
+        word.add_recording(2023, 6, 15, old)
+        clean_data_service.save_child(Child("Maya", [word]))
+        payload = {
+            "audio_dir": audio_service.audio_dir,
+            "child": "Maya",
+            "word": "sun",
+            "year": 2023,
+            "month": 6,
+            "day": 15,
+        }
+
+        with (
+            patch("services.data_service.Transaction.commit", side_effect=OSError("disk full")),
+            pytest.raises(OSError),
+        ):
+            complete_recording(payload, {"filename": new})
+        assert audio_service.blobs.load_refs() == {old: 1, new: 1}
+
+        complete_recording(payload, {"filename": new})
+        assert audio_service.blobs.load_refs() == {new: 1}
+
+
+class TestConcurrentWrites:
+    """Test that parallel writer processes don't lose each other's changes"""
+
+    WRITERS = 8
+    WORDS_PER_WRITER = 5
+
+    def _run_writers(self, repository) -> None:
+        repository.initialize()
+        repository.save_child(Child("Shared"))
+        context = multiprocessing.get_context("fork")
+        processes = [
+            context.Process(
+                target=_concurrent_writer, args=(repository, writer, self.WORDS_PER_WRITER)
+            )
+            for writer in range(self.WRITERS)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(timeout=60)
+            assert process.exitcode == 0
+
+        child = repository.get_child("Shared")
+        assert len(child.words) == self.WRITERS * self.WORDS_PER_WRITER
+        assert all(len(word.recordings) == 1 for word in child.words)
+
+    def test_json_writers_all_land(self, app):
+        """Test N parallel writers against data.json"""
+        self._run_writers(JsonRepository(app.config["DATA_FILE"]))
+
+    def test_journal_writers_all_land(self, app):
+        """Test N parallel writers against the journal"""
+        self._run_writers(
+            JournaledJsonRepository(
+                app.config["DATA_FILE"], compact_entries=7, background_compaction=False
+            )
+        )
+
+    def test_sharded_writers_all_land(self, app):
+        """Test N parallel writers against one child's shard"""
+        self._run_writers(ShardedJsonRepository(app.config["SHARD_DIR"]))
+
+    def test_corrupt_data_file_is_not_overwritten(self, clean_data_service):
+        """Test that a corrupt data file raises instead of reading as empty"""
+        with open(clean_data_service.data_file, "w", encoding="utf-8") as f:
+            f.write('{"children": [')
+
+        with pytest.raises(CorruptDataError):
+            clean_data_service.get_children()
+        with pytest.raises(CorruptDataError):
+            clean_data_service.save_child(Child("Ghost"))